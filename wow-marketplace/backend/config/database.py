@@ -0,0 +1,85 @@
+"""
+Configuración de la base de datos.
+
+Por defecto SQLite en modo WAL: los lectores (dashboard, polling de
+auction_status) no se bloquean mientras el escaneo escribe, y las
+escrituras esperan al busy timeout en lugar de fallar con "database is
+locked". WAL queda grabado en el propio fichero; el db.sqlite3 del
+repositorio ya está en WAL, así que conectarse no lo modifica. Con
+DJANGO_DB_ENGINE=postgresql se usa PostgreSQL (requiere psycopg) con
+los datos de conexión del entorno.
+
+Variables de entorno:
+    DJANGO_DB_ENGINE      sqlite (por defecto) | postgresql
+    DJANGO_CONN_MAX_AGE   segundos que se reutiliza cada conexión (60)
+    SQLITE_PATH           fichero SQLite (BASE_DIR/db.sqlite3)
+    SQLITE_BUSY_TIMEOUT   segundos de espera por un bloqueo (20)
+    SQLITE_WAL            0 = modo rollback journal en vez de WAL (1 por defecto)
+    POSTGRES_DB, POSTGRES_USER, POSTGRES_PASSWORD, POSTGRES_HOST, POSTGRES_PORT
+"""
+import os
+
+CONN_MAX_AGE = 60
+SQLITE_BUSY_TIMEOUT = 20
+
+SQLITE_PRAGMAS = {
+    "temp_store": "MEMORY",
+    "cache_size": -20000,  # ~20 MB de caché de páginas por conexión
+    "mmap_size": 128 * 1024 * 1024,
+}
+
+
+def sqlite_settings(base_dir, conn_max_age):
+    timeout = int(os.environ.get("SQLITE_BUSY_TIMEOUT", SQLITE_BUSY_TIMEOUT))
+    pragmas = {**SQLITE_PRAGMAS, "busy_timeout": timeout * 1000}
+    if os.environ.get("SQLITE_WAL", "1").lower() not in ("0", "false", "no"):
+        pragmas = {
+            "journal_mode": "WAL",  # lectores y escritor a la vez
+            "synchronous": "NORMAL",  # seguro con WAL y mucho más rápido que FULL
+            "wal_autocheckpoint": 1000,  # páginas
+            **pragmas,
+        }
+    path = os.environ.get("SQLITE_PATH") or base_dir / "db.sqlite3"
+
+    return {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": path,
+        "CONN_MAX_AGE": conn_max_age,
+        "OPTIONS": {
+            "timeout": timeout,
+            # BEGIN IMMEDIATE: una transacción de escritura toma el bloqueo al
+            # empezar, así que espera al busy timeout en vez de fallar al
+            # intentar pasar de lectura a escritura a mitad de transacción.
+            "transaction_mode": "IMMEDIATE",
+            "init_command": ";".join(f"PRAGMA {name}={value}" for name, value in pragmas.items()),
+        },
+        "TEST": {
+            # Fichero en lugar de memoria para que los tests usen varias
+            # conexiones reales, en WAL como la base de datos normal.
+            "NAME": base_dir / "test_db.sqlite3",
+        },
+    }
+
+
+def postgresql_settings(conn_max_age):
+    return {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": os.environ.get("POSTGRES_DB", "wow_marketplace"),
+        "USER": os.environ.get("POSTGRES_USER", "postgres"),
+        "PASSWORD": os.environ.get("POSTGRES_PASSWORD", ""),
+        "HOST": os.environ.get("POSTGRES_HOST", "localhost"),
+        "PORT": os.environ.get("POSTGRES_PORT", "5432"),
+        "CONN_MAX_AGE": conn_max_age,
+        "CONN_HEALTH_CHECKS": True,
+    }
+
+
+def database_settings(base_dir):
+    engine = os.environ.get("DJANGO_DB_ENGINE", "sqlite").lower()
+    conn_max_age = int(os.environ.get("DJANGO_CONN_MAX_AGE", CONN_MAX_AGE))
+
+    if engine in ("postgres", "postgresql"):
+        return {"default": postgresql_settings(conn_max_age)}
+    if engine != "sqlite":
+        raise ValueError(f"DJANGO_DB_ENGINE no soportado: {engine}")
+    return {"default": sqlite_settings(base_dir, conn_max_age)}
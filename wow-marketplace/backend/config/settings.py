@@ -79,10 +79,25 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
-DATABASES = {
+# SQLite en modo WAL por defecto; PostgreSQL con DJANGO_DB_ENGINE=postgresql.
+# Ver config/database.py.
+
+from config.database import database_settings
+
+DATABASES = database_settings(BASE_DIR)
+
+
+# Cache
+# Caché en disco para que el servidor web y el worker de escaneos
+# compartan la generación de datos del dashboard.
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'django_cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000,
+        },
     }
 }
 
@@ -5,24 +5,57 @@ from .models import (
     Material,
     ItemMaterial,
     ConnectedRealm,
+    CraftingQuote,
     ItemPriceSnapshot,
+    ItemIdLookup,
+    LatestOpportunity,
+    Realm,
+    ScanJob,
+    ScanRealmTiming,
+    ScanRun,
 )
+from market.services.dashboard import bump_generation
+
+
+class DashboardDataAdmin(admin.ModelAdmin):
+    """Los cambios hechos desde el admin también invalidan el dashboard."""
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        bump_generation()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        bump_generation()
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        bump_generation()
 
 
 @admin.register(Profession)
-class ProfessionAdmin(admin.ModelAdmin):
+class ProfessionAdmin(DashboardDataAdmin):
     list_display = ("id", "name")
 
 
 @admin.register(Item)
-class ItemAdmin(admin.ModelAdmin):
+class ItemAdmin(DashboardDataAdmin):
     list_display = ("id", "name", "profession")
     search_fields = ("name",)
 
 
+@admin.register(ItemIdLookup)
+class ItemIdLookupAdmin(admin.ModelAdmin):
+    list_display = ("name", "region", "blizzard_id", "checked_at")
+    list_filter = ("region",)
+    search_fields = ("name",)
+
+
 @admin.register(Material)
 class MaterialAdmin(admin.ModelAdmin):
-    list_display = ("id", "name")
+    list_display = ("id", "name", "blizzard_id", "item")
+    search_fields = ("name",)
+    autocomplete_fields = ("item",)
 
 
 @admin.register(ItemMaterial)
@@ -32,18 +65,78 @@ class ItemMaterialAdmin(admin.ModelAdmin):
 
 @admin.register(ConnectedRealm)
 class ConnectedRealmAdmin(admin.ModelAdmin):
-    list_display = ("name", "blizzard_id", "slug")
+    list_display = ("name", "region", "blizzard_id", "slug")
+    list_filter = ("region",)
+
+
+@admin.register(Realm)
+class RealmAdmin(admin.ModelAdmin):
+    list_display = ("name", "region", "blizzard_id", "connected_realm")
+    list_filter = ("region",)
+    list_select_related = ("connected_realm",)
 
 
 @admin.register(ItemPriceSnapshot)
-class ItemPriceSnapshotAdmin(admin.ModelAdmin):
+class ItemPriceSnapshotAdmin(DashboardDataAdmin):
     list_display = (
         "item",
+        "region",
         "best_buy_realm",
         "best_sell_realm",
         "estimated_sell_price",
         "profit",
         "created_at",
     )
-    list_filter = ("best_sell_realm",)
+    list_filter = ("region", "best_sell_realm")
     ordering = ("-profit",)
+
+
+@admin.register(LatestOpportunity)
+class LatestOpportunityAdmin(DashboardDataAdmin):
+    list_display = (
+        "item",
+        "region",
+        "best_buy_realm",
+        "best_sell_realm",
+        "estimated_sell_price",
+        "profit",
+        "created_at",
+    )
+    list_filter = ("region", "best_sell_realm")
+    ordering = ("-profit",)
+
+
+@admin.register(CraftingQuote)
+class CraftingQuoteAdmin(admin.ModelAdmin):
+    list_display = ("item", "region", "craft_cost", "buy_price", "buy_realm", "sell_price", "sell_realm", "margin", "profit")
+    list_filter = ("region",)
+    ordering = ("-margin",)
+
+
+@admin.register(ScanJob)
+class ScanJobAdmin(admin.ModelAdmin):
+    list_display = (
+        "id", "status", "owner", "created_at", "started_at", "updated_at", "finished_at",
+        "processed_realms", "total_realms",
+    )
+    list_filter = ("status",)
+
+
+class ScanRealmTimingInline(admin.TabularInline):
+    model = ScanRealmTiming
+    fields = ("realm", "outcome", "seconds", "latency", "download", "parse", "index", "bytes")
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+
+@admin.register(ScanRun)
+class ScanRunAdmin(admin.ModelAdmin):
+    list_display = (
+        "id", "kind", "status", "started_at", "seconds",
+        "realms_total", "realms_downloaded", "realms_not_modified", "realms_failed",
+        "bytes_downloaded", "rows_written", "peak_memory_kb", "error_count",
+    )
+    list_filter = ("kind", "status")
+    readonly_fields = ("job",)
+    inlines = [ScanRealmTimingInline]
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+
+from market.models import Item
+from market.services.icons import assign_icons, icon_index
+
+BATCH_SIZE = 500
+
+
+# ======================
+# COMMAND
+# ======================
+class Command(BaseCommand):
+    help = "Asigna iconos a los items en bloque usando el CSV de iconos"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Reasigna también los items que ya tienen icono",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=BATCH_SIZE,
+            help="Items por bloque de bulk_update",
+        )
+
+    def handle(self, *args, **options):
+        if not icon_index.mapping():
+            self.stderr.write(self.style.ERROR(f"❌ No se pudo cargar {icon_index.path}"))
+            return
+
+        items = Item.objects.filter(blizzard_id__isnull=False).only("id", "blizzard_id", "icon")
+        if not options["all"]:
+            items = items.filter(icon__in=["", None])
+
+        batch_size = options["batch_size"]
+        batch = []
+        assigned = total = 0
+        for item in items.iterator(chunk_size=batch_size):
+            batch.append(item)
+            if len(batch) >= batch_size:
+                assigned += len(assign_icons(batch, batch_size))
+                total += len(batch)
+                batch = []
+        if batch:
+            assigned += len(assign_icons(batch, batch_size))
+            total += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Iconos asignados: {assigned}/{total}"))
@@ -0,0 +1,251 @@
+from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.test import Client
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases
+from django.utils import timezone
+
+import contextlib
+import gc
+import io
+import json
+import platform
+import statistics
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from unittest import mock
+
+from market.models import Item, TrackedItem
+from market.services import archive, item_resolver, token
+from market.services.arbitrage import build_price_matrix, find_opportunities
+from market.services.auction_stream import STREAM_CHUNK_SIZE, iter_auctions
+from market.services.price_index import build_price_index
+from market.services.synthetic import SyntheticMarket
+from market.management.commands import update_auctions as scan
+
+RESULTS_DIR = settings.BASE_DIR / "benchmark_results"
+DEPTH_QUANTITY = 20  # unidades para medir el arbitraje con profundidad
+
+
+# ======================
+# HTTP SIMULADO
+# ======================
+class StubResponse:
+    def __init__(self, status_code, body=b"", headers=None):
+        self.status_code = status_code
+        self.content = body
+        self.headers = headers or {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def iter_content(self, chunk_size=STREAM_CHUNK_SIZE):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        pass
+
+
+class StubSession:
+    """Responde como la API de Blizzard con los volcados sintéticos ya serializados."""
+
+    def __init__(self, bodies):
+        self.bodies = bodies
+
+    def get(self, url, headers=None, params=None, timeout=None, stream=False):
+        if "/connected-realm/" in url:
+            realm_id = int(url.split("/connected-realm/")[1].split("/")[0])
+            return StubResponse(200, self.bodies[realm_id], {"Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"})
+        if "/search/item" in url:
+            name = next(v for k, v in params.items() if k.startswith("name."))
+            item_id = int(name.rsplit(" ", 1)[1])
+            body = {"results": [{"data": {"id": item_id, "name": {"en_US": name}}}]}
+            return StubResponse(200, json.dumps(body).encode())
+        raise ValueError(f"URL no simulada: {url}")
+
+    def post(self, url, **kwargs):
+        return StubResponse(200, json.dumps({"access_token": "benchmark", "expires_in": 86400}).encode())
+
+
+# ======================
+# MEDICIÓN
+# ======================
+def measure(fn, repeat):
+    """Tiempos de `repeat` ejecuciones y pico de memoria (tracemalloc) de una más."""
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "runs": [round(t, 6) for t in times],
+        "min": round(min(times), 6),
+        "median": round(statistics.median(times), 6),
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+# ======================
+# COMMAND
+# ======================
+class Command(BaseCommand):
+    help = "Benchmarks del pipeline de escaneo sobre subastas sintéticas (resultados en JSON)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--realms", type=int, default=30)
+        parser.add_argument("--auctions", type=int, default=20_000, help="Subastas por reino")
+        parser.add_argument("--items", type=int, default=5_000, help="Items distintos en el mercado")
+        parser.add_argument("--tracked", type=int, default=200, help="Items seguidos")
+        parser.add_argument("--zipf", type=float, default=1.3, help="Exponente Zipf de popularidad")
+        parser.add_argument("--commodity-ratio", type=float, default=0.6)
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--output", help="Fichero JSON de resultados")
+        parser.add_argument("--compare", help="JSON de una ejecución anterior para comparar")
+
+    def handle(self, *args, **options):
+        market = SyntheticMarket(
+            seed=options["seed"],
+            realms=options["realms"],
+            auctions_per_realm=options["auctions"],
+            items=options["items"],
+            zipf_a=options["zipf"],
+            commodity_ratio=options["commodity_ratio"],
+        )
+        repeat = options["repeat"]
+
+        self.stdout.write(f"🧪 Generando mercado sintético: {market.params()}")
+        payloads = {realm_id: market.realm_payload(realm_id) for realm_id in market.realm_ids}
+        bodies = {realm_id: json.dumps(p).encode() for realm_id, p in payloads.items()}
+        auctions = {realm_id: p["auctions"] for realm_id, p in payloads.items()}
+        del payloads
+
+        tracked_ids = set(market.popular_item_ids(options["tracked"]))
+        realm_names = [f"Realm {realm_id}" for realm_id in market.realm_ids]
+        sell_realms = realm_names[:len(scan.PRIMARY_REALMS)]
+
+        results = {}
+
+        def index_all():
+            return {name: build_price_index(auctions[realm_id], tracked_ids, ladders=True)
+                    for name, realm_id in zip(realm_names, market.realm_ids)}
+
+        def parse_and_index():
+            for realm_id in market.realm_ids:
+                body = bodies[realm_id]
+                chunks = (body[i:i + STREAM_CHUNK_SIZE] for i in range(0, len(body), STREAM_CHUNK_SIZE))
+                build_price_index(iter_auctions(chunks), tracked_ids, ladders=True)
+
+        indexes = index_all()
+        price_maps = {item_id: scan.min_buyout_by_realm(indexes, item_id) for item_id in tracked_ids}
+
+        benchmarks = {
+            "parse_and_index": parse_and_index,
+            "build_price_index": index_all,
+            "min_buyout_by_realm": lambda: [scan.min_buyout_by_realm(indexes, i) for i in tracked_ids],
+            "analyze_arbitrage": lambda: [scan.analyze_arbitrage(p, sell_realms) for p in price_maps.values()],
+            "find_opportunities": lambda: find_opportunities(build_price_matrix(indexes, tracked_ids), sell_realms),
+            "find_opportunities_depth": lambda: find_opportunities(
+                build_price_matrix(indexes, tracked_ids, DEPTH_QUANTITY), sell_realms
+            ),
+        }
+        for name, fn in benchmarks.items():
+            self.stdout.write(f"⏱️ {name}...")
+            results[name] = measure(fn, repeat)
+
+        self.stdout.write("⏱️ run_update_auctions + home (base de datos de pruebas)...")
+        results.update(self._bench_pipeline(market, bodies, tracked_ids, realm_names, repeat))
+
+        report = {
+            "created_at": timezone.now().isoformat(),
+            "python": platform.python_version(),
+            "params": {**market.params(), "tracked": len(tracked_ids), "repeat": repeat},
+            "benchmarks": results,
+        }
+        self._print(report, options["compare"])
+
+        output = Path(options["output"] or RESULTS_DIR / f"scan-{timezone.now():%Y%m%dT%H%M%S}.json")
+        output.parent.mkdir(parents=True, exist_ok=True)
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"✅ Resultados guardados en {output}"))
+
+    def _bench_pipeline(self, market, bodies, tracked_ids, realm_names, repeat):
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False, aliases={"default"})
+        tmp = tempfile.TemporaryDirectory()
+        try:
+            realms_json = Path(tmp.name) / "realms.json"
+            with open(realms_json, "w", encoding="utf-8") as f:
+                json.dump([
+                    {"id": realm_id, "name": name, "slug": name.lower().replace(" ", "-")}
+                    for realm_id, name in zip(market.realm_ids, realm_names)
+                ], f)
+
+            for item_id in tracked_ids:
+                item = Item.objects.create(name=f"Synthetic {item_id}")
+                TrackedItem.objects.create(item=item)
+
+            session = StubSession(bodies)
+            runs = {"n": 0}
+
+            def full_scan():
+                # Cada ejecución con cachés vacías: sin 304, todo se descarga
+                runs["n"] += 1
+                run_dir = Path(tmp.name) / f"run{runs['n']}"
+                with mock.patch.object(scan, "REALM_CACHE_DIR", run_dir / "realm_cache"), \
+                        mock.patch.object(archive, "ARCHIVE_DIR", run_dir / "archive"):
+                    scan.run_update_auctions(sell_realms=realm_names[:len(scan.PRIMARY_REALMS)])
+
+            client = Client()
+            patches = [
+                mock.patch.object(scan, "get_session", lambda *a, **k: session),
+                mock.patch.object(token, "get_session", lambda *a, **k: session),
+                mock.patch.object(item_resolver, "get_session", lambda *a, **k: session),
+                mock.patch.object(scan, "load_credentials", lambda: ("benchmark", "benchmark")),
+                mock.patch.dict(scan.REGIONS, {"us": {**scan.REGIONS["us"], "realms_json": realms_json}}),
+                mock.patch.object(scan, "DEV_MODE", False),
+            ]
+            for p in patches:
+                p.start()
+            try:
+                # El escaneo imprime los items; no mezclarlo con el informe
+                with contextlib.redirect_stdout(io.StringIO()):
+                    results = {"run_update_auctions": measure(full_scan, repeat)}
+                    results["home_view"] = measure(lambda: client.get("/"), repeat)
+            finally:
+                for p in patches:
+                    p.stop()
+            return results
+        finally:
+            tmp.cleanup()
+            teardown_databases(old_config, verbosity=0)
+
+    def _print(self, report, compare_path):
+        previous = {}
+        if compare_path:
+            with open(compare_path, "r", encoding="utf-8") as f:
+                previous = json.load(f)["benchmarks"]
+
+        for name, r in report["benchmarks"].items():
+            line = f"📊 {name:<24} mediana {r['median'] * 1000:10.2f} ms | pico {r['peak_kb']:10.1f} KB"
+            if name in previous and previous[name]["median"]:
+                delta = (r["median"] - previous[name]["median"]) / previous[name]["median"] * 100
+                line += f" | {delta:+.1f}% vs anterior"
+            self.stdout.write(line)
@@ -0,0 +1,92 @@
+from django.core.management.base import BaseCommand
+
+import time
+
+from market.services.retention import (
+    BATCH_SIZE,
+    DAILY_RETENTION_DAYS,
+    HOURLY_RETENTION_DAYS,
+    RAW_RETENTION_DAYS,
+    VACUUM_MIN_DELETED,
+    compact_history,
+    optimize_database,
+)
+
+
+# ======================
+# COMMAND
+# ======================
+class Command(BaseCommand):
+    help = (
+        "Agrega el histórico antiguo de precios y oportunidades por hora y por día "
+        "y borra las filas crudas. Pensado para ejecutarse periódicamente (cron o scan_worker)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--raw-days",
+            type=int,
+            default=RAW_RETENTION_DAYS,
+            help="Días de filas crudas que se conservan",
+        )
+        parser.add_argument(
+            "--hourly-days",
+            type=int,
+            default=HOURLY_RETENTION_DAYS,
+            help="Días de agregados por hora que se conservan",
+        )
+        parser.add_argument(
+            "--daily-days",
+            type=int,
+            default=DAILY_RETENTION_DAYS,
+            help="Días de agregados diarios que se conservan (por defecto, todos)",
+        )
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Filas por transacción")
+        parser.add_argument(
+            "--vacuum",
+            action="store_true",
+            help=f"Compactar la base de datos aunque se hayan borrado menos de {VACUUM_MIN_DELETED} filas",
+        )
+        parser.add_argument(
+            "--no-vacuum",
+            action="store_true",
+            help="No compactar ni actualizar las estadísticas de la base de datos al terminar",
+        )
+
+    def handle(self, *args, **options):
+        if options["hourly_days"] < options["raw_days"]:
+            self.stderr.write(self.style.ERROR("❌ --hourly-days no puede ser menor que --raw-days"))
+            return
+        if options["daily_days"] is not None and options["daily_days"] < options["hourly_days"]:
+            self.stderr.write(self.style.ERROR("❌ --daily-days no puede ser menor que --hourly-days"))
+            return
+
+        start = time.perf_counter()
+        report = compact_history(
+            raw_days=options["raw_days"],
+            hourly_days=options["hourly_days"],
+            daily_days=options["daily_days"],
+            batch_size=options["batch_size"],
+        )
+
+        self.stdout.write(
+            f"🗜️ Precios por reino: {report['prices_deleted']} filas → {report['price_rollups']} agregados/hora"
+        )
+        self.stdout.write(
+            f"🗜️ Snapshots: {report['snapshots_deleted']} filas → {report['snapshot_rollups']} agregados/hora"
+        )
+        self.stdout.write(
+            f"🗜️ Horas: {report['hourly_deleted']} agregados → {report['daily_rollups']} agregados/día"
+        )
+        if report["daily_deleted"]:
+            self.stdout.write(f"🗑️ Agregados diarios caducados: {report['daily_deleted']}")
+
+        if not options["no_vacuum"]:
+            deleted = sum(
+                report[key] for key in ("prices_deleted", "snapshots_deleted", "hourly_deleted", "daily_deleted")
+            )
+            done = optimize_database(deleted, vacuum=options["vacuum"])
+            if done:
+                self.stdout.write(f"🧹 {done}")
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Histórico compactado en {time.perf_counter() - start:.1f}s"))
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.conf import settings
+
+import json
+from pathlib import Path
+
+from market.models import DEFAULT_REGION, REGION_CHOICES, ItemIdLookup
+
+
+# ======================
+# COMMAND
+# ======================
+class Command(BaseCommand):
+    help = "Importa una sola vez el antiguo item_id_cache.json a la tabla ItemIdLookup"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path",
+            nargs="?",
+            default=str(settings.BASE_DIR / "item_id_cache.json"),
+            help="Ruta del JSON {nombre: blizzard_id}",
+        )
+        parser.add_argument(
+            "--region",
+            default=DEFAULT_REGION,
+            choices=[code for code, _ in REGION_CHOICES],
+            help="Región de la caché (los nombres dependen del locale)",
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        if not path.exists():
+            self.stderr.write(self.style.ERROR(f"❌ No existe {path}"))
+            return
+
+        with open(path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+
+        rows = [
+            ItemIdLookup(region=options["region"], name=name, blizzard_id=blizzard_id)
+            for name, blizzard_id in cache.items()
+            if blizzard_id
+        ]
+        # Las filas ya existentes en la tabla tienen prioridad
+        before = ItemIdLookup.objects.count()
+        ItemIdLookup.objects.bulk_create(rows, ignore_conflicts=True, batch_size=500)
+        imported = ItemIdLookup.objects.count() - before
+
+        self.stdout.write(self.style.SUCCESS(f"✅ {imported} nombres importados de {path}"))
@@ -0,0 +1,143 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date, parse_datetime
+
+import json
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from market.models import DEFAULT_REGION, TrackedItem
+from market.services.archive import list_scans, region_dir
+from market.services.backtest import make_strategy, parse_strategies, replay_scan
+from market.services.realms import connected_realm_names
+from market.management.commands.update_auctions import REGIONS
+
+TOP_ITEMS = 5
+
+
+def parse_moment(value, end=False):
+    """Acepta fecha (AAAA-MM-DD) o fecha y hora ISO; `end` incluye el día completo."""
+    if not value:
+        return None
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f"Fecha no válida: {value}")
+        moment = datetime.combine(day, time.min)
+        if end:
+            moment += timedelta(days=1)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=dt_timezone.utc)
+    return moment
+
+
+# ======================
+# COMMAND
+# ======================
+class Command(BaseCommand):
+    help = "Reproduce escaneos archivados con varias estrategias de arbitraje y compara resultados"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since", help="Desde (AAAA-MM-DD o ISO)")
+        parser.add_argument("--until", help="Hasta, incluido (AAAA-MM-DD o ISO)")
+        parser.add_argument(
+            "--region",
+            default=DEFAULT_REGION,
+            choices=list(REGIONS),
+            help="Región cuyos escaneos archivados se reproducen",
+        )
+        parser.add_argument(
+            "--archive-dir",
+            help="Carpeta de escaneos archivados o de fixtures con el mismo formato (por defecto la de la región)",
+        )
+        parser.add_argument(
+            "--strategy",
+            action="append",
+            default=[],
+            help='Estrategia "nombre:cut=0.05,min_profit=1000,sell=Stormrage|Area 52" (repetible)',
+        )
+        parser.add_argument(
+            "--all-items",
+            action="store_true",
+            help="Analiza todos los items archivados, no solo los que se siguen",
+        )
+        parser.add_argument("--workers", type=int, default=None, help="Procesos en paralelo")
+        parser.add_argument("--json", dest="json_path", help="Guardar el informe en este fichero")
+
+    def handle(self, *args, **options):
+        scans = list_scans(
+            parse_moment(options["since"]),
+            parse_moment(options["until"], end=True),
+            root=options["archive_dir"] or region_dir(options["region"]),
+            complete=True,
+        )
+        if not scans:
+            raise CommandError("No hay escaneos archivados en ese rango")
+
+        try:
+            strategies = parse_strategies(options["strategy"])
+        except ValueError as e:
+            raise CommandError(str(e))
+        if not strategies:
+            strategies = [make_strategy("actual", sell_realms=REGIONS[options["region"]]["sell_realms"])]
+        for strategy in strategies:
+            strategy["sell_realms"] = connected_realm_names(options["region"], strategy["sell_realms"])
+
+        item_ids = None
+        if not options["all_items"]:
+            item_ids = sorted(set(
+                TrackedItem.objects.filter(active=True, item__blizzard_id__isnull=False)
+                .values_list("item__blizzard_id", flat=True)
+            ))
+            if not item_ids:
+                raise CommandError("No hay items seguidos con Blizzard ID (usa --all-items)")
+
+        self.stdout.write(f"🔁 Reproduciendo {len(scans)} escaneos con {len(strategies)} estrategias...")
+
+        totals = {
+            s["name"]: {"opportunities": 0, "profit": 0.0, "by_item": defaultdict(float), "scans_with_hits": 0}
+            for s in strategies
+        }
+        with ProcessPoolExecutor(max_workers=options["workers"]) as pool:
+            futures = [pool.submit(replay_scan, str(scan.path), item_ids, strategies) for scan in scans]
+            for future in as_completed(futures):
+                for name, opportunities in future.result().items():
+                    summary = totals[name]
+                    summary["opportunities"] += len(opportunities)
+                    summary["scans_with_hits"] += bool(opportunities)
+                    for opp in opportunities:
+                        summary["profit"] += opp.profit
+                        summary["by_item"][opp.item_id] += opp.profit
+
+        report = {
+            "scans": len(scans),
+            "from": scans[0].scanned_at.isoformat(),
+            "to": scans[-1].scanned_at.isoformat(),
+            "strategies": [],
+        }
+        for strategy in strategies:
+            summary = totals[strategy["name"]]
+            top = sorted(summary["by_item"].items(), key=lambda kv: kv[1], reverse=True)[:TOP_ITEMS]
+            report["strategies"].append({
+                **strategy,
+                "opportunities": summary["opportunities"],
+                "scans_with_hits": summary["scans_with_hits"],
+                "profit_gold": round(summary["profit"] / 10000, 2),
+                "profit_gold_per_scan": round(summary["profit"] / 10000 / len(scans), 2),
+                "top_items": [{"item_id": i, "profit_gold": round(p / 10000, 2)} for i, p in top],
+            })
+
+        for row in report["strategies"]:
+            self.stdout.write(
+                f"📈 {row['name']}: {row['opportunities']} oportunidades en "
+                f"{row['scans_with_hits']}/{len(scans)} escaneos | "
+                f"beneficio {row['profit_gold']}g ({row['profit_gold_per_scan']}g/escaneo)"
+            )
+
+        if options["json_path"]:
+            with open(options["json_path"], "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"💾 Informe guardado en {options['json_path']}")
+
+        self.stdout.write(self.style.SUCCESS("✅ Replay terminado"))
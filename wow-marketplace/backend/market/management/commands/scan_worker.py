@@ -0,0 +1,69 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+import time
+
+from market.services.jobs import claim_next_job, fail_stale_jobs, run_job
+
+POLL_INTERVAL = 2  # segundos entre consultas a la cola
+COMPACT_INTERVAL = 6  # horas entre compactaciones del histórico (0 = nunca)
+
+
+# ======================
+# COMMAND
+# ======================
+class Command(BaseCommand):
+    help = "Worker local que ejecuta los escaneos encolados desde el dashboard"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Procesa los jobs en cola y termina",
+        )
+        parser.add_argument(
+            "--poll",
+            type=float,
+            default=POLL_INTERVAL,
+            help="Segundos entre consultas a la cola",
+        )
+        parser.add_argument(
+            "--compact-every",
+            type=float,
+            default=COMPACT_INTERVAL,
+            help="Horas entre ejecuciones de compact_history cuando no hay escaneos (0 = nunca)",
+        )
+
+    def handle(self, *args, **options):
+        stale = fail_stale_jobs()
+        if stale:
+            self.stderr.write(self.style.WARNING(f"⚠️ {stale} job(s) interrumpidos marcados como fallidos"))
+
+        self.stdout.write("👷 Worker de escaneos iniciado")
+
+        compact_every = options["compact_every"] * 3600
+        last_compact = time.monotonic()
+
+        while True:
+            # Con CONN_MAX_AGE la conexión sobrevive entre vueltas: se
+            # cierra si caducó o quedó inservible
+            close_old_connections()
+            job = claim_next_job()
+            if job is None:
+                if options["once"]:
+                    break
+                # Sin escaneos pendientes: buen momento para compactar el histórico
+                if compact_every and time.monotonic() - last_compact >= compact_every:
+                    call_command("compact_history", stdout=self.stdout, stderr=self.stderr)
+                    last_compact = time.monotonic()
+                time.sleep(options["poll"])
+                continue
+
+            self.stdout.write(f"🚀 Ejecutando {job}")
+            job = run_job(job)
+
+            if job.status == job.FAILED:
+                self.stderr.write(self.style.ERROR(f"❌ {job} falló:\n{job.error}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"✅ {job} terminado: {job.result}"))
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+
+import time
+
+from market.management.commands.update_auctions import REGIONS, SCAN_REGIONS, get_token
+from market.services.realms import (
+    MAX_PARALLEL_LOOKUPS,
+    read_realm_list,
+    resolve_connected_realms,
+    sync_realm_mapping,
+)
+
+
+# ======================
+# COMMAND
+# ======================
+class Command(BaseCommand):
+    help = "Resuelve el reino conectado de cada reino de la lista y guarda la relación (tabla Realm)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--region",
+            action="append",
+            dest="regions",
+            choices=list(REGIONS),
+            help=f"Región a sincronizar (repetible). Por defecto {', '.join(SCAN_REGIONS)}",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=MAX_PARALLEL_LOOKUPS,
+            help="Consultas a la API a la vez",
+        )
+
+    def handle(self, *args, **options):
+        for region in dict.fromkeys(options["regions"] or SCAN_REGIONS):
+            path = REGIONS[region]["realms_json"]
+            if not path.exists():
+                self.stderr.write(self.style.ERROR(f"❌ {region.upper()}: no existe {path}"))
+                continue
+
+            start = time.perf_counter()
+            entries = read_realm_list(path)
+            connected_ids = resolve_connected_realms(
+                entries, get_token(region), region, REGIONS[region]["locale"], options["concurrency"]
+            )
+            result = sync_realm_mapping(region, entries, connected_ids)
+
+            unresolved = sum(connected_id is None for connected_id in connected_ids.values())
+            self.stdout.write(
+                f"🌍 {region.upper()} — reinos: {result.realms} | reinos conectados: {result.connected} | "
+                f"nuevos: {result.created} | cambiados: {result.updated} | borrados: {result.deleted} | "
+                f"sin resolver: {unresolved} | {time.perf_counter() - start:.1f}s"
+            )
+        self.stdout.write(self.style.SUCCESS("✅ Reinos sincronizados"))
@@ -1,25 +1,59 @@
 from django.core.management.base import BaseCommand
 from django.conf import settings
+from django.db import close_old_connections, connections
 from django.utils import timezone
 
+import os
 import time
 import json
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+
 import requests
 
+from market.services.crafting import load_recipe_book, material_blizzard_id, quote_recipe_book, save_quotes
+from market.services.dashboard import bump_generation
+from market.services.http import REQUEST_TIMEOUT, get_session
+from market.services.history import history_rows
+from market.services.instrumentation import MeteredStream, RealmTiming, ScanMetrics
+from market.services.item_resolver import resolve_item_id, resolve_item_ids
+from market.services.jobs import claim_next_job, enqueue_scan, fail_stale_jobs, run_job, start_scan
+from market.services.archive import (
+    ListingCollector,
+    prune_archive,
+    region_dir,
+    reuse_realm,
+    scan_dir_for,
+    write_manifest,
+    write_realm,
+)
+from market.services.arbitrage import (
+    AH_CUT,
+    MIN_PROFIT,
+    TARGET_QUANTITY,
+    build_price_matrix,
+    find_opportunities,
+)
+from market.services.auction_stream import STREAM_CHUNK_SIZE, iter_auctions
+from market.services.opportunities import refresh_latest_opportunities
+from market.services.persistence import ScanWriter, reset_progress
+from market.services.price_index import build_price_index, index_from_json, index_to_json
+from market.services.realms import connected_realm_names, load_connected_realms, read_realm_list, sync_realm_mapping
+from market.services.scheduler import RealmScheduler
+from market.services.token import get_token_provider
 from market.models import (
+    DEFAULT_REGION,
     AuctionUpdateStatus,
     Item,
-    ConnectedRealm,
     ItemPriceSnapshot,
+    ScanRun,
     TrackedItem,
 )
 
 # ======================
 # CONFIG
 # ======================
-REGION = "us"
-LOCALE = "en_US"
-
 PRIMARY_REALMS = [
     "Stormrage", "Area 52", "Moon Guard",
     "Ragnaros", "Dalaran", "Zul'jin", "Proudmoore",
@@ -28,10 +62,49 @@ PRIMARY_REALMS = [
 MAX_REALMS_TO_SCAN = 30
 DEV_MODE = True  # True = solo 10 reinos, False = todos
 
+MAX_CONCURRENT_DOWNLOADS = 8  # descargas de reinos en paralelo (por región)
+REALM_TIMEOUT = REQUEST_TIMEOUT  # (conexión, lectura) en segundos por reino
+
+ARCHIVE_AUCTIONS = True  # guardar las publicaciones reducidas de cada escaneo
+
 BASE_DIR = settings.BASE_DIR
 CREDENTIALS_FILE = BASE_DIR / "blizzard_credentials.txt"
-REALMS_JSON = BASE_DIR / "wow_realms_connected.json"
-CACHE_FILE = BASE_DIR / "item_id_cache.json"
+REALM_CACHE_DIR = BASE_DIR / "realm_price_cache"  # índices reducidos por región y reino
+
+# Cada región se escanea con su propio pool de descargas: una región
+# lenta no retrasa a las demás. `sell_realms` son los reinos de venta
+# por defecto de la región. De momento solo se incluye el JSON de reinos
+# de US: eu, kr y tw necesitan generar el suyo con ListRealms.ipynb.
+REGIONS = {
+    "us": {
+        "locale": "en_US",
+        "realms_json": BASE_DIR / "wow_realms_connected.json",
+        "sell_realms": PRIMARY_REALMS,
+        "concurrency": MAX_CONCURRENT_DOWNLOADS,
+    },
+    "eu": {
+        "locale": "en_GB",
+        "realms_json": BASE_DIR / "wow_realms_connected_eu.json",
+        "sell_realms": [
+            "Silvermoon", "Draenor", "Kazzak", "Tarren Mill",
+            "Twisting Nether", "Ragnaros", "Argent Dawn",
+        ],
+        "concurrency": MAX_CONCURRENT_DOWNLOADS,
+    },
+    "kr": {
+        "locale": "ko_KR",
+        "realms_json": BASE_DIR / "wow_realms_connected_kr.json",
+        "sell_realms": None,
+        "concurrency": 4,
+    },
+    "tw": {
+        "locale": "zh_TW",
+        "realms_json": BASE_DIR / "wow_realms_connected_tw.json",
+        "sell_realms": None,
+        "concurrency": 4,
+    },
+}
+SCAN_REGIONS = [DEFAULT_REGION]  # regiones del escaneo por defecto
 
 
 # ======================
@@ -47,137 +120,314 @@ def load_credentials():
     return creds["CLIENT_ID"], creds["CLIENT_SECRET"]
 
 
-def get_token():
-    client_id, client_secret = load_credentials()
-    r = requests.post(
-        f"https://{REGION}.battle.net/oauth/token",
-        auth=(client_id, client_secret),
-        data={"grant_type": "client_credentials"},
-    )
-    r.raise_for_status()
-    return r.json()["access_token"]
+def get_token(region=DEFAULT_REGION):
+    """Token compartido de la región; solo se pide uno nuevo cuando está por caducar."""
+    return get_token_provider(region, load_credentials).get()
+
+
+def renew_token(region, token):
+    """Token nuevo cuando la API rechaza `token` (401)."""
+    provider = get_token_provider(region, load_credentials)
+    provider.invalidate(token)
+    return provider.get()
 
 
 # ======================
 # CACHE
 # ======================
-def load_cache():
-    if CACHE_FILE.exists():
-        with open(CACHE_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {}
-
-
-def save_cache(cache):
-    with open(CACHE_FILE, "w", encoding="utf-8") as f:
-        json.dump(cache, f, indent=2)
+def realm_cache_path(realm):
+    return REALM_CACHE_DIR / realm.region / f"{realm.blizzard_id}.json"
+
+
+def load_realm_cache(realm):
+    path = realm_cache_path(realm)
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_realm_cache(realm, last_modified, index, item_ids):
+    """Guarda el índice reducido de un reino junto a su Last-Modified."""
+    path = realm_cache_path(realm)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({
+            "last_modified": last_modified,
+            "item_ids": sorted(item_ids) if item_ids is not None else None,
+            "ladders": True,
+            "prices": index_to_json(index),
+        }, f)
+    os.replace(tmp, path)
+
+
+def realm_cache_covers(cached, realm, item_ids):
+    """
+    El índice guardado sirve si corresponde al volcado que indica la
+    base de datos y contiene todos los items que se van a analizar
+    (con su escalera de precios; las cachés antiguas no la tienen).
+    """
+    if not cached or not realm.auctions_last_modified:
+        return False
+    if not cached.get("ladders"):
+        return False
+    if cached["last_modified"] != realm.auctions_last_modified:
+        return False
+    if cached["item_ids"] is None:
+        return True
+    return item_ids is not None and set(item_ids) <= set(cached["item_ids"])
 
 
 # ======================
 # REALMS
 # ======================
-def load_realms():
-    with open(REALMS_JSON, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    realms = {}
-    realms_data = data[:MAX_REALMS_TO_SCAN] if DEV_MODE else data
-
-    for r in realms_data:
-        realm, _ = ConnectedRealm.objects.update_or_create(
-            blizzard_id=r["id"],
-            defaults={"name": r["name"], "slug": r["slug"]},
-        )
-        realms[realm.name] = realm
-
+def load_realms(region=DEFAULT_REGION):
+    """
+    {nombre: ConnectedRealm} de la región (los nombres se repiten entre
+    regiones), uno por reino conectado. La relación reino -> reino
+    conectado la guarda `manage.py sync_realms`; si la región todavía no
+    se ha sincronizado, cada entrada del JSON se toma como su propio
+    reino conectado.
+    """
+    realms = load_connected_realms(region)
+    if not realms:
+        path = REGIONS[region]["realms_json"]
+        if not path.exists():
+            raise FileNotFoundError(f"Región {region} sin lista de reinos: falta {path.name} (ListRealms.ipynb)")
+        print(f"⚠️ Reinos de {region} sin sincronizar (manage.py sync_realms --region {region})")
+        entries = read_realm_list(path)
+        sync_realm_mapping(region, entries, {entry["id"]: entry["id"] for entry in entries})
+        realms = load_connected_realms(region)
+
+    if DEV_MODE:
+        realms = dict(list(realms.items())[:MAX_REALMS_TO_SCAN])
     return realms
 
 
 # ======================
 # ITEMS
 # ======================
-def get_item_id(token, item_name, cache):
-    if item_name in cache:
-        return cache[item_name]
-
-    r = requests.get(
-        f"https://{REGION}.api.blizzard.com/data/wow/search/item",
-        headers={"Authorization": f"Bearer {token}"},
-        params={
-            "namespace": f"static-{REGION}",
-            "locale": LOCALE,
-            "name.en_US": item_name,
-            "_pageSize": 5,
-        },
-    )
-    r.raise_for_status()
-
-    for res in r.json().get("results", []):
-        name = res["data"]["name"].get(LOCALE)
-        if name and name.lower() == item_name.lower():
-            cache[item_name] = res["data"]["id"]
-            return cache[item_name]
-
-    return None
+def get_item_id(token, item_name, region=DEFAULT_REGION):
+    return resolve_item_id(item_name, token, region, REGIONS[region]["locale"])
+
+
+def get_item_ids(token, item_names, region=DEFAULT_REGION):
+    return resolve_item_ids(item_names, token, region, REGIONS[region]["locale"])
 
 
 # ======================
 # AUCTIONS
 # ======================
-def get_all_auctions(token, realms, status):
-    all_auctions = {}
-    total = len(realms)
-
-    status.total_realms = total
-    status.processed_realms = 0
-    status.is_running = True
-    status.save()
-
-    for idx, realm in enumerate(realms.values(), start=1):
-        status.current_realm = realm.name
-        status.processed_realms = idx
-        status.save(update_fields=["current_realm", "processed_realms", "updated_at"])
-
-        r = requests.get(
-            f"https://{REGION}.api.blizzard.com/data/wow/connected-realm/{realm.blizzard_id}/auctions",
-            headers={"Authorization": f"Bearer {token}"},
-            params={"namespace": f"dynamic-{REGION}", "locale": LOCALE},
-        )
-        if r.status_code == 200:
-            all_auctions[realm.name] = r.json().get("auctions", [])
-
-    status.is_running = False
-    status.save(update_fields=["is_running", "updated_at"])
-    return all_auctions
-
-
-def get_price_per_unit(a):
-    if a.get("unit_price"):
-        return a["unit_price"]
-    if a.get("buyout"):
-        return a["buyout"] / a.get("quantity", 1)
-    return None
-
-
-def min_buyout(auctions, item_id):
-    prices = [
-        get_price_per_unit(a)
-        for a in auctions
-        if a.get("item", {}).get("id") == item_id and get_price_per_unit(a)
-    ]
-    return min(prices) if prices else None
+RealmFetch = namedtuple(
+    "RealmFetch", ["index", "last_modified", "not_modified", "archived", "timing"], defaults=(None,)
+)
 
 
-def min_buyout_by_realm(all_auctions, item_id):
+class WarmIndexes:
+    """
+    Último índice de cada reino en memoria (modo daemon): un 304 lo
+    reutiliza sin leer la caché de disco y el análisis usa los de todos
+    los reinos aunque en cada ciclo solo se pidan algunos.
+    """
+
+    def __init__(self):
+        self._entries = {}  # realm.pk -> (last_modified, item_ids cubiertos, índice)
+
+    def get(self, realm, item_ids):
+        entry = self._entries.get(realm.pk)
+        if entry is None or not realm.auctions_last_modified:
+            return None
+        last_modified, covered, index = entry
+        if last_modified != realm.auctions_last_modified:
+            return None
+        if covered is not None and (item_ids is None or not set(item_ids) <= covered):
+            return None
+        return index
+
+    def put(self, realm, last_modified, item_ids, index):
+        covered = set(item_ids) if item_ids is not None else None
+        self._entries[realm.pk] = (last_modified, covered, index)
+
+    def indexes(self, realms):
+        """{nombre: índice} de los reinos de `realms` que ya tienen índice."""
+        return {
+            name: self._entries[realm.pk][2]
+            for name, realm in realms.items()
+            if realm.pk in self._entries
+        }
+
+
+def fetch_realm_auctions(session, token, realm, item_ids=None, archive_dir=None, warm=None, retry_auth=True):
+    """
+    Descarga el volcado de un reino en streaming y lo reduce al vuelo.
+    Nunca se guarda el cuerpo completo: solo el índice de precios
+    de `item_ids` (o de todos los items si es None), con la escalera
+    de precios de cada item para calcular costes por cantidad.
+
+    Si el índice guardado (en `warm` o en disco) sigue siendo válido se
+    pide con If-Modified-Since; ante un 304 se reutiliza sin descargar nada.
+
+    Con `archive_dir`, las publicaciones reducidas del reino se guardan
+    comprimidas en esa carpeta (o se enlaza el último archivo si es 304).
+    El RealmFetch lleva los tiempos de red, parseo e índice del reino.
+    Si el token fue revocado (401) se renueva y se reintenta una vez.
+    """
+    started = time.perf_counter()
+    headers = {"Authorization": f"Bearer {token}"}
+    index = warm.get(realm, item_ids) if warm is not None else None
+    cached = None
+    if index is not None:
+        headers["If-Modified-Since"] = realm.auctions_last_modified
+    else:
+        cached = load_realm_cache(realm)
+        if realm_cache_covers(cached, realm, item_ids):
+            headers["If-Modified-Since"] = realm.auctions_last_modified
+
+    region = realm.region
+    with session.get(
+        f"https://{region}.api.blizzard.com/data/wow/connected-realm/{realm.blizzard_id}/auctions",
+        headers=headers,
+        params={"namespace": f"dynamic-{region}", "locale": REGIONS[region]["locale"]},
+        timeout=REALM_TIMEOUT,
+        stream=True,
+    ) as r:
+        latency = time.perf_counter() - started
+        if r.status_code == 401 and retry_auth:
+            token = renew_token(region, token)
+            return fetch_realm_auctions(session, token, realm, item_ids, archive_dir, warm, retry_auth=False)
+        if r.status_code == 304:
+            archived = (
+                archive_dir is not None
+                and reuse_realm(archive_dir, realm.blizzard_id, realm.auctions_last_modified) is not None
+            )
+            if index is None:
+                index = index_from_json(cached["prices"])
+                if warm is not None:
+                    warm.put(realm, realm.auctions_last_modified, cached["item_ids"], index)
+            timing = RealmTiming(time.perf_counter() - started, latency, latency, 0.0, 0.0, 0)
+            return RealmFetch(index, realm.auctions_last_modified, True, archived, timing)
+        if r.status_code != 200:
+            return None
+
+        listings = ListingCollector() if archive_dir is not None else None
+        auctions = MeteredStream(r.iter_content(chunk_size=STREAM_CHUNK_SIZE))
+        build_start = time.perf_counter()
+        index = build_price_index(auctions, item_ids, listings, ladders=True)
+        build_seconds = time.perf_counter() - build_start
+        last_modified = r.headers.get("Last-Modified", "")
+
+    save_realm_cache(realm, last_modified, index, item_ids)
+    if warm is not None:
+        warm.put(realm, last_modified, item_ids, index)
+    if listings is not None:
+        write_realm(archive_dir, realm.blizzard_id, listings)
+    timing = auctions.timing(started, latency, build_seconds)
+    return RealmFetch(index, last_modified, False, listings is not None, timing)
+
+
+def get_all_auctions(
+    token,
+    realms,
+    status,
+    concurrency=MAX_CONCURRENT_DOWNLOADS,
+    item_ids=None,
+    writer=None,
+    archive_dir=None,
+    progress=None,
+    warm=None,
+    metrics=None,
+):
+    """
+    Descarga las subastas de todos los reinos (de una región) en paralelo
+    y reduce cada volcado a un índice de precios ({reino: {item_id: PriceEntry}}).
+    Las descargas terminan en cualquier orden; el progreso se guarda
+    desde este hilo, como mucho una vez por PROGRESS_INTERVAL.
+
+    Con `progress` (un ProgressWriter compartido entre regiones) el total
+    de reinos ya está en `status` y solo se avanza; sin él se reinicia.
+    `warm` (WarmIndexes) guarda los índices en memoria entre escaneos y
+    `metrics` (ScanMetrics) recibe los tiempos de cada reino.
+    Los Last-Modified nuevos quedan encolados en `writer`.
+    Devuelve (indexes, downloaded, report): `downloaded` son los nombres
+    de los reinos con volcado nuevo en este escaneo (sin los 304) y
+    `report` el recuento de reinos descargados, sin cambios y fallidos. Con `archive_dir` se escribe además el
+    manifest de los reinos archivados.
+    """
+    if writer is None:
+        writer = ScanWriter()
+
+    indexes = {}
+    downloaded = set()
+    total = len(realms)
+    report = {"realms_total": total, "realms_downloaded": 0, "realms_not_modified": 0, "realms_failed": 0}
+    archived, archived_modified = {}, {}
+
+    if progress is None:
+        fields = reset_progress(status, list(realms.values()))
+        with writer.timed():
+            status.save(update_fields=fields)
+        progress = writer.progress(status)
+
+    session = get_session(concurrency)
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {
+            pool.submit(fetch_realm_auctions, session, token, realm, item_ids, archive_dir, warm): realm
+            for realm in realms.values()
+        }
+        for future in as_completed(futures):
+            realm = futures[future]
+            try:
+                fetched = future.result()
+            except (requests.RequestException, ValueError) as e:
+                print(f"⚠️ Error descargando {realm.name}: {e}")
+                fetched = None
+            if metrics is not None:
+                metrics.realm(realm, fetched)
+
+            if fetched is None:
+                report["realms_failed"] += 1
+            else:
+                indexes[realm.name] = fetched.index
+                if fetched.archived:
+                    archived[realm.blizzard_id] = realm.name
+                    archived_modified[realm.blizzard_id] = fetched.last_modified
+                if fetched.not_modified:
+                    report["realms_not_modified"] += 1
+                else:
+                    report["realms_downloaded"] += 1
+                    downloaded.add(realm.name)
+                    if fetched.last_modified != realm.auctions_last_modified:
+                        realm.auctions_last_modified = fetched.last_modified
+                        writer.update(realm, "auctions_last_modified")
+
+            progress.advance(f"{realm.name} ({realm.region.upper()})", realm.pk)
+
+    if archive_dir is not None:
+        write_manifest(archive_dir, archived, archived_modified)
+        report["realms_archived"] = len(archived)
+    return indexes, downloaded, report
+
+
+def min_buyout(index, item_id):
+    entry = index.get(item_id)
+    return entry.min_price if entry else None
+
+
+def min_buyout_by_realm(indexes, item_id):
     prices = {}
-    for realm, auctions in all_auctions.items():
-        p = min_buyout(auctions, item_id)
+    for realm, index in indexes.items():
+        p = min_buyout(index, item_id)
         if p:
             prices[realm] = p
     return prices
 
 
-def analyze_arbitrage(prices):
+def analyze_arbitrage(prices, sell_realms=PRIMARY_REALMS, cut=AH_CUT, min_profit=MIN_PROFIT):
+    """
+    Versión de un solo item de find_opportunities (mismas reglas).
+    `prices` es {reino: precio unitario}.
+    """
     if not prices:
         return None, None, None, 0
 
@@ -188,71 +438,440 @@ def analyze_arbitrage(prices):
     best_profit = 0
     best_sell_price = None
 
-    for realm in PRIMARY_REALMS:
+    for realm in (sell_realms if sell_realms is not None else prices):
         if realm in prices:
             sell_price = prices[realm]
-            profit = (sell_price - buy_price) * 0.95  # AH cut
+            profit = (sell_price - buy_price) * (1 - cut)  # AH cut
 
             if profit > best_profit:
                 best_profit = profit
                 best_target = realm
                 best_sell_price = sell_price
 
-    if best_profit < 1000:
+    if best_profit < min_profit:
         return buy_realm, None, None, 0
 
     return buy_realm, best_target, best_sell_price, best_profit
 
 
-def run_update_auctions():
-    status, _ = AuctionUpdateStatus.objects.get_or_create(id=1)
-    status.started_at = timezone.now()
-    status.is_running = True
-    status.processed_realms = 0
-    status.current_realm = ""
-    status.save()
-
-    token = get_token()
-    cache = load_cache()
-    realms = load_realms()
-    auctions = get_all_auctions(token, realms, status)
+# ======================
+# REGIONES
+# ======================
+RegionScan = namedtuple("RegionScan", ["region", "realms", "indexes", "downloaded", "resolved", "report"])
+
+
+def scan_region(
+    region, realms, names, known_ids, status, writer, progress, concurrency, archive_dir, warm=None, metrics=None
+):
+    """
+    Pipeline de una región en su propio hilo: token, IDs de los items
+    (con el locale de la región) y descarga de sus reinos con su propio
+    pool de `concurrency` descargas. Con las otras regiones solo comparte
+    `writer`, `progress`, `warm` y `metrics`, que admiten varios hilos.
+    """
+    start = time.perf_counter()
+    try:
+        token_start = time.perf_counter()
+        token = get_token(region)
+        if metrics is not None:
+            metrics.add("token", time.perf_counter() - token_start)
+        resolved = get_item_ids(token, names, region)
+        item_ids = known_ids | {i for i in resolved.values() if i}
+        indexes, downloaded, report = get_all_auctions(
+            token, realms, status, concurrency, item_ids, writer, archive_dir, progress, warm, metrics
+        )
+        if archive_dir is not None:
+            prune_archive(root=archive_dir.parent)
+        report["seconds"] = round(time.perf_counter() - start, 2)
+        return RegionScan(region, realms, indexes, downloaded, resolved, report)
+    finally:
+        # Conexiones abiertas por este hilo (resolver, token, progreso)
+        connections.close_all()
+
+
+def scan_regions(
+    regions,
+    realms_by_region,
+    names,
+    known_ids,
+    status,
+    writer,
+    concurrency=None,
+    archive_at=None,
+    warm=None,
+    metrics=None,
+):
+    """
+    Lanza todas las regiones a la vez y devuelve (scans, errors): los
+    RegionScan de las que terminaron, en el orden de `regions`, y
+    {región: error} de las que fallaron. Un fallo en una región no
+    detiene a las demás. El tiempo real de toda la fase es la etapa
+    "fetch" de `metrics`.
+    """
+    fetch_start = time.perf_counter()
+    budgets = {r: concurrency or REGIONS[r]["concurrency"] for r in regions}
+    # La sesión tiene un pool de conexiones por host, así que cada región
+    # descarga por el suyo
+    get_session(max(budgets.values()))
+    progress = writer.progress(status)
+
+    scans, errors = {}, {}
+    with ThreadPoolExecutor(max_workers=len(regions)) as pool:
+        futures = {
+            pool.submit(
+                scan_region,
+                region,
+                realms_by_region[region],
+                names,
+                known_ids,
+                status,
+                writer,
+                progress,
+                budgets[region],
+                scan_dir_for(archive_at, region_dir(region)) if archive_at else None,
+                warm,
+                metrics,
+            ): region
+            for region in regions
+        }
+        for future in as_completed(futures):
+            region = futures[future]
+            try:
+                scans[region] = future.result()
+            except Exception as e:
+                print(f"⚠️ Error escaneando la región {region.upper()}: {e}")
+                errors[region] = str(e)
+
+    if metrics is not None:
+        metrics.add("fetch", time.perf_counter() - fetch_start)
+    return [scans[r] for r in regions if r in scans], errors
+
+
+def region_sell_realms(region, sell_realms=None, any_sell_realm=False):
+    """
+    Reinos (conectados) de venta de una región (None = todos). Se pueden
+    dar con el nombre de cualquier reino del grupo.
+    """
+    if any_sell_realm:
+        return None
+    if sell_realms is None:
+        sell_realms = REGIONS[region]["sell_realms"]
+    return connected_realm_names(region, sell_realms)
+
+
+ScanTargets = namedtuple(
+    "ScanTargets",
+    ["tracked_items", "book", "unresolved", "recipe_ids", "names"],
+)
 
-    created = 0
-    tracked_items = TrackedItem.objects.filter(active=True).select_related("item")
-    print("Items que se van a escanear:", [t.item.name for t in tracked_items])
 
-    for tracked in tracked_items:
+def load_scan_targets():
+    """
+    Lo que se analiza en un escaneo: los items seguidos y las recetas,
+    cuyos items y materiales se cotizan aunque no estén seguidos.
+    `unresolved` son los items/materiales de receta sin Blizzard ID y
+    `names` todos los nombres que hay que resolver.
+    """
+    tracked_items = list(TrackedItem.objects.filter(active=True).select_related("item"))
+    book = load_recipe_book()
+    recipe_items = list(book.items.values()) + [m.item for m in book.materials.values() if m.item]
+    unresolved = [i for i in recipe_items if not i.blizzard_id]
+    unresolved += [m for m in book.materials.values() if not m.item and not m.blizzard_id]
+    recipe_ids = {i.blizzard_id for i in book.items.values()}
+    recipe_ids |= {material_blizzard_id(m) for m in book.materials.values()}
+    recipe_ids -= {None}
+
+    names = [t.item.name for t in tracked_items] + [obj.name for obj in unresolved]
+    return ScanTargets(tracked_items, book, unresolved, recipe_ids, names)
+
+
+def apply_item_ids(targets, scans, writer):
+    """
+    Guarda los Blizzard ID encontrados y devuelve (items, item_ids): los
+    items seguidos con ID y todos los IDs a analizar. Los IDs de item son
+    los mismos en todas las regiones: vale el primero que se encuentre.
+    """
+    resolved = {}
+    for scan in scans:
+        for name, item_id in scan.resolved.items():
+            if item_id and not resolved.get(name):
+                resolved[name] = item_id
+
+    items = []
+    for tracked in targets.tracked_items:
         item = tracked.item
 
-        item_id = get_item_id(token, item.name, cache)
+        item_id = resolved.get(item.name)
         if not item_id:
             continue
 
         # Guardar Blizzard Item ID en la base de datos
         if item.blizzard_id != item_id:
             item.blizzard_id = item_id
-            item.save(update_fields=["blizzard_id"])
+            writer.update(item, "blizzard_id")
+
+        items.append(item)
+
+    item_ids = {item.blizzard_id for item in items} | targets.recipe_ids
+    for obj in targets.unresolved:
+        if resolved.get(obj.name):
+            obj.blizzard_id = resolved[obj.name]
+            writer.update(obj, "blizzard_id")
+            item_ids.add(obj.blizzard_id)
+
+    return items, item_ids
+
+
+def analyze_region(region, realms, indexes, targets, items, item_ids, writer, scanned_at, rules, history=None):
+    """
+    Arbitraje y fabricación de una región con `indexes` ({reino: índice}),
+    encolados en `writer`. El histórico por reino se escribe con
+    `history` (por defecto los mismos índices). `rules` son las opciones
+    del escaneo (sell_realms, any_sell_realm, cut, min_profit, quantity).
+    Devuelve (snapshots creados, recetas valoradas).
+    """
+    region_sell = region_sell_realms(region, rules["sell_realms"], rules["any_sell_realm"])
+    writer.extend(history_rows(items, realms, indexes if history is None else history, scanned_at))
+
+    matrix = build_price_matrix(indexes, item_ids, rules["quantity"])
+    opportunities = find_opportunities(matrix, region_sell, rules["cut"], rules["min_profit"])
+
+    snapshots = []
+    for item in items:
+        opp = opportunities.get(item.blizzard_id)
+        if opp:
+            snapshots.append(ItemPriceSnapshot(
+                item=item,
+                region=region,
+                best_buy_realm=realms.get(opp.buy_realm),
+                best_sell_realm=realms.get(opp.sell_realm),
+                buy_price=opp.buy_price / 10000,
+                estimated_sell_price=opp.sell_price / 10000,
+                profit=opp.profit / 10000,
+            ))
+    writer.extend(snapshots)
+    writer.on_flush(partial(refresh_latest_opportunities, snapshots, items, region))
+
+    quotes = quote_recipe_book(targets.book, matrix, region_sell, rules["cut"])
+    writer.on_flush(partial(save_quotes, quotes, targets.book, realms, scanned_at, region))
+    return len(snapshots), len(quotes)
+
+
+def summarize(scans, errors, writer):
+    report = {
+        key: sum(scan.report.get(key, 0) for scan in scans)
+        for key in ("realms_total", "realms_downloaded", "realms_not_modified", "realms_failed", "realms_archived")
+    }
+    report["regions"] = {scan.region: scan.report for scan in scans}
+    report["region_errors"] = errors
+    report["created"] = sum(scan.report.get("created", 0) for scan in scans)
+    report["crafting_quotes"] = sum(scan.report.get("crafting_quotes", 0) for scan in scans)
+    report.update(writer.report())
+    return report
+
+
+def run_update_auctions(
+    concurrency=None,
+    status=None,
+    sell_realms=None,
+    cut=AH_CUT,
+    min_profit=MIN_PROFIT,
+    quantity=TARGET_QUANTITY,
+    regions=None,
+    any_sell_realm=False,
+):
+    """
+    Escaneo completo de `regions` (por defecto SCAN_REGIONS), todas en
+    paralelo. El progreso se escribe en `status`, que puede ser un
+    ScanJob; sin él se usa el AuctionUpdateStatus global.
+    `concurrency` son las descargas simultáneas de cada región (None = la
+    de REGIONS). `sell_realms` (None = los de cada región, `any_sell_realm`
+    = todos), `cut` y `min_profit` son las reglas del arbitraje, que nunca
+    cruza regiones; `quantity` son las unidades a comprar, y el precio de
+    compra es el coste medio de esas unidades en cada reino.
+    """
+    regions = list(dict.fromkeys(regions or SCAN_REGIONS))
+    rules = {
+        "sell_realms": sell_realms,
+        "any_sell_realm": any_sell_realm,
+        "cut": cut,
+        "min_profit": min_profit,
+        "quantity": quantity,
+    }
+
+    own_status = status is None
+    if own_status:
+        status, _ = AuctionUpdateStatus.objects.get_or_create(id=1)
+        status.started_at = timezone.now()
+        status.is_running = True
+
+    with ScanMetrics(ScanRun.FULL, status, regions) as metrics:
+        scanned_at = timezone.now()
+        with metrics.stage("realm_sync"):
+            realms_by_region = {region: load_realms(region) for region in regions}
+        writer = ScanWriter()
+
+        reset_progress(status, [realm for realms in realms_by_region.values() for realm in realms.values()])
+        status.save()
+
+        targets = load_scan_targets()
+        print("Items que se van a escanear:", [t.item.name for t in targets.tracked_items])
+
+        # Cada región resuelve los IDs con su locale antes de descargar: así
+        # cada volcado se reduce solo a los items que realmente se analizan.
+        scans, errors = scan_regions(
+            regions, realms_by_region, targets.names, targets.recipe_ids, status, writer, concurrency,
+            scanned_at if ARCHIVE_AUCTIONS else None, metrics=metrics,
+        )
+        if not scans:
+            raise RuntimeError(f"No se pudo escanear ninguna región: {errors}")
 
-        prices = min_buyout_by_realm(auctions, item_id)
-        buy, sell, sell_price, profit = analyze_arbitrage(prices)
+        items, item_ids = apply_item_ids(targets, scans, writer)
 
-        if sell:
-            ItemPriceSnapshot.objects.create(
-                item=item,
-                best_buy_realm=realms.get(buy),
-                best_sell_realm=realms.get(sell),
-                buy_price=prices[buy] / 10000,
-                estimated_sell_price=sell_price / 10000,
-                profit=profit / 10000,
-            )
-            created += 1
+        # El arbitraje y la fabricación se calculan región por región
+        with metrics.stage("analysis"):
+            for scan in scans:
+                # Los reinos sin cambios (304) ya tienen su histórico de este volcado
+                scan.report["created"], scan.report["crafting_quotes"] = analyze_region(
+                    scan.region, scan.realms, scan.indexes, targets, items, item_ids, writer, scanned_at, rules,
+                    history={name: index for name, index in scan.indexes.items() if name in scan.downloaded},
+                )
 
-    save_cache(cache)
+        with metrics.stage("db_write"):
+            writer.flush()
+        bump_generation()
 
-    status.is_running = False
-    status.save(update_fields=["is_running", "updated_at"])
+        if own_status:
+            status.is_running = False
+            status.save(update_fields=["is_running", "updated_at"])
 
-    return created
+        metrics.report = summarize(scans, errors, writer)
+        return metrics.report
+
+
+# ======================
+# DAEMON
+# ======================
+REALM_RELOAD_INTERVAL = 3600  # segundos entre relecturas de los ficheros de reinos
+DAEMON_MAX_SLEEP = 30  # segundos máximos entre comprobaciones del calendario
+DAEMON_BUSY_RETRY = 15  # segundos de espera si hay otro escaneo en curso
+
+
+class ScanDaemon:
+    """
+    Escaneo residente. Token, sesión HTTP e índices de cada reino se
+    quedan en memoria; cada reino se pide cuando RealmScheduler calcula
+    que Blizzard habrá publicado su siguiente volcado, y solo se
+    recalcula el análisis de las regiones en las que algún reino cambió.
+
+    Cada ciclo con reinos pendientes es un ScanJob normal (nunca corre a
+    la vez que el escaneo del dashboard). Los ciclos no se archivan: solo
+    contienen los reinos que tocaban.
+    """
+
+    def __init__(self, regions=None, concurrency=None, scheduler=None, **rules):
+        self.regions = list(dict.fromkeys(regions or SCAN_REGIONS))
+        self.concurrency = concurrency
+        self.rules = {
+            "sell_realms": None,
+            "any_sell_realm": False,
+            "cut": AH_CUT,
+            "min_profit": MIN_PROFIT,
+            "quantity": TARGET_QUANTITY,
+            **rules,
+        }
+        self.scheduler = scheduler or RealmScheduler()
+        self.warm = WarmIndexes()
+        self.realms_by_region = {}
+        self._realms_loaded_at = None
+
+    def realms(self):
+        return [realm for realms in self.realms_by_region.values() for realm in realms.values()]
+
+    def reload_realms(self, now=None):
+        now = now or timezone.now()
+        self.realms_by_region = {region: load_realms(region) for region in self.regions}
+        self.scheduler.sync(self.realms(), now)
+        self._realms_loaded_at = time.monotonic()
+
+    def pending(self, now=None):
+        """pks de los reinos que toca pedir; relee los reinos cada REALM_RELOAD_INTERVAL."""
+        if self._realms_loaded_at is None or time.monotonic() - self._realms_loaded_at >= REALM_RELOAD_INTERVAL:
+            self.reload_realms(now)
+        return self.scheduler.due(now or timezone.now())
+
+    def seconds_until_due(self, now=None):
+        next_due = self.scheduler.next_due()
+        if next_due is None:
+            return DAEMON_MAX_SLEEP
+        wait = (next_due - (now or timezone.now())).total_seconds()
+        return min(max(wait, 0), DAEMON_MAX_SLEEP)
+
+    def due_realms(self, now):
+        due = set(self.scheduler.due(now))
+        return {
+            region: {name: realm for name, realm in realms.items() if realm.pk in due}
+            for region, realms in self.realms_by_region.items()
+        }
+
+    def tick(self, status):
+        """
+        Un ciclo: pide los reinos pendientes de todas las regiones en
+        paralelo, reprograma cada uno y, si alguno cambió, guarda el
+        análisis de su región con los índices de todos sus reinos.
+        """
+        scanned_at = timezone.now()
+        due = {region: realms for region, realms in self.due_realms(scanned_at).items() if realms}
+        writer = ScanWriter()
+        if not due:
+            return {**summarize([], {}, writer), "changed_realms": 0}
+
+        with ScanMetrics(ScanRun.DAEMON, status, list(due)) as metrics:
+            reset_progress(status, [realm for realms in due.values() for realm in realms.values()])
+            status.save()
+
+            targets = load_scan_targets()
+            before = {realm.pk: realm.auctions_last_modified for realms in due.values() for realm in realms.values()}
+            scans, errors = scan_regions(
+                list(due), due, targets.names, targets.recipe_ids, status, writer, self.concurrency,
+                warm=self.warm, metrics=metrics,
+            )
+
+            now = timezone.now()
+            changed_by_region = {}
+            for realms in due.values():
+                for name, realm in realms.items():
+                    changed = realm.auctions_last_modified != before[realm.pk]
+                    self.scheduler.record(realm, changed, now)
+                    if changed:
+                        changed_by_region.setdefault(realm.region, set()).add(name)
+
+            items, item_ids = apply_item_ids(targets, scans, writer)
+            with metrics.stage("analysis"):
+                for scan in scans:
+                    changed = changed_by_region.get(scan.region)
+                    scan.report["changed_realms"] = len(changed or ())
+                    if not changed:
+                        continue
+                    scan.report["created"], scan.report["crafting_quotes"] = analyze_region(
+                        scan.region,
+                        self.realms_by_region[scan.region],
+                        self.warm.indexes(self.realms_by_region[scan.region]),
+                        targets, items, item_ids, writer, scanned_at, self.rules,
+                        history={name: index for name, index in scan.indexes.items() if name in scan.downloaded},
+                    )
+
+            with metrics.stage("db_write"):
+                writer.flush()
+            if changed_by_region:
+                bump_generation()
+
+            report = summarize(scans, errors, writer)
+            report["changed_realms"] = sum(len(names) for names in changed_by_region.values())
+            next_due = self.scheduler.next_due()
+            report["next_due"] = next_due.isoformat() if next_due else None
+            metrics.report = report
+            return report
 
 
 # ======================
@@ -261,13 +880,132 @@ def run_update_auctions():
 class Command(BaseCommand):
     help = "Update WoW auction data and arbitrage opportunities"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--region",
+            action="append",
+            dest="regions",
+            choices=list(REGIONS),
+            help=f"Región a escanear (repetible); todas corren en paralelo. Por defecto {', '.join(SCAN_REGIONS)}",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=None,
+            help="Número máximo de reinos descargándose a la vez en cada región (por defecto el de REGIONS)",
+        )
+        parser.add_argument(
+            "--sell-realm",
+            action="append",
+            dest="sell_realms",
+            help="Reino donde vender (repetible). Por defecto los sell_realms de cada región",
+        )
+        parser.add_argument(
+            "--any-sell-realm",
+            action="store_true",
+            help="Considera todos los reinos escaneados como destino de venta",
+        )
+        parser.add_argument("--cut", type=float, default=AH_CUT, help="Comisión de la casa de subastas")
+        parser.add_argument("--min-profit", type=float, default=MIN_PROFIT, help="Beneficio mínimo en cobre")
+        parser.add_argument(
+            "--daemon",
+            action="store_true",
+            help="Se queda residente y pide cada reino cuando se publica su volcado",
+        )
+        parser.add_argument(
+            "--quantity",
+            type=int,
+            default=TARGET_QUANTITY,
+            help="Unidades a comprar; el precio de compra tiene en cuenta la profundidad del mercado",
+        )
+
     def handle(self, *args, **options):
-        self.stdout.write("🚀 Updating auctions...")
+        if options["daemon"]:
+            return self.run_daemon(options)
 
-        try:
-            created = run_update_auctions()
-        except Exception as e:
-            self.stderr.write(self.style.ERROR(f"❌ Error: {e}"))
+        job, started = start_scan()
+        if not started:
+            self.stderr.write(self.style.WARNING(f"⏳ Ya hay un escaneo activo: {job}"))
             return
 
-        self.stdout.write(self.style.SUCCESS(f"✅ Done. Snapshots creados: {created}"))
+        self.stdout.write(f"🚀 Updating auctions... (job #{job.id})")
+
+        job = run_job(
+            job,
+            regions=options["regions"],
+            concurrency=options["concurrency"],
+            sell_realms=options["sell_realms"],
+            any_sell_realm=options["any_sell_realm"],
+            cut=options["cut"],
+            min_profit=options["min_profit"],
+            quantity=options["quantity"],
+        )
+        if job.status == job.FAILED:
+            self.stderr.write(self.style.ERROR(f"❌ Error: {job.error}"))
+            return
+
+        report = job.result
+
+        for region, region_report in report["regions"].items():
+            self.stdout.write(
+                f"🌍 {region.upper()} — reinos: {region_report['realms_total']} | "
+                f"descargados: {region_report['realms_downloaded']} | "
+                f"sin cambios: {region_report['realms_not_modified']} | "
+                f"fallidos: {region_report['realms_failed']} | {region_report['seconds']}s"
+            )
+        for region, error in report["region_errors"].items():
+            self.stderr.write(self.style.ERROR(f"❌ {region.upper()}: {error}"))
+        self.stdout.write(f"💾 Filas escritas: {report['rows_written']} en {report['db_seconds']}s de base de datos")
+        self.stdout.write(self.style.SUCCESS(f"✅ Done. Snapshots creados: {report['created']}"))
+
+    def run_daemon(self, options):
+        daemon = ScanDaemon(
+            regions=options["regions"],
+            concurrency=options["concurrency"],
+            sell_realms=options["sell_realms"],
+            any_sell_realm=options["any_sell_realm"],
+            cut=options["cut"],
+            min_profit=options["min_profit"],
+            quantity=options["quantity"],
+        )
+        self.stdout.write(f"🛰️ Daemon de escaneo iniciado ({', '.join(r.upper() for r in daemon.regions)})")
+
+        try:
+            while True:
+                close_old_connections()
+                # Un escaneo pedido desde el dashboard se ejecuta aquí igual
+                # que en scan_worker: sin worker se quedaría en cola para siempre
+                queued = claim_next_job()
+                if queued is not None:
+                    self.stdout.write(f"🚀 Ejecutando {queued} (en cola)")
+                    queued = run_job(queued)
+                    if queued.status == queued.FAILED:
+                        self.stderr.write(self.style.ERROR(f"❌ {queued} falló:\n{queued.error}"))
+                    else:
+                        self.stdout.write(self.style.SUCCESS(f"✅ {queued} terminado"))
+                    continue
+
+                if not daemon.pending():
+                    time.sleep(daemon.seconds_until_due())
+                    continue
+
+                job, created = enqueue_scan(start_running=True)
+                if not created:
+                    fail_stale_jobs()
+                    self.stderr.write(self.style.WARNING(f"⏳ Ya hay un escaneo activo: {job}"))
+                    time.sleep(DAEMON_BUSY_RETRY)
+                    continue
+
+                job = run_job(job, runner=daemon.tick)
+                if job.status == job.FAILED:
+                    self.stderr.write(self.style.ERROR(f"❌ {job} falló:\n{job.error}"))
+                    continue
+
+                report = job.result
+                self.stdout.write(
+                    f"🔄 {job}: {report['realms_total']} reinos pedidos | "
+                    f"{report['changed_realms']} con volcado nuevo | "
+                    f"snapshots: {report['created']} | próximo: {report.get('next_due') or '-'}"
+                )
+        except KeyboardInterrupt:
+            self.stdout.write("👋 Daemon detenido")
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 08:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0007_trackeditem_added_at_trackeditem_scanned_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='connectedrealm',
+            name='auctions_last_modified',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
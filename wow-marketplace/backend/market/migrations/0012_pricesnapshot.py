@@ -0,0 +1,30 @@
+# Generated by Django 6.0 on 2026-10-18 11:02
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0011_itemidlookup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('min_price', models.BigIntegerField()),
+                ('quantity', models.IntegerField()),
+                ('listings', models.IntegerField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_history', to='market.item')),
+                ('realm', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='market.connectedrealm')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['item', 'created_at'], name='pricesnap_item_time'), models.Index(fields=['item', 'realm', 'created_at'], name='pricesnap_item_realm_time')],
+            },
+        ),
+    ]
@@ -0,0 +1,99 @@
+# Generated by Django 6.0 on 2026-10-18 10:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_latest_opportunities(apps, schema_editor):
+    """Rellena la tabla con el snapshot más reciente de cada item."""
+    ItemPriceSnapshot = apps.get_model("market", "ItemPriceSnapshot")
+    LatestOpportunity = apps.get_model("market", "LatestOpportunity")
+
+    latest = {}
+    for snapshot in ItemPriceSnapshot.objects.order_by("item_id", "-created_at", "-id"):
+        latest.setdefault(snapshot.item_id, snapshot)
+
+    LatestOpportunity.objects.bulk_create(
+        [
+            LatestOpportunity(
+                item_id=s.item_id,
+                snapshot_id=s.id,
+                best_buy_realm_id=s.best_buy_realm_id,
+                best_sell_realm_id=s.best_sell_realm_id,
+                buy_price=s.buy_price,
+                estimated_sell_price=s.estimated_sell_price,
+                profit=s.profit,
+                created_at=s.created_at,
+            )
+            for s in latest.values()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0012_pricesnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LatestOpportunity',
+            fields=[
+                ('item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='latest_opportunity', serialize=False, to='market.item')),
+                ('buy_price', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('estimated_sell_price', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('profit', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('created_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='itempricesnapshot',
+            index=models.Index(fields=['-profit', '-id'], name='snapshot_profit'),
+        ),
+        migrations.AddIndex(
+            model_name='itempricesnapshot',
+            index=models.Index(fields=['best_sell_realm', '-profit'], name='snapshot_sell_realm_profit'),
+        ),
+        migrations.AddIndex(
+            model_name='itempricesnapshot',
+            index=models.Index(fields=['best_buy_realm', '-profit'], name='snapshot_buy_realm_profit'),
+        ),
+        migrations.AddIndex(
+            model_name='itempricesnapshot',
+            index=models.Index(fields=['item', '-created_at'], name='snapshot_item_time'),
+        ),
+        migrations.AddIndex(
+            model_name='itempricesnapshot',
+            index=models.Index(fields=['-created_at'], name='snapshot_time'),
+        ),
+        migrations.AddField(
+            model_name='latestopportunity',
+            name='best_buy_realm',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='market.connectedrealm'),
+        ),
+        migrations.AddField(
+            model_name='latestopportunity',
+            name='best_sell_realm',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='market.connectedrealm'),
+        ),
+        migrations.AddField(
+            model_name='latestopportunity',
+            name='snapshot',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='market.itempricesnapshot'),
+        ),
+        migrations.AddIndex(
+            model_name='latestopportunity',
+            index=models.Index(fields=['-profit', '-item'], name='latest_opp_profit'),
+        ),
+        migrations.AddIndex(
+            model_name='latestopportunity',
+            index=models.Index(fields=['best_sell_realm', '-profit'], name='latest_opp_sell_realm_profit'),
+        ),
+        migrations.AddIndex(
+            model_name='latestopportunity',
+            index=models.Index(fields=['best_buy_realm', '-profit'], name='latest_opp_buy_realm_profit'),
+        ),
+        migrations.RunPython(fill_latest_opportunities, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0 on 2026-10-18 10:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0013_latest_opportunity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(max_length=20)),
+                ('resolution', models.CharField(choices=[('hour', 'Hora'), ('day', 'Día')], max_length=4)),
+                ('bucket', models.DateTimeField()),
+                ('minimum', models.FloatField()),
+                ('maximum', models.FloatField()),
+                ('mean', models.FloatField()),
+                ('samples', models.PositiveIntegerField()),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='market.item')),
+                ('realm', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='market.connectedrealm')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['resolution', 'bucket'], name='rollup_resolution_bucket')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('realm__isnull', False)), fields=('item', 'realm', 'metric', 'resolution', 'bucket'), name='unique_realm_rollup'), models.UniqueConstraint(condition=models.Q(('realm__isnull', True)), fields=('item', 'metric', 'resolution', 'bucket'), name='unique_item_rollup')],
+            },
+        ),
+    ]
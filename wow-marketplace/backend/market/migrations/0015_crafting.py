@@ -0,0 +1,42 @@
+# Generated by Django 6.0 on 2026-10-18 11:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0014_pricerollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='material',
+            name='blizzard_id',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='material',
+            name='item',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='as_material', to='market.item'),
+        ),
+        migrations.CreateModel(
+            name='CraftingQuote',
+            fields=[
+                ('item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='crafting_quote', serialize=False, to='market.item')),
+                ('craft_cost', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('buy_price', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('sell_price', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('margin', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('profit', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('missing_materials', models.JSONField(blank=True, default=list)),
+                ('updated_at', models.DateTimeField()),
+                ('buy_realm', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='market.connectedrealm')),
+                ('sell_realm', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='market.connectedrealm')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-margin'], name='craftquote_margin')],
+            },
+        ),
+    ]
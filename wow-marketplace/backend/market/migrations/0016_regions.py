@@ -0,0 +1,137 @@
+# Generated by Django 6.0 on 2026-10-18 12:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+REGION_CHOICES = [('us', 'US'), ('eu', 'EU'), ('kr', 'KR'), ('tw', 'TW')]
+
+
+def fill_latest_opportunities(apps, schema_editor):
+    """Rellena la tabla con el snapshot más reciente de cada item y región."""
+    ItemPriceSnapshot = apps.get_model("market", "ItemPriceSnapshot")
+    LatestOpportunity = apps.get_model("market", "LatestOpportunity")
+
+    latest = {}
+    for snapshot in ItemPriceSnapshot.objects.order_by("item_id", "region", "-created_at", "-id"):
+        latest.setdefault((snapshot.item_id, snapshot.region), snapshot)
+
+    LatestOpportunity.objects.bulk_create(
+        [
+            LatestOpportunity(
+                item_id=s.item_id,
+                region=s.region,
+                snapshot_id=s.id,
+                best_buy_realm_id=s.best_buy_realm_id,
+                best_sell_realm_id=s.best_sell_realm_id,
+                buy_price=s.buy_price,
+                estimated_sell_price=s.estimated_sell_price,
+                profit=s.profit,
+                created_at=s.created_at,
+            )
+            for s in latest.values()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0015_crafting'),
+    ]
+
+    operations = [
+        # Reinos: el ID de Blizzard solo es único dentro de su región
+        migrations.AddField(
+            model_name='connectedrealm',
+            name='region',
+            field=models.CharField(choices=REGION_CHOICES, default='us', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='connectedrealm',
+            name='blizzard_id',
+            field=models.IntegerField(),
+        ),
+        migrations.AddConstraint(
+            model_name='connectedrealm',
+            constraint=models.UniqueConstraint(fields=('region', 'blizzard_id'), name='unique_region_realm'),
+        ),
+        # Caché de IDs por región
+        migrations.AddField(
+            model_name='itemidlookup',
+            name='region',
+            field=models.CharField(choices=REGION_CHOICES, default='us', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='itemidlookup',
+            name='name',
+            field=models.CharField(max_length=255),
+        ),
+        migrations.AddConstraint(
+            model_name='itemidlookup',
+            constraint=models.UniqueConstraint(fields=('region', 'name'), name='unique_region_item_lookup'),
+        ),
+        migrations.AddField(
+            model_name='itempricesnapshot',
+            name='region',
+            field=models.CharField(choices=REGION_CHOICES, default='us', max_length=10),
+        ),
+        # LatestOpportunity y CraftingQuote pasan de una fila por item a una
+        # por item y región. Son tablas derivadas: se recrean, la primera se
+        # rellena desde los snapshots y la segunda en el próximo escaneo.
+        migrations.DeleteModel(
+            name='LatestOpportunity',
+        ),
+        migrations.DeleteModel(
+            name='CraftingQuote',
+        ),
+        migrations.CreateModel(
+            name='LatestOpportunity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('region', models.CharField(choices=REGION_CHOICES, default='us', max_length=10)),
+                ('buy_price', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('estimated_sell_price', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('profit', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('created_at', models.DateTimeField()),
+                ('best_buy_realm', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='market.connectedrealm')),
+                ('best_sell_realm', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='market.connectedrealm')),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='latest_opportunities', to='market.item')),
+                ('snapshot', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='market.itempricesnapshot')),
+            ],
+            options={
+                'indexes': [
+                    models.Index(fields=['-profit', '-id'], name='latest_opp_profit'),
+                    models.Index(fields=['best_sell_realm', '-profit'], name='latest_opp_sell_realm_profit'),
+                    models.Index(fields=['best_buy_realm', '-profit'], name='latest_opp_buy_realm_profit'),
+                ],
+                'constraints': [
+                    models.UniqueConstraint(fields=('item', 'region'), name='unique_latest_opportunity'),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name='CraftingQuote',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('region', models.CharField(choices=REGION_CHOICES, default='us', max_length=10)),
+                ('craft_cost', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('buy_price', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('sell_price', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('margin', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('profit', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('missing_materials', models.JSONField(blank=True, default=list)),
+                ('updated_at', models.DateTimeField()),
+                ('buy_realm', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='market.connectedrealm')),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='crafting_quotes', to='market.item')),
+                ('sell_realm', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='market.connectedrealm')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-margin'], name='craftquote_margin')],
+                'constraints': [
+                    models.UniqueConstraint(fields=('item', 'region'), name='unique_crafting_quote'),
+                ],
+            },
+        ),
+        migrations.RunPython(fill_latest_opportunities, migrations.RunPython.noop),
+    ]
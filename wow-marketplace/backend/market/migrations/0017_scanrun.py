@@ -0,0 +1,63 @@
+# Generated by Django 6.0 on 2026-10-18 12:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0016_regions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScanRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('full', 'Completo'), ('daemon', 'Daemon')], default='full', max_length=10)),
+                ('status', models.CharField(choices=[('ok', 'Correcto'), ('failed', 'Fallido')], default='ok', max_length=10)),
+                ('regions', models.JSONField(default=list)),
+                ('started_at', models.DateTimeField()),
+                ('finished_at', models.DateTimeField()),
+                ('seconds', models.FloatField()),
+                ('stages', models.JSONField(default=dict)),
+                ('realms_total', models.IntegerField(default=0)),
+                ('realms_downloaded', models.IntegerField(default=0)),
+                ('realms_not_modified', models.IntegerField(default=0)),
+                ('realms_failed', models.IntegerField(default=0)),
+                ('bytes_downloaded', models.BigIntegerField(default=0)),
+                ('rows_written', models.IntegerField(default=0)),
+                ('peak_memory_kb', models.IntegerField(blank=True, null=True)),
+                ('error_count', models.IntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('job', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='runs', to='market.scanjob')),
+            ],
+            options={
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ScanRealmTiming',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('outcome', models.CharField(choices=[('downloaded', 'Descargado'), ('not_modified', 'Sin cambios'), ('failed', 'Fallido')], max_length=12)),
+                ('seconds', models.FloatField(blank=True, null=True)),
+                ('latency', models.FloatField(blank=True, null=True)),
+                ('download', models.FloatField(blank=True, null=True)),
+                ('parse', models.FloatField(blank=True, null=True)),
+                ('index', models.FloatField(blank=True, null=True)),
+                ('bytes', models.BigIntegerField(default=0)),
+                ('realm', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='market.connectedrealm')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='realm_timings', to='market.scanrun')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='scanrun',
+            index=models.Index(fields=['-started_at', '-id'], name='scanrun_started'),
+        ),
+        migrations.AddIndex(
+            model_name='scanrealmtiming',
+            index=models.Index(fields=['realm', 'run'], name='realmtiming_realm_run'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 6.0 on 2026-10-18 11:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0017_scanrun'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Realm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('region', models.CharField(choices=[('us', 'US'), ('eu', 'EU'), ('kr', 'KR'), ('tw', 'TW')], default='us', max_length=10)),
+                ('blizzard_id', models.IntegerField()),
+                ('name', models.CharField(max_length=100)),
+                ('slug', models.CharField(max_length=100)),
+                ('connected_realm', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='realms', to='market.connectedrealm')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('region', 'blizzard_id'), name='unique_region_member_realm')],
+            },
+        ),
+    ]
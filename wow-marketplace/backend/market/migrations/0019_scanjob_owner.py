@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0018_realm'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scanjob',
+            name='owner',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 6.0 on 2026-10-18 13:40
+
+from django.db import migrations, models
+
+
+def fill_realm_regions(apps, schema_editor):
+    """Los agregados por reino toman la región de su reino."""
+    ConnectedRealm = apps.get_model("market", "ConnectedRealm")
+    PriceRollup = apps.get_model("market", "PriceRollup")
+
+    for region in ConnectedRealm.objects.values_list("region", flat=True).distinct():
+        PriceRollup.objects.filter(realm__region=region).update(region=region)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0019_scanjob_owner'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pricerollup',
+            name='region',
+            field=models.CharField(choices=[('us', 'US'), ('eu', 'EU'), ('kr', 'KR'), ('tw', 'TW')], default='us', max_length=10),
+        ),
+        migrations.RunPython(fill_realm_regions, migrations.RunPython.noop),
+        migrations.RemoveConstraint(
+            model_name='pricerollup',
+            name='unique_item_rollup',
+        ),
+        migrations.AddConstraint(
+            model_name='pricerollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('realm__isnull', True)), fields=('item', 'region', 'metric', 'resolution', 'bucket'), name='unique_item_region_rollup'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 15:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0020_pricerollup_region'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scanjob',
+            name='pending_realms',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
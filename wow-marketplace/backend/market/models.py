@@ -1,4 +1,15 @@
 from django.db import models
+from django.utils import timezone
+
+# Regiones de la API de Blizzard. Los IDs de reinos conectados solo son
+# únicos dentro de una región, y no se puede comerciar entre regiones.
+REGION_CHOICES = [
+    ("us", "US"),
+    ("eu", "EU"),
+    ("kr", "KR"),
+    ("tw", "TW"),
+]
+DEFAULT_REGION = "us"
 
 
 # =====================================================
@@ -17,6 +28,156 @@ class AuctionUpdateStatus(models.Model):
         return (self.updated_at - self.started_at).total_seconds()
 
 
+# =====================================================
+# SCAN JOBS
+# =====================================================
+class ScanJob(models.Model):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "En cola"),
+        (RUNNING, "En curso"),
+        (DONE, "Terminado"),
+        (FAILED, "Fallido"),
+    ]
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    # True mientras está en cola o en curso; solo puede haber uno activo
+    active = models.BooleanField(default=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Latido: ProgressWriter lo refresca con cada reino procesado
+    updated_at = models.DateTimeField(auto_now=True)
+    # Proceso que lo ejecuta ("host:pid")
+    owner = models.CharField(max_length=100, blank=True)
+
+    total_realms = models.IntegerField(default=0)
+    current_realm = models.CharField(max_length=100, blank=True)
+    processed_realms = models.IntegerField(default=0)
+    # pks de los ConnectedRealm que faltan por descargar (para el ETA)
+    pending_realms = models.JSONField(default=list, blank=True)
+
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["active"],
+                condition=models.Q(active=True),
+                name="single_active_scan_job",
+            )
+        ]
+
+    def __str__(self):
+        return f"Scan #{self.id} ({self.status})"
+
+    def elapsed_seconds(self):
+        if not self.started_at:
+            return 0
+        end = self.finished_at or self.updated_at
+        return (end - self.started_at).total_seconds()
+
+
+class ScanRun(models.Model):
+    """
+    Métricas de un escaneo (completo o ciclo del daemon): segundos por
+    etapa, totales de reinos y bytes, pico de memoria y errores. Los
+    tiempos de cada reino están en ScanRealmTiming.
+
+    `stages`: token, realm_sync, fetch, analysis y db_write son tiempo
+    real de cada fase; download, parse e index suman lo que tardó cada
+    reino (se solapan entre hilos).
+    """
+    FULL = "full"
+    DAEMON = "daemon"
+    KIND_CHOICES = [(FULL, "Completo"), (DAEMON, "Daemon")]
+
+    OK = "ok"
+    FAILED = "failed"
+    STATUS_CHOICES = [(OK, "Correcto"), (FAILED, "Fallido")]
+
+    job = models.ForeignKey(ScanJob, null=True, blank=True, on_delete=models.SET_NULL, related_name="runs")
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default=FULL)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=OK)
+    regions = models.JSONField(default=list)
+
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField()
+    seconds = models.FloatField()
+    stages = models.JSONField(default=dict)
+
+    realms_total = models.IntegerField(default=0)
+    realms_downloaded = models.IntegerField(default=0)
+    realms_not_modified = models.IntegerField(default=0)
+    realms_failed = models.IntegerField(default=0)
+    bytes_downloaded = models.BigIntegerField(default=0)
+    rows_written = models.IntegerField(default=0)
+
+    peak_memory_kb = models.IntegerField(null=True, blank=True)  # pico del proceso (ru_maxrss)
+    error_count = models.IntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ["-started_at"]
+        indexes = [
+            models.Index(fields=["-started_at", "-id"], name="scanrun_started"),
+        ]
+
+    def __str__(self):
+        return f"Run #{self.id} {self.kind} ({self.status}, {self.seconds:.1f}s)"
+
+
+class ScanRealmTiming(models.Model):
+    """Tiempos y tamaño de la descarga de un reino en un ScanRun."""
+    DOWNLOADED = "downloaded"
+    NOT_MODIFIED = "not_modified"
+    FAILED = "failed"
+    OUTCOME_CHOICES = [
+        (DOWNLOADED, "Descargado"),
+        (NOT_MODIFIED, "Sin cambios"),
+        (FAILED, "Fallido"),
+    ]
+
+    run = models.ForeignKey(ScanRun, on_delete=models.CASCADE, related_name="realm_timings")
+    realm = models.ForeignKey("ConnectedRealm", on_delete=models.CASCADE, related_name="+")
+    outcome = models.CharField(max_length=12, choices=OUTCOME_CHOICES)
+
+    seconds = models.FloatField(null=True, blank=True)  # total del reino
+    latency = models.FloatField(null=True, blank=True)  # hasta recibir las cabeceras
+    download = models.FloatField(null=True, blank=True)  # latencia + lectura del cuerpo
+    parse = models.FloatField(null=True, blank=True)
+    index = models.FloatField(null=True, blank=True)
+    bytes = models.BigIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["realm", "run"], name="realmtiming_realm_run"),
+        ]
+
+    def __str__(self):
+        return f"{self.realm_id} @ run {self.run_id}: {self.outcome}"
+
+
+# =====================================================
+# API TOKEN
+# =====================================================
+class ApiToken(models.Model):
+    """Último token OAuth de Blizzard, compartido entre procesos."""
+    region = models.CharField(max_length=10, unique=True)
+    access_token = models.CharField(max_length=255)
+    expires_at = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.region} (expira {self.expires_at:%d/%m %H:%M})"
+
+
 # =====================================================
 # PROFESSIONS
 # =====================================================
@@ -48,8 +209,36 @@ class Item(models.Model):
         ordering = ["name"]
 
 
+class ItemIdLookup(models.Model):
+    """
+    Caché nombre -> Blizzard item ID por región (cada región busca con su
+    locale); blizzard_id NULL = no encontrado.
+    """
+    region = models.CharField(max_length=10, choices=REGION_CHOICES, default=DEFAULT_REGION)
+    name = models.CharField(max_length=255)
+    blizzard_id = models.IntegerField(null=True, blank=True)
+    checked_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["region", "name"], name="unique_region_item_lookup"),
+        ]
+
+    def __str__(self):
+        return f"[{self.region}] {self.name} -> {self.blizzard_id or '-'}"
+
+
 class Material(models.Model):
     name = models.CharField(max_length=255, unique=True)
+    blizzard_id = models.IntegerField(null=True, blank=True)
+    # Si el material se puede fabricar, el Item con su receta
+    item = models.ForeignKey(
+        Item,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="as_material",
+    )
 
     def __str__(self):
         return self.name
@@ -68,16 +257,47 @@ class ItemMaterial(models.Model):
 # REALMS & SNAPSHOTS
 # =====================================================
 class ConnectedRealm(models.Model):
-    blizzard_id = models.IntegerField(unique=True)
+    region = models.CharField(max_length=10, choices=REGION_CHOICES, default=DEFAULT_REGION)
+    blizzard_id = models.IntegerField()
     name = models.CharField(max_length=100)
     slug = models.CharField(max_length=100)
+    # Cabecera Last-Modified del último volcado de subastas descargado
+    auctions_last_modified = models.CharField(max_length=64, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["region", "blizzard_id"], name="unique_region_realm"),
+        ]
 
     def __str__(self):
         return self.name
 
 
+class Realm(models.Model):
+    """
+    Reino de la lista de la región (wow_realms_connected*.json) y el
+    reino conectado al que pertenece; varios reinos comparten la misma
+    casa de subastas. Lo rellena `manage.py sync_realms`.
+    """
+    region = models.CharField(max_length=10, choices=REGION_CHOICES, default=DEFAULT_REGION)
+    blizzard_id = models.IntegerField()
+    name = models.CharField(max_length=100)
+    slug = models.CharField(max_length=100)
+    connected_realm = models.ForeignKey(ConnectedRealm, on_delete=models.CASCADE, related_name="realms")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["region", "blizzard_id"], name="unique_region_member_realm"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} → {self.connected_realm_id}"
+
+
 class ItemPriceSnapshot(models.Model):
     item = models.ForeignKey(Item, on_delete=models.CASCADE)
+    # Compra y venta siempre en reinos de esta región
+    region = models.CharField(max_length=10, choices=REGION_CHOICES, default=DEFAULT_REGION)
     best_buy_realm = models.ForeignKey(
         ConnectedRealm,
         related_name="buy_snapshots",
@@ -95,10 +315,161 @@ class ItemPriceSnapshot(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["-profit", "-id"], name="snapshot_profit"),
+            models.Index(fields=["best_sell_realm", "-profit"], name="snapshot_sell_realm_profit"),
+            models.Index(fields=["best_buy_realm", "-profit"], name="snapshot_buy_realm_profit"),
+            models.Index(fields=["item", "-created_at"], name="snapshot_item_time"),
+            models.Index(fields=["-created_at"], name="snapshot_time"),
+        ]
+
     def __str__(self):
         return f"{self.item.name} | {self.profit}g"
 
 
+class LatestOpportunity(models.Model):
+    """
+    Última oportunidad de cada item en cada región (una fila por item y
+    región). Se actualiza en la misma transacción que guarda los
+    snapshots de un escaneo, así el top de oportunidades actuales no
+    depende de cuánto histórico haya.
+    """
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name="latest_opportunities")
+    region = models.CharField(max_length=10, choices=REGION_CHOICES, default=DEFAULT_REGION)
+    snapshot = models.OneToOneField(ItemPriceSnapshot, on_delete=models.CASCADE, related_name="+")
+    best_buy_realm = models.ForeignKey(ConnectedRealm, on_delete=models.CASCADE, related_name="+")
+    best_sell_realm = models.ForeignKey(ConnectedRealm, on_delete=models.CASCADE, related_name="+")
+    buy_price = models.DecimalField(max_digits=12, decimal_places=2)
+    estimated_sell_price = models.DecimalField(max_digits=12, decimal_places=2)
+    profit = models.DecimalField(max_digits=12, decimal_places=2)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["item", "region"], name="unique_latest_opportunity"),
+        ]
+        indexes = [
+            models.Index(fields=["-profit", "-id"], name="latest_opp_profit"),
+            models.Index(fields=["best_sell_realm", "-profit"], name="latest_opp_sell_realm_profit"),
+            models.Index(fields=["best_buy_realm", "-profit"], name="latest_opp_buy_realm_profit"),
+        ]
+
+    def __str__(self):
+        return f"{self.item_id} [{self.region}] | {self.profit}g"
+
+
+# =====================================================
+# FABRICACIÓN
+# =====================================================
+class CraftingQuote(models.Model):
+    """
+    Coste de fabricar un item frente a comprarlo en una región,
+    recalculado en cada escaneo para todos los items con receta.
+    Precios en oro.
+    """
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name="crafting_quotes")
+    region = models.CharField(max_length=10, choices=REGION_CHOICES, default=DEFAULT_REGION)
+    craft_cost = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    buy_price = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    buy_realm = models.ForeignKey(
+        ConnectedRealm, null=True, blank=True, on_delete=models.SET_NULL, related_name="+"
+    )
+    sell_price = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    sell_realm = models.ForeignKey(
+        ConnectedRealm, null=True, blank=True, on_delete=models.SET_NULL, related_name="+"
+    )
+    margin = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    profit = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    missing_materials = models.JSONField(default=list, blank=True)
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["item", "region"], name="unique_crafting_quote"),
+        ]
+        indexes = [
+            models.Index(fields=["-margin"], name="craftquote_margin"),
+        ]
+
+    def __str__(self):
+        return f"{self.item_id} [{self.region}] | margen {self.margin}g"
+
+
+# =====================================================
+# PRECIOS CRUDOS POR REINO
+# =====================================================
+class PriceSnapshot(models.Model):
+    """
+    Precio mínimo, cantidad y publicaciones de un item en un reino en un
+    escaneo. Solo se añaden filas; precios en cobre entero.
+    """
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name="price_history")
+    realm = models.ForeignKey(ConnectedRealm, on_delete=models.CASCADE, related_name="+")
+    min_price = models.BigIntegerField()
+    quantity = models.IntegerField()
+    listings = models.IntegerField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["item", "created_at"], name="pricesnap_item_time"),
+            models.Index(fields=["item", "realm", "created_at"], name="pricesnap_item_realm_time"),
+        ]
+
+    def __str__(self):
+        return f"{self.item_id} @ {self.realm_id}: {self.min_price}"
+
+
+# =====================================================
+# AGREGADOS DEL HISTÓRICO
+# =====================================================
+class PriceRollup(models.Model):
+    """
+    Mínimo, máximo, media y número de muestras de una métrica de un item
+    en una hora o un día. Sustituye a las filas crudas antiguas de
+    PriceSnapshot (métrica min_price, por reino) e ItemPriceSnapshot
+    (profit, buy_price y sell_price, sin reino pero por región).
+    """
+    HOUR = "hour"
+    DAY = "day"
+    RESOLUTION_CHOICES = [(HOUR, "Hora"), (DAY, "Día")]
+
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name="rollups")
+    realm = models.ForeignKey(
+        ConnectedRealm, null=True, blank=True, on_delete=models.CASCADE, related_name="+"
+    )
+    region = models.CharField(max_length=10, choices=REGION_CHOICES, default=DEFAULT_REGION)
+    metric = models.CharField(max_length=20)
+    resolution = models.CharField(max_length=4, choices=RESOLUTION_CHOICES)
+    bucket = models.DateTimeField()  # inicio de la hora o del día (UTC)
+
+    minimum = models.FloatField()
+    maximum = models.FloatField()
+    mean = models.FloatField()
+    samples = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["item", "realm", "metric", "resolution", "bucket"],
+                condition=models.Q(realm__isnull=False),
+                name="unique_realm_rollup",
+            ),
+            models.UniqueConstraint(
+                fields=["item", "region", "metric", "resolution", "bucket"],
+                condition=models.Q(realm__isnull=True),
+                name="unique_item_region_rollup",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["resolution", "bucket"], name="rollup_resolution_bucket"),
+        ]
+
+    def __str__(self):
+        return f"{self.item_id} {self.metric} {self.resolution} {self.bucket:%Y-%m-%d %H:%M}"
+
+
 # =====================================================
 # TRACKED ITEMS
 # =====================================================
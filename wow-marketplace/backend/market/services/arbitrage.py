@@ -0,0 +1,109 @@
+"""
+Motor de arbitraje vectorizado.
+
+Se construye una matriz densa items x reinos con el precio unitario
+mínimo (NaN = sin oferta) y el mejor par compra/venta de todos los
+items se calcula de una vez con NumPy.
+
+Para el lado de compra se usa una segunda matriz con el precio unitario
+medio de comprar `quantity` unidades según la escalera de precios de
+cada reino, así una publicación suelta muy barata no decide el reino
+de compra.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+AH_CUT = 0.05  # comisión de la casa de subastas
+MIN_PROFIT = 1000  # cobre
+TARGET_QUANTITY = 1  # unidades a comprar por operación
+
+Opportunity = namedtuple(
+    "Opportunity", ["item_id", "buy_realm", "buy_price", "sell_realm", "sell_price", "profit"]
+)
+
+
+class PriceMatrix:
+    def __init__(self, item_ids, realms, prices, buy_prices=None, quantity=1):
+        self.item_ids = item_ids
+        self.realms = realms
+        self.prices = prices  # float64[len(item_ids), len(realms)]
+        # coste unitario medio de comprar `quantity` unidades (NaN = sin profundidad)
+        self.buy_prices = prices if buy_prices is None else buy_prices
+        self.quantity = quantity
+
+    def column_mask(self, realms):
+        """Máscara booleana de columnas; None = todos los reinos."""
+        if realms is None:
+            return np.ones(len(self.realms), dtype=bool)
+        wanted = set(realms)
+        return np.array([realm in wanted for realm in self.realms], dtype=bool)
+
+
+def build_price_matrix(indexes, item_ids, quantity=TARGET_QUANTITY):
+    """
+    `indexes` es {reino: {item_id: PriceEntry}} tal como sale del escaneo.
+    Con `quantity` > 1 la matriz de compra usa la escalera de precios de
+    cada entrada; las entradas sin escalera caen al precio mínimo.
+    """
+    item_ids = list(item_ids)
+    realms = list(indexes)
+    row_of = {item_id: i for i, item_id in enumerate(item_ids)}
+
+    prices = np.full((len(item_ids), len(realms)), np.nan)
+    buy_prices = np.full_like(prices, np.nan) if quantity > 1 else None
+    for col, realm in enumerate(realms):
+        for item_id, entry in indexes[realm].items():
+            row = row_of.get(item_id)
+            if row is None:
+                continue
+            prices[row, col] = entry.min_price
+            if buy_prices is not None:
+                unit_cost = entry.unit_cost(quantity)
+                if unit_cost is not None:
+                    buy_prices[row, col] = unit_cost
+
+    return PriceMatrix(item_ids, realms, prices, buy_prices, quantity)
+
+
+def find_opportunities(matrix, sell_realms=None, cut=AH_CUT, min_profit=MIN_PROFIT):
+    """
+    Para cada item: compra en el reino donde `matrix.quantity` unidades
+    salen más baratas, venta en el reino más caro de `sell_realms`.
+    buy_price es el coste unitario medio y
+    beneficio = (venta - compra) * (1 - cut) * quantity.
+    Devuelve {item_id: Opportunity} solo con los que superan `min_profit`.
+    """
+    prices = matrix.prices
+    if prices.size == 0:
+        return {}
+
+    buy_prices = matrix.buy_prices
+    buy = np.where(np.isnan(buy_prices), np.inf, buy_prices)
+    buy_col = buy.argmin(axis=1)
+    buy_price = buy[np.arange(len(buy)), buy_col]
+
+    sell_cols = np.flatnonzero(matrix.column_mask(sell_realms))
+    if sell_cols.size == 0:
+        return {}
+    sell = np.where(np.isnan(prices[:, sell_cols]), -np.inf, prices[:, sell_cols])
+    sell_local = sell.argmax(axis=1)
+    sell_price = sell[np.arange(len(sell)), sell_local]
+    sell_col = sell_cols[sell_local]
+
+    with np.errstate(invalid="ignore"):
+        profit = (sell_price - buy_price) * (1 - cut) * matrix.quantity
+    profitable = np.isfinite(profit) & (profit > 0) & (profit >= min_profit)
+
+    opportunities = {}
+    for row in np.flatnonzero(profitable):
+        item_id = matrix.item_ids[row]
+        opportunities[item_id] = Opportunity(
+            item_id,
+            matrix.realms[buy_col[row]],
+            float(buy_price[row]),
+            matrix.realms[sell_col[row]],
+            float(sell_price[row]),
+            float(profit[row]),
+        )
+    return opportunities
@@ -0,0 +1,196 @@
+"""
+Archivo en disco de los volcados de subastas reducidos.
+
+Cada escaneo crea una carpeta auction_archive/<región>/<AAAAMMDDTHHMMSSffffffZ>/
+con un fichero .npz comprimido por reino (columnas auction_id, item_id,
+unit_price, quantity) y un manifest.json. Cada reino se puede cargar por
+separado y las columnas de un .npz se descomprimen solo al leerlas.
+"""
+import json
+import os
+import shutil
+from array import array
+from datetime import datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+ARCHIVE_DIR = settings.BASE_DIR / "auction_archive"
+ARCHIVE_RETENTION_DAYS = 14
+SCAN_DIR_FORMAT = "%Y%m%dT%H%M%S%fZ"
+COLUMNS = ("auction_id", "item_id", "unit_price", "quantity")
+
+
+class ListingCollector:
+    """Columnas compactas de las publicaciones de un reino mientras se leen."""
+
+    def __init__(self):
+        self.auction_id = array("q")
+        self.item_id = array("i")
+        self.unit_price = array("q")
+        self.quantity = array("i")
+
+    def append(self, auction_id, item_id, unit_price, quantity):
+        self.auction_id.append(auction_id or 0)
+        self.item_id.append(item_id)
+        self.unit_price.append(round(unit_price))
+        self.quantity.append(quantity)
+
+    def __len__(self):
+        return len(self.auction_id)
+
+    def arrays(self):
+        return {
+            "auction_id": np.frombuffer(self.auction_id, dtype=np.int64),
+            "item_id": np.frombuffer(self.item_id, dtype=np.int32),
+            "unit_price": np.frombuffer(self.unit_price, dtype=np.int64),
+            "quantity": np.frombuffer(self.quantity, dtype=np.int32),
+        }
+
+
+def region_dir(region, root=None):
+    """Carpeta de los escaneos archivados de una región (los IDs de reino solo son únicos en ella)."""
+    return Path(root or ARCHIVE_DIR) / region
+
+
+def scan_dir_for(scanned_at, root=None):
+    root = Path(root or ARCHIVE_DIR)
+    return root / scanned_at.astimezone(dt_timezone.utc).strftime(SCAN_DIR_FORMAT)
+
+
+def realm_path(scan_dir, realm_id):
+    return Path(scan_dir) / f"{realm_id}.npz"
+
+
+def write_realm(scan_dir, realm_id, collector):
+    scan_dir.mkdir(parents=True, exist_ok=True)
+    path = realm_path(scan_dir, realm_id)
+    tmp = path.with_name(f"{realm_id}.tmp.npz")
+    np.savez_compressed(tmp, **collector.arrays())
+    os.replace(tmp, path)
+    return path
+
+
+def reuse_realm(scan_dir, realm_id, last_modified, root=None):
+    """
+    Para un reino sin cambios (304) enlaza el último archivo guardado,
+    así cada escaneo archivado queda completo. Solo sirve un archivo del
+    mismo volcado (`last_modified`): si el reino se descargó sin
+    archivarlo (p. ej. en el daemon), el último archivo es más antiguo y
+    no se enlaza. Por defecto busca en los escaneos hermanos de
+    `scan_dir`. Devuelve la ruta o None.
+    """
+    for previous in reversed(list_scans(root=root or Path(scan_dir).parent)):
+        source = realm_path(previous.path, realm_id)
+        if previous.path == Path(scan_dir) or not source.exists():
+            continue
+        archived_modified = previous.last_modified().get(realm_id)
+        if archived_modified is None:
+            continue  # escaneo sin terminar o de antes de guardar Last-Modified
+        if archived_modified != last_modified:
+            return None
+        scan_dir.mkdir(parents=True, exist_ok=True)
+        target = realm_path(scan_dir, realm_id)
+        try:
+            os.link(source, target)
+        except OSError:
+            shutil.copyfile(source, target)
+        return target
+    return None
+
+
+def write_manifest(scan_dir, realms, last_modified=None):
+    """
+    `realms` es {blizzard_id: nombre} de los reinos archivados y
+    `last_modified` {blizzard_id: Last-Modified} del volcado de cada uno.
+    """
+    if not realms:
+        return
+    last_modified = last_modified or {}
+    scan_dir.mkdir(parents=True, exist_ok=True)
+    with open(Path(scan_dir) / "manifest.json", "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "realms": {str(realm_id): name for realm_id, name in realms.items()},
+                "last_modified": {str(realm_id): value for realm_id, value in last_modified.items()},
+            },
+            f,
+            indent=2,
+        )
+
+
+class ArchivedScan:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.scanned_at = datetime.strptime(self.path.name, SCAN_DIR_FORMAT).replace(tzinfo=dt_timezone.utc)
+        self._manifest = None
+
+    def __repr__(self):
+        return f"ArchivedScan({self.path.name})"
+
+    @property
+    def manifest(self):
+        if self._manifest is None:
+            manifest_path = self.path / "manifest.json"
+            if manifest_path.exists():
+                with open(manifest_path, "r", encoding="utf-8") as f:
+                    self._manifest = json.load(f)
+            else:
+                self._manifest = {"realms": {}}
+        return self._manifest
+
+    @property
+    def complete(self):
+        """El manifest se escribe al final: sin él, el escaneo sigue en curso o se cortó."""
+        return (self.path / "manifest.json").exists()
+
+    def realms(self):
+        """{blizzard_id: nombre} de los reinos de este escaneo."""
+        return {int(realm_id): name for realm_id, name in self.manifest["realms"].items()}
+
+    def last_modified(self):
+        """{blizzard_id: Last-Modified} del volcado archivado de cada reino."""
+        return {int(realm_id): value for realm_id, value in self.manifest.get("last_modified", {}).items()}
+
+    def load_realm(self, realm_id):
+        """Columnas ({nombre: array}) del .npz de un reino, sin leer los demás."""
+        with np.load(realm_path(self.path, realm_id)) as data:
+            return {name: data[name] for name in data.files}
+
+
+def list_scans(since=None, until=None, root=None, complete=False):
+    """
+    Escaneos archivados en orden cronológico, opcionalmente acotados.
+    Con `complete`, solo los que ya tienen manifest.
+    """
+    root = Path(root or ARCHIVE_DIR)
+    if not root.exists():
+        return []
+
+    scans = []
+    for path in sorted(root.iterdir()):
+        if not path.is_dir():
+            continue
+        try:
+            scan = ArchivedScan(path)
+        except ValueError:
+            continue
+        if since and scan.scanned_at < since:
+            continue
+        if until and scan.scanned_at >= until:
+            continue
+        if complete and not scan.complete:
+            continue
+        scans.append(scan)
+    return scans
+
+
+def prune_archive(retention_days=ARCHIVE_RETENTION_DAYS, root=None):
+    """Borra los escaneos más antiguos que la retención. Devuelve cuántos."""
+    cutoff = datetime.now(dt_timezone.utc) - timedelta(days=retention_days)
+    removed = 0
+    for scan in list_scans(until=cutoff, root=root):
+        shutil.rmtree(scan.path, ignore_errors=True)
+        removed += 1
+    return removed
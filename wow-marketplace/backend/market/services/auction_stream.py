@@ -0,0 +1,111 @@
+"""
+Lectura incremental de los volcados de subastas.
+
+El cuerpo de /connected-realm/{id}/auctions se procesa por trozos:
+las subastas se entregan una a una sin materializar nunca el JSON
+completo, así la memoria no depende del tamaño del volcado.
+"""
+import codecs
+import json
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = " \t\n\r"
+_NUMBER_CHARS = frozenset("0123456789+-.eE")
+
+
+class _ChunkReader:
+    """Buffer de texto sobre un iterador de bytes, con decodificación JSON por valores."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._decoder = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        for chunk in self._chunks:
+            if chunk:
+                self.buf = self.buf[self.pos:] + self._utf8.decode(chunk)
+                self.pos = 0
+                return True
+        self.buf = self.buf[self.pos:] + self._utf8.decode(b"", final=True)
+        self.pos = 0
+        self.eof = True
+        return False
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                raise ValueError("Volcado de subastas truncado")
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Se esperaba '{char}' en la posición {self.pos}")
+        self.pos += 1
+
+    def _complete_number(self):
+        """
+        Un número puede quedar cortado en cualquier carácter ("1." o
+        "1.5e"), y raw_decode aceptaría solo la primera parte: se lee
+        hasta que lo siga algo que no sea parte de un número (o el final).
+        """
+        end = self.pos
+        while True:
+            while end < len(self.buf) and self.buf[end] in _NUMBER_CHARS:
+                end += 1
+            if end < len(self.buf) or self.eof:
+                return
+            read = end - self.pos
+            self.fill()  # descarta lo anterior a pos
+            end = self.pos + read
+
+    def value(self):
+        if self.peek() in _NUMBER_CHARS:
+            self._complete_number()
+        while True:
+            try:
+                obj, end = self._decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.eof or not self.fill():
+                    raise
+                continue
+            self.pos = end
+            return obj
+
+
+def iter_auctions(chunks, key="auctions"):
+    """
+    Recorre un objeto JSON de nivel superior y entrega uno a uno los
+    elementos de la lista `key`. El resto de claves se descarta.
+    """
+    reader = _ChunkReader(chunks)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+
+    while True:
+        name = reader.value()
+        reader.expect(":")
+
+        if name == key and reader.peek() == "[":
+            reader.expect("[")
+            if reader.peek() != "]":
+                while True:
+                    yield reader.value()
+                    if reader.peek() == "]":
+                        break
+                    reader.expect(",")
+            reader.expect("]")
+        else:
+            reader.value()
+
+        if reader.peek() == "}":
+            return
+        reader.expect(",")
@@ -0,0 +1,107 @@
+"""
+Reproducción de escaneos archivados para comparar estrategias de arbitraje.
+
+Este módulo no depende de Django para que los procesos del pool lo
+puedan importar sin configurar settings: solo lee los .npz y el
+manifest de cada escaneo y reutiliza el motor de arbitraje.
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+
+from market.services.arbitrage import AH_CUT, MIN_PROFIT, PriceMatrix, find_opportunities
+
+
+def make_strategy(name, cut=AH_CUT, min_profit=MIN_PROFIT, sell_realms=None):
+    return {"name": name, "cut": cut, "min_profit": min_profit, "sell_realms": sell_realms}
+
+
+def parse_strategy(spec):
+    """
+    "nombre:cut=0.05,min_profit=1000,sell=Stormrage|Area 52"
+    Las claves omitidas usan los valores por defecto; sin `sell` se
+    consideran todos los reinos como destino de venta.
+    """
+    name, _, params = spec.partition(":")
+    strategy = make_strategy(name.strip())
+    for part in filter(None, params.split(",")):
+        key, _, value = part.partition("=")
+        key = key.strip()
+        if key == "cut":
+            strategy["cut"] = float(value)
+        elif key == "min_profit":
+            strategy["min_profit"] = float(value)
+        elif key == "sell":
+            strategy["sell_realms"] = [r.strip() for r in value.split("|") if r.strip()]
+        else:
+            raise ValueError(f"Parámetro de estrategia desconocido: {key}")
+    return strategy
+
+
+def parse_strategies(specs):
+    """Estrategias de `specs`; los nombres no se pueden repetir (cada uno es una columna del informe)."""
+    strategies = [parse_strategy(spec) for spec in specs]
+    seen = set()
+    for strategy in strategies:
+        if strategy["name"] in seen:
+            raise ValueError(f"Estrategia repetida: {strategy['name']}")
+        seen.add(strategy["name"])
+    return strategies
+
+
+def _realm_minimums(item_id, unit_price):
+    """Precio mínimo por item de un reino: (ids únicos ordenados, mínimos)."""
+    if item_id.size == 0:
+        return item_id, unit_price
+    order = np.lexsort((unit_price, item_id))
+    item_id = item_id[order]
+    unit_price = unit_price[order]
+    first = np.flatnonzero(np.r_[True, item_id[1:] != item_id[:-1]])
+    return item_id[first], unit_price[first]
+
+
+def load_scan_matrix(scan_path, item_ids=None):
+    """Matriz items x reinos de un escaneo archivado, leyendo cada reino por separado."""
+    scan_path = Path(scan_path)
+    with open(scan_path / "manifest.json", "r", encoding="utf-8") as f:
+        realms = json.load(f)["realms"]
+
+    wanted = None if item_ids is None else np.unique(np.asarray(item_ids, dtype=np.int64))
+    names = []
+    columns = []
+    for realm_id, name in realms.items():
+        path = scan_path / f"{realm_id}.npz"
+        if not path.exists():
+            continue
+        with np.load(path) as data:
+            ids = data["item_id"].astype(np.int64)
+            prices = data["unit_price"]
+        if wanted is not None:
+            mask = np.isin(ids, wanted)
+            ids, prices = ids[mask], prices[mask]
+        names.append(name)
+        columns.append(_realm_minimums(ids, prices))
+
+    if wanted is None:
+        parts = [ids for ids, _ in columns]
+        wanted = np.unique(np.concatenate(parts)) if parts else np.array([], dtype=np.int64)
+
+    matrix = np.full((len(wanted), len(names)), np.nan)
+    for col, (ids, mins) in enumerate(columns):
+        rows = np.searchsorted(wanted, ids)
+        matrix[rows, col] = mins
+
+    return PriceMatrix([int(i) for i in wanted], names, matrix)
+
+
+def replay_scan(scan_path, item_ids, strategies):
+    """
+    Trabajo de un proceso: una carga del escaneo y todas las estrategias.
+    Devuelve {nombre_estrategia: [Opportunity, ...]}.
+    """
+    matrix = load_scan_matrix(scan_path, item_ids)
+    return {
+        s["name"]: list(find_opportunities(matrix, s["sell_realms"], s["cut"], s["min_profit"]).values())
+        for s in strategies
+    }
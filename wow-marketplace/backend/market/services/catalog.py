@@ -0,0 +1,195 @@
+"""
+Consultas y serialización de items, items seguidos, snapshots,
+oportunidades actuales y métricas de escaneos.
+
+Las comparten la API JSON paginada y la primera página del dashboard,
+para que ambas ordenen, filtren y serialicen exactamente igual.
+"""
+from django.db.models import Q
+
+from market.models import Item, ItemPriceSnapshot, LatestOpportunity, ScanRun, TrackedItem
+
+ITEM_ORDERING = ["name", "id"]
+TRACKED_ORDERING = ["item__name", "id"]
+SNAPSHOT_ORDERING = ["-profit", "-id"]
+OPPORTUNITY_ORDERING = ["-profit", "-id"]
+SCAN_RUN_ORDERING = ["-started_at", "-id"]
+
+
+def _icon_url(item):
+    return item.icon.url if item.icon else None
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+def _tracking(item):
+    try:
+        return item.tracking
+    except TrackedItem.DoesNotExist:
+        return None
+
+
+# ======================
+# CAMPOS
+# ======================
+ITEM_FIELDS = {
+    "id": lambda i: i.id,
+    "name": lambda i: i.name,
+    "blizzard_id": lambda i: i.blizzard_id,
+    "profession_id": lambda i: i.profession_id,
+    "profession": lambda i: i.profession.name if i.profession else None,
+    "icon": _icon_url,
+    "tracked": lambda i: bool(_tracking(i) and _tracking(i).active),
+    "added_at": lambda i: _isoformat(_tracking(i) and _tracking(i).added_at),
+}
+
+TRACKED_FIELDS = {
+    "id": lambda t: t.id,
+    "item_id": lambda t: t.item_id,
+    "name": lambda t: t.item.name,
+    "blizzard_id": lambda t: t.item.blizzard_id,
+    "profession": lambda t: t.item.profession.name if t.item.profession else None,
+    "icon": lambda t: _icon_url(t.item),
+    "active": lambda t: t.active,
+    "added_at": lambda t: _isoformat(t.added_at),
+    "scanned_at": lambda t: _isoformat(t.scanned_at),
+}
+
+SNAPSHOT_FIELDS = {
+    "id": lambda s: s.id,
+    "item_id": lambda s: s.item_id,
+    "item_name": lambda s: s.item.name,
+    "blizzard_id": lambda s: s.item.blizzard_id,
+    "icon": lambda s: _icon_url(s.item),
+    "region": lambda s: s.region,
+    "best_buy_realm": lambda s: s.best_buy_realm.name,
+    "buy_price": lambda s: str(s.buy_price),
+    "best_sell_realm": lambda s: s.best_sell_realm.name,
+    "estimated_sell_price": lambda s: str(s.estimated_sell_price),
+    "profit": lambda s: str(s.profit),
+    "created_at": lambda s: _isoformat(s.created_at),
+}
+
+# Mismas claves que SNAPSHOT_FIELDS; "id" es el del snapshot para poder borrarlo
+OPPORTUNITY_FIELDS = {
+    **SNAPSHOT_FIELDS,
+    "id": lambda o: o.snapshot_id,
+}
+
+SCAN_RUN_FIELDS = {
+    "id": lambda r: r.id,
+    "job_id": lambda r: r.job_id,
+    "kind": lambda r: r.kind,
+    "status": lambda r: r.status,
+    "regions": lambda r: r.regions,
+    "started_at": lambda r: _isoformat(r.started_at),
+    "finished_at": lambda r: _isoformat(r.finished_at),
+    "seconds": lambda r: r.seconds,
+    "stages": lambda r: r.stages,
+    "realms_total": lambda r: r.realms_total,
+    "realms_downloaded": lambda r: r.realms_downloaded,
+    "realms_not_modified": lambda r: r.realms_not_modified,
+    "realms_failed": lambda r: r.realms_failed,
+    "bytes_downloaded": lambda r: r.bytes_downloaded,
+    "rows_written": lambda r: r.rows_written,
+    "peak_memory_kb": lambda r: r.peak_memory_kb,
+    "error_count": lambda r: r.error_count,
+    "error": lambda r: r.error,
+}
+
+REALM_TIMING_FIELDS = {
+    "realm_id": lambda t: t.realm_id,
+    "realm": lambda t: t.realm.name,
+    "outcome": lambda t: t.outcome,
+    "seconds": lambda t: t.seconds,
+    "latency": lambda t: t.latency,
+    "download": lambda t: t.download,
+    "parse": lambda t: t.parse,
+    "index": lambda t: t.index,
+    "bytes": lambda t: t.bytes,
+}
+
+# Con ?realms=1: SCAN_RUN_FIELDS más los tiempos de cada reino
+SCAN_RUN_DETAIL_FIELDS = {
+    **SCAN_RUN_FIELDS,
+    "realms": lambda r: serialize(r.realm_timings.all(), REALM_TIMING_FIELDS, list(REALM_TIMING_FIELDS)),
+}
+
+
+def select_fields(available, requested):
+    """
+    `requested` es la lista del parámetro ?fields=a,b (vacía = todos).
+    Lanza ValueError si pide un campo que no existe.
+    """
+    if not requested:
+        return list(available)
+    unknown = [f for f in requested if f not in available]
+    if unknown:
+        raise ValueError(f"Campos no válidos: {', '.join(unknown)}")
+    return requested
+
+
+def serialize(rows, available, fields):
+    return [{f: available[f](row) for f in fields} for row in rows]
+
+
+# ======================
+# CONSULTAS
+# ======================
+def items_queryset(profession=None, tracked=None):
+    qs = Item.objects.select_related("tracking", "profession")
+    if profession is not None:
+        qs = qs.filter(profession_id=profession)
+    if tracked is not None:
+        qs = qs.filter(tracking__active=True) if tracked else qs.exclude(tracking__active=True)
+    return qs
+
+
+def tracked_queryset(profession=None, active=None):
+    qs = TrackedItem.objects.select_related("item", "item__profession")
+    if profession is not None:
+        qs = qs.filter(item__profession_id=profession)
+    if active is not None:
+        qs = qs.filter(active=active)
+    return qs
+
+
+def snapshots_queryset(profession=None, realm=None, min_profit=None, region=None):
+    """`realm` filtra por reino de compra o de venta."""
+    qs = ItemPriceSnapshot.objects.select_related("item", "best_buy_realm", "best_sell_realm")
+    if region is not None:
+        qs = qs.filter(region=region)
+    if profession is not None:
+        qs = qs.filter(item__profession_id=profession)
+    if realm is not None:
+        qs = qs.filter(Q(best_buy_realm_id=realm) | Q(best_sell_realm_id=realm))
+    if min_profit is not None:
+        qs = qs.filter(profit__gte=min_profit)
+    return qs
+
+
+def opportunities_queryset(profession=None, realm=None, min_profit=None, region=None):
+    """Como snapshots_queryset, pero solo la oportunidad más reciente de cada item y región."""
+    qs = LatestOpportunity.objects.select_related("item", "best_buy_realm", "best_sell_realm")
+    if region is not None:
+        qs = qs.filter(region=region)
+    if profession is not None:
+        qs = qs.filter(item__profession_id=profession)
+    if realm is not None:
+        qs = qs.filter(Q(best_buy_realm_id=realm) | Q(best_sell_realm_id=realm))
+    if min_profit is not None:
+        qs = qs.filter(profit__gte=min_profit)
+    return qs
+
+
+def scan_runs_queryset(kind=None, status=None, with_realms=False):
+    qs = ScanRun.objects.all()
+    if kind is not None:
+        qs = qs.filter(kind=kind)
+    if status is not None:
+        qs = qs.filter(status=status)
+    if with_realms:
+        qs = qs.prefetch_related("realm_timings__realm")
+    return qs
@@ -0,0 +1,289 @@
+"""
+Motor de costes de fabricación.
+
+Cada receta (ItemMaterial) se valora con los precios del mismo escaneo:
+un material cuesta lo que valga comprarlo en el reino más barato o,
+si es a su vez un Item con receta, lo que cueste fabricarlo, lo que
+salga más barato. Los costes se memorizan, así que un reactivo que
+aparece en muchas recetas se valora una sola vez por escaneo. Los items
+que forman un ciclo de recetas (A necesita B y B necesita A) no se
+consideran fabricables.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from market.models import CraftingQuote, ItemMaterial
+from market.services.arbitrage import AH_CUT
+
+RecipeBook = namedtuple("RecipeBook", ["recipes", "items", "materials"])
+
+CraftQuote = namedtuple(
+    "CraftQuote",
+    [
+        "item_id",
+        "craft_cost",  # None si falta el precio de algún material
+        "buy_price",
+        "buy_realm",
+        "sell_price",
+        "sell_realm",
+        "margin",  # compra - fabricación: positivo = sale más barato fabricar
+        "profit",  # venta tras comisión - fabricación
+        "missing",  # materiales sin precio ni receta
+    ],
+)
+
+
+def find_cyclic_items(graph):
+    """
+    `graph` es {item: [items que necesita su receta]}.
+    Devuelve el conjunto de items que forman parte de algún ciclo: los de
+    las componentes fuertemente conexas de más de un item y los que se
+    necesitan a sí mismos (Tarjan, sin recursión). Los items que solo
+    dependen de un ciclo no se incluyen.
+    """
+    order = {}  # orden de visita
+    low = {}
+    stack, on_stack = [], set()
+    cyclic = set()
+
+    for root in graph:
+        if root in order:
+            continue
+        order[root] = low[root] = len(order)
+        stack.append(root)
+        on_stack.add(root)
+        path = [(root, iter(graph[root]))]
+        while path:
+            node, children = path[-1]
+            child = next(children, None)
+            if child is not None:
+                if child not in graph:
+                    continue
+                if child not in order:
+                    order[child] = low[child] = len(order)
+                    stack.append(child)
+                    on_stack.add(child)
+                    path.append((child, iter(graph[child])))
+                elif child in on_stack:
+                    low[node] = min(low[node], order[child])
+                continue
+
+            path.pop()
+            if path:
+                parent = path[-1][0]
+                low[parent] = min(low[parent], low[node])
+            if low[node] == order[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == node:
+                        break
+                if len(component) > 1 or node in graph[node]:
+                    cyclic.update(component)
+
+    return cyclic
+
+
+class CraftingEngine:
+    """
+    `recipes`: {item_id: [(material_id, cantidad), ...]}
+    `material_items`: {material_id: item_id} de los materiales fabricables
+    `material_prices`: {material_id: precio unitario de compra}
+    """
+
+    def __init__(self, recipes, material_items, material_prices):
+        self.recipes = recipes
+        self.material_items = material_items
+        self.material_prices = material_prices
+
+        graph = {
+            item_id: [
+                self.material_items[m] for m, _ in recipe
+                if self.material_items.get(m) in recipes
+            ]
+            for item_id, recipe in recipes.items()
+        }
+        self.cyclic = find_cyclic_items(graph)
+
+        self._craft = {}
+        self._material = {}
+        self._missing = {}
+
+    def material_cost(self, material_id):
+        if material_id not in self._material:
+            options = [self.material_prices.get(material_id)]
+            crafted = self.material_items.get(material_id)
+            if crafted is not None:
+                options.append(self.craft_cost(crafted))
+            options = [c for c in options if c is not None]
+            self._material[material_id] = min(options) if options else None
+        return self._material[material_id]
+
+    def craft_cost(self, item_id):
+        """Coste de fabricar una unidad; None si no tiene receta, es cíclica o falta algún precio."""
+        if item_id in self._craft:
+            return self._craft[item_id]
+
+        recipe = self.recipes.get(item_id)
+        if not recipe or item_id in self.cyclic:
+            self._craft[item_id] = None
+            return None
+
+        total = 0
+        missing = []
+        for material_id, quantity in recipe:
+            cost = self.material_cost(material_id)
+            if cost is None:
+                missing.append(material_id)
+            else:
+                total += cost * quantity
+
+        self._missing[item_id] = missing
+        self._craft[item_id] = None if missing else total
+        return self._craft[item_id]
+
+    def missing(self, item_id):
+        self.craft_cost(item_id)
+        return self._missing.get(item_id, [])
+
+
+def best_prices(matrix, sell_realms=None):
+    """
+    Mejor compra (reino más barato) y mejor venta (reino más caro de
+    `sell_realms`) de cada fila de la matriz, en una sola pasada.
+    Devuelve {item_id: (buy_price, buy_realm, sell_price, sell_realm)} con
+    None donde no hay oferta.
+    """
+    prices = matrix.prices
+    if prices.size == 0:
+        return {}
+
+    buy = np.where(np.isnan(prices), np.inf, prices)
+    buy_col = buy.argmin(axis=1)
+    buy_price = buy[np.arange(len(buy)), buy_col]
+
+    sell_cols = np.flatnonzero(matrix.column_mask(sell_realms))
+    sell_price = np.full(len(prices), -np.inf)
+    sell_col = np.zeros(len(prices), dtype=int)
+    if sell_cols.size:
+        sell = np.where(np.isnan(prices[:, sell_cols]), -np.inf, prices[:, sell_cols])
+        sell_local = sell.argmax(axis=1)
+        sell_price = sell[np.arange(len(sell)), sell_local]
+        sell_col = sell_cols[sell_local]
+
+    result = {}
+    for row, item_id in enumerate(matrix.item_ids):
+        has_buy = np.isfinite(buy_price[row])
+        has_sell = np.isfinite(sell_price[row])
+        result[item_id] = (
+            float(buy_price[row]) if has_buy else None,
+            matrix.realms[buy_col[row]] if has_buy else None,
+            float(sell_price[row]) if has_sell else None,
+            matrix.realms[sell_col[row]] if has_sell else None,
+        )
+    return result
+
+
+def quote_recipes(engine, item_blizzard_ids, prices, cut=AH_CUT):
+    """
+    Compara fabricar con comprar para cada item con receta.
+    `item_blizzard_ids` es {item_id: blizzard_id} y `prices` la salida de
+    best_prices. Devuelve los CraftQuote ordenados por margen (mayor primero,
+    los que no se pueden valorar al final).
+    """
+    quotes = []
+    for item_id in engine.recipes:
+        craft = engine.craft_cost(item_id)
+        buy_price, buy_realm, sell_price, sell_realm = prices.get(
+            item_blizzard_ids.get(item_id), (None, None, None, None)
+        )
+        margin = buy_price - craft if craft is not None and buy_price is not None else None
+        profit = sell_price * (1 - cut) - craft if craft is not None and sell_price is not None else None
+        quotes.append(CraftQuote(
+            item_id, craft, buy_price, buy_realm, sell_price, sell_realm,
+            margin, profit, engine.missing(item_id),
+        ))
+
+    quotes.sort(key=lambda q: (q.margin is None, -(q.margin or 0)))
+    return quotes
+
+
+# ======================
+# BASE DE DATOS
+# ======================
+def load_recipe_book():
+    """
+    Todas las recetas en una consulta. `items` es {item_id: Item} de los
+    items con receta y `materials` {material_id: Material}.
+    """
+    recipes, items, materials = {}, {}, {}
+    rows = ItemMaterial.objects.select_related("item", "material", "material__item")
+    for row in rows:
+        recipes.setdefault(row.item_id, []).append((row.material_id, row.quantity_required))
+        items[row.item_id] = row.item
+        materials[row.material_id] = row.material
+    return RecipeBook(recipes, items, materials)
+
+
+def material_blizzard_id(material):
+    """Un material fabricable se cotiza con el ID de su Item."""
+    if material.item is not None and material.item.blizzard_id:
+        return material.item.blizzard_id
+    return material.blizzard_id
+
+
+def quote_recipe_book(book, matrix, sell_realms=None, cut=AH_CUT):
+    """Valora todas las recetas de `book` con la matriz de precios del escaneo."""
+    prices = best_prices(matrix, sell_realms)
+    no_price = (None, None, None, None)
+    engine = CraftingEngine(
+        book.recipes,
+        {m.id: m.item_id for m in book.materials.values() if m.item_id},
+        {m.id: prices.get(material_blizzard_id(m), no_price)[0] for m in book.materials.values()},
+    )
+    return quote_recipes(engine, {i.id: i.blizzard_id for i in book.items.values()}, prices, cut)
+
+
+def save_quotes(quotes, book, realms, updated_at, region, batch_size=500):
+    """
+    Sustituye los CraftingQuote de `region` por los de este escaneo
+    (precios en oro). `realms` es {nombre: ConnectedRealm} de esa región.
+    Devuelve las filas escritas.
+    """
+    def gold(copper):
+        return None if copper is None else copper / 10000
+
+    def realm_id(name):
+        realm = realms.get(name)
+        return realm.id if realm else None
+
+    deleted, _ = CraftingQuote.objects.filter(region=region).exclude(item__in=list(book.recipes)).delete()
+    CraftingQuote.objects.bulk_create(
+        [
+            CraftingQuote(
+                item_id=q.item_id,
+                region=region,
+                craft_cost=gold(q.craft_cost),
+                buy_price=gold(q.buy_price),
+                buy_realm_id=realm_id(q.buy_realm),
+                sell_price=gold(q.sell_price),
+                sell_realm_id=realm_id(q.sell_realm),
+                margin=gold(q.margin),
+                profit=gold(q.profit),
+                missing_materials=[book.materials[m].name for m in q.missing],
+                updated_at=updated_at,
+            )
+            for q in quotes
+        ],
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=["item", "region"],
+        update_fields=[
+            "craft_cost", "buy_price", "buy_realm", "sell_price", "sell_realm",
+            "margin", "profit", "missing_materials", "updated_at",
+        ],
+    )
+    return deleted + len(quotes)
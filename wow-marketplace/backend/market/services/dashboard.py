@@ -0,0 +1,87 @@
+"""
+Caché del dashboard.
+
+Las consultas de la home y los fragmentos HTML renderizados se guardan
+en la caché de Django con la "generación de datos" en la clave. Los
+escaneos y cualquier cambio de items/snapshots incrementan la
+generación, así que nunca hace falta borrar claves: las viejas dejan
+de usarse y la caché las va descartando.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.functional import SimpleLazyObject
+
+from market.models import Profession
+from market.services.catalog import (
+    ITEM_ORDERING,
+    OPPORTUNITY_ORDERING,
+    items_queryset,
+    opportunities_queryset,
+)
+from market.services.pagination import DEFAULT_PAGE_SIZE, keyset_page
+
+GENERATION_KEY = "market:data-generation"
+DASHBOARD_TIMEOUT = None  # las claves van versionadas: no caducan
+
+
+def data_generation():
+    """
+    Generación actual. Arranca en un valor basado en la hora para que,
+    si la caché pierde la clave, no se reutilicen fragmentos antiguos.
+    """
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, time.time_ns(), timeout=None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def _bump():
+    # Un valor nuevo en vez de incr(): en FileBasedCache incr() lee y
+    # escribe sin bloqueo, y con el worker y la web incrementando a la
+    # vez se podía perder un incremento.
+    cache.set(GENERATION_KEY, time.time_ns(), timeout=None)
+
+
+def bump_generation():
+    """Invalida el dashboard en cuanto se confirme la transacción en curso."""
+    transaction.on_commit(_bump)
+
+
+def cached_query(name, generation, build):
+    """Resultado de `build()` guardado para esta generación."""
+    key = f"market:dashboard:{name}:{generation}"
+    result = cache.get(key)
+    if result is None:
+        result = build()
+        cache.set(key, result, DASHBOARD_TIMEOUT)
+    return result
+
+
+def dashboard_context():
+    """
+    Contexto de la home: solo la primera página de items y de
+    oportunidades actuales (el resto lo pide el navegador a la API con el cursor). Las páginas
+    solo se consultan (o se leen de la caché) si la plantilla llega a
+    usarlas, es decir, si el fragmento no está ya renderizado en caché.
+    """
+    generation = data_generation()
+
+    def lazy(name, build):
+        return SimpleLazyObject(lambda: cached_query(name, generation, build))
+
+    return {
+        "generation": generation,
+        "fragment_timeout": DASHBOARD_TIMEOUT,
+        "items": lazy(
+            "items",
+            lambda: keyset_page(items_queryset(), ITEM_ORDERING, limit=DEFAULT_PAGE_SIZE),
+        ),
+        "snapshots": lazy(
+            "snapshots",
+            lambda: keyset_page(opportunities_queryset(), OPPORTUNITY_ORDERING, limit=DEFAULT_PAGE_SIZE),
+        ),
+        "professions": lazy("professions", lambda: list(Profession.objects.order_by("name"))),
+    }
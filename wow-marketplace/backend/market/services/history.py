@@ -0,0 +1,48 @@
+"""
+Histórico de precios por reino (tabla PriceSnapshot).
+"""
+from market.models import PriceSnapshot
+
+
+def history_rows(items, realms, indexes, scanned_at):
+    """
+    Filas PriceSnapshot de un escaneo: una por item y reino con oferta.
+    `items` son Items con blizzard_id, `realms` es {nombre: ConnectedRealm}
+    e `indexes` es {nombre: {item_id: PriceEntry}}.
+    """
+    rows = []
+    for realm_name, index in indexes.items():
+        realm = realms.get(realm_name)
+        if realm is None:
+            continue
+        for item in items:
+            entry = index.get(item.blizzard_id)
+            if entry is None:
+                continue
+            rows.append(PriceSnapshot(
+                item=item,
+                realm=realm,
+                min_price=round(entry.min_price),
+                quantity=entry.quantity,
+                listings=entry.listings,
+                created_at=scanned_at,
+            ))
+    return rows
+
+
+def price_history(item, since=None, until=None, realms=None):
+    """
+    Serie temporal de un item en todos sus reinos (o en `realms`),
+    ordenada por fecha. Usa el índice (item, created_at).
+    """
+    qs = PriceSnapshot.objects.filter(item=item)
+    if since:
+        qs = qs.filter(created_at__gte=since)
+    if until:
+        qs = qs.filter(created_at__lt=until)
+    if realms:
+        qs = qs.filter(realm__in=realms)
+
+    return qs.order_by("created_at").values_list(
+        "created_at", "realm_id", "min_price", "quantity", "listings"
+    )
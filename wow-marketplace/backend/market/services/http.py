@@ -0,0 +1,36 @@
+"""
+Sesión HTTP compartida por todo el proceso.
+"""
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from market.models import REGION_CHOICES
+
+DEFAULT_POOL_SIZE = 8
+# Un pool por host: {región}.api.blizzard.com y {región}.battle.net (OAuth)
+POOL_HOSTS = 2 * len(REGION_CHOICES)
+REQUEST_TIMEOUT = (5, 60)  # (conexión, lectura) en segundos
+
+_session = None
+_session_pool_size = 0
+_session_lock = threading.Lock()
+
+
+def get_session(pool_size=DEFAULT_POOL_SIZE):
+    """
+    Mantiene un pool de conexiones keep-alive con al menos `pool_size`
+    conexiones por host, para que las descargas concurrentes no reabran
+    TLS. Caben los pools de todos los hosts, así que escanear varias
+    regiones no expulsa los de las otras.
+    """
+    global _session, _session_pool_size
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+        if pool_size > _session_pool_size:
+            adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=pool_size)
+            _session.mount("https://", adapter)
+            _session_pool_size = pool_size
+        return _session
@@ -0,0 +1,102 @@
+"""
+Iconos de items.
+
+El CSV ID -> IconName se carga una vez por proceso y solo se vuelve a
+leer si cambia su fecha de modificación. Cada PNG se copia a media una
+única vez (item_icons/<icono>.png) y todos los items que lo usan
+apuntan al mismo fichero.
+"""
+import csv
+import os
+import threading
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+
+from market.models import Item
+from market.services.dashboard import bump_generation
+
+CSV_PATH = settings.BASE_DIR / "market" / "static" / "items_with_icons.csv"
+ICONS_PATH = settings.BASE_DIR / "market" / "static" / "icons"
+ICON_UPLOAD_DIR = "item_icons"
+
+
+class IconIndex:
+    def __init__(self, path):
+        self.path = path
+        self._mapping = {}
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def _current_mtime(self):
+        try:
+            return os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            return None
+
+    def _load(self):
+        mapping = {}
+        with open(self.path, mode="r", encoding="utf-8") as file:
+            for row in csv.DictReader(file, delimiter=","):
+                mapping[int(row["ID"])] = row["IconName"].strip().lower()
+        return mapping
+
+    def mapping(self):
+        mtime = self._current_mtime()
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    self._mapping = self._load() if mtime is not None else {}
+                    self._mtime = mtime
+        return self._mapping
+
+    def get(self, blizzard_id):
+        return self.mapping().get(blizzard_id)
+
+
+icon_index = IconIndex(CSV_PATH)
+
+
+def store_icon(icon_name):
+    """
+    Copia el PNG a media si aún no está y devuelve su nombre en el storage
+    (o None si no existe el PNG de origen).
+    """
+    stored_name = f"{ICON_UPLOAD_DIR}/{icon_name}.png"
+    if default_storage.exists(stored_name):
+        return stored_name
+
+    source = os.path.join(ICONS_PATH, f"{icon_name}.png")
+    if not os.path.exists(source):
+        return None
+
+    with open(source, "rb") as f:
+        return default_storage.save(stored_name, File(f))
+
+
+def assign_icons(items, batch_size=500):
+    """
+    Asigna icono a una lista de items en una sola pasada y los guarda con
+    bulk_update. Devuelve los items a los que se les asignó icono.
+    """
+    stored = {}
+    assigned = []
+
+    for item in items:
+        icon_name = icon_index.get(item.blizzard_id)
+        if not icon_name:
+            continue
+
+        if icon_name not in stored:
+            stored[icon_name] = store_icon(icon_name)
+        if not stored[icon_name] or item.icon.name == stored[icon_name]:
+            continue
+
+        item.icon.name = stored[icon_name]
+        assigned.append(item)
+
+    Item.objects.bulk_update(assigned, ["icon"], batch_size=batch_size)
+    if assigned:
+        bump_generation()
+    return assigned
@@ -0,0 +1,234 @@
+"""
+Instrumentación de los escaneos (ScanRun y ScanRealmTiming).
+
+Cada escaneo mide sus etapas con ScanMetrics y guarda un ScanRun al
+terminar, también si falla. La lectura de cada volcado pasa por
+MeteredStream, que separa el tiempo de red, de parseo y de construcción
+del índice midiendo lotes de subastas en lugar de cada una, así la
+medición no encarece el bucle. Con el histórico se estima cuánto falta
+de un escaneo en curso.
+"""
+import sys
+import threading
+import time
+import traceback
+from collections import namedtuple
+from contextlib import contextmanager
+from itertools import islice
+from statistics import mean
+
+from django.db.models import Avg, Sum
+from django.utils import timezone
+
+from market.models import ScanJob, ScanRealmTiming, ScanRun
+from market.services.auction_stream import iter_auctions
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+STAGES = ("token", "realm_sync", "fetch", "download", "parse", "index", "analysis", "db_write")
+PARSE_BATCH = 256  # subastas parseadas por medición
+ETA_HISTORY_RUNS = 20  # escaneos recientes con los que se estima el ETA
+
+RealmTiming = namedtuple("RealmTiming", ["seconds", "latency", "download", "parse", "index", "bytes"])
+
+
+def peak_memory_kb():
+    """Pico de memoria residente del proceso (None si el sistema no lo da)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak  # macOS lo da en bytes
+
+
+class MeteredStream:
+    """
+    Subastas de un volcado con su tiempo de red, de parseo y bytes leídos.
+    Se parsea por lotes de PARSE_BATCH; lo que tarda quien consume las
+    subastas entre lote y lote es tiempo de índice.
+    """
+
+    def __init__(self, chunks, parse=iter_auctions):
+        self.bytes = 0
+        self.network = 0.0
+        self._parsing = 0.0  # incluye la red: los trozos se leen al parsear
+        self._auctions = parse(self._read(chunks))
+
+    def _read(self, chunks):
+        chunks = iter(chunks)
+        while True:
+            start = time.perf_counter()
+            chunk = next(chunks, None)
+            self.network += time.perf_counter() - start
+            if chunk is None:
+                return
+            self.bytes += len(chunk)
+            yield chunk
+
+    def __iter__(self):
+        while True:
+            start = time.perf_counter()
+            batch = list(islice(self._auctions, PARSE_BATCH))
+            self._parsing += time.perf_counter() - start
+            if not batch:
+                return
+            yield from batch
+
+    def timing(self, started, latency, build_seconds):
+        """RealmTiming de un reino; `build_seconds` es lo que tardó build_price_index."""
+        return RealmTiming(
+            seconds=time.perf_counter() - started,
+            latency=latency,
+            download=latency + self.network,
+            parse=max(self._parsing - self.network, 0.0),
+            index=max(build_seconds - self._parsing, 0.0),
+            bytes=self.bytes,
+        )
+
+
+class ScanMetrics:
+    """
+    Acumula las métricas de un escaneo; se puede usar desde los hilos de
+    las regiones y de las descargas. Como contexto guarda el ScanRun al
+    salir, con el error si lo hubo:
+
+        with ScanMetrics(ScanRun.FULL, status, regions) as metrics:
+            with metrics.stage("token"):
+                ...
+            metrics.report = report
+    """
+
+    def __init__(self, kind, status=None, regions=()):
+        self.kind = kind
+        self.job = status if isinstance(status, ScanJob) else None
+        self.regions = list(regions)
+        self.stages = dict.fromkeys(STAGES, 0.0)
+        self.report = {}
+        self.run = None
+        self._timings = []
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self.started_at = timezone.now()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        error = "".join(traceback.format_exception(exc_type, exc, tb)) if exc is not None else ""
+        try:
+            self.save(error)
+        except Exception as e:
+            # Las métricas nunca deben tapar el resultado del escaneo
+            print(f"⚠️ No se pudo guardar el ScanRun: {e}")
+        return False
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds):
+        with self._lock:
+            self.stages[name] += seconds
+
+    def realm(self, realm, fetched):
+        """Registra la descarga de un reino (`fetched` es un RealmFetch o None si falló)."""
+        timing = fetched.timing if fetched is not None else None
+        if fetched is None:
+            outcome = ScanRealmTiming.FAILED
+        elif fetched.not_modified:
+            outcome = ScanRealmTiming.NOT_MODIFIED
+        else:
+            outcome = ScanRealmTiming.DOWNLOADED
+
+        row = ScanRealmTiming(realm=realm, outcome=outcome)
+        if timing is not None:
+            row.seconds = timing.seconds
+            row.latency = timing.latency
+            row.download = timing.download
+            row.parse = timing.parse
+            row.index = timing.index
+            row.bytes = timing.bytes
+            self.add("download", timing.download)
+            self.add("parse", timing.parse)
+            self.add("index", timing.index)
+        with self._lock:
+            self._timings.append(row)
+
+    def save(self, error=""):
+        report = self.report
+        timings = self._timings
+        self.run = ScanRun.objects.create(
+            job=self.job,
+            kind=self.kind,
+            status=ScanRun.FAILED if error else ScanRun.OK,
+            regions=self.regions,
+            started_at=self.started_at,
+            finished_at=timezone.now(),
+            seconds=round(time.perf_counter() - self._start, 3),
+            stages={name: round(seconds, 3) for name, seconds in self.stages.items()},
+            realms_total=report.get("realms_total", len(timings)),
+            realms_downloaded=sum(t.outcome == ScanRealmTiming.DOWNLOADED for t in timings),
+            realms_not_modified=sum(t.outcome == ScanRealmTiming.NOT_MODIFIED for t in timings),
+            realms_failed=sum(t.outcome == ScanRealmTiming.FAILED for t in timings),
+            bytes_downloaded=sum(t.bytes for t in timings),
+            rows_written=report.get("rows_written", 0),
+            peak_memory_kb=peak_memory_kb(),
+            error_count=(
+                sum(t.outcome == ScanRealmTiming.FAILED for t in timings)
+                + len(report.get("region_errors", {}))
+                + bool(error)
+            ),
+            error=error,
+        )
+        for row in timings:
+            row.run = self.run
+        ScanRealmTiming.objects.bulk_create(timings, batch_size=500)
+        return self.run
+
+
+def estimate_remaining(job, history=ETA_HISTORY_RUNS):
+    """
+    Segundos que le quedan a `job` según los escaneos recientes: lo que
+    tardó de media cada reino pendiente (los volcados varían mucho de
+    tamaño; la media global solo se usa para los reinos sin histórico),
+    dividido por el paralelismo que se consiguió (suma de los reinos /
+    tiempo real de la fase de descarga), más lo que suelen tardar
+    análisis y escritura. None si todavía no hay histórico.
+    """
+    runs = list(
+        ScanRun.objects.filter(status=ScanRun.OK, realms_total__gt=0)
+        .exclude(job=job)
+        .only("id", "stages")[:history]
+    )
+    if not runs:
+        return None
+
+    realms = ScanRealmTiming.objects.filter(run__in=runs, seconds__isnull=False).aggregate(
+        avg=Avg("seconds"), total=Sum("seconds")
+    )
+    if realms["avg"] is None:
+        return None
+
+    fetch = sum(run.stages.get("fetch", 0) for run in runs)
+    parallelism = max(realms["total"] / fetch, 1.0) if fetch else 1.0
+    tail = mean(run.stages.get("analysis", 0) + run.stages.get("db_write", 0) for run in runs)
+
+    pending = job.pending_realms
+    if not pending:
+        remaining = max(job.total_realms - job.processed_realms, 0)
+        return remaining * realms["avg"] / parallelism + tail
+
+    by_realm = dict(
+        ScanRealmTiming.objects.filter(run__in=runs, seconds__isnull=False, realm_id__in=pending)
+        .values("realm_id")
+        .annotate(avg=Avg("seconds"))
+        .values_list("realm_id", "avg")
+    )
+    work = sum(by_realm.get(pk, realms["avg"]) for pk in pending)
+    return work / parallelism + tail
@@ -0,0 +1,104 @@
+"""
+Resolución nombre de item -> Blizzard item ID respaldada por la tabla ItemIdLookup.
+
+Cada región busca con su locale y guarda sus propias filas. Los nombres
+encontrados se guardan para siempre; los no encontrados se
+guardan con blizzard_id NULL y solo se vuelven a buscar cuando pasa
+NEGATIVE_TTL. Las búsquedas pendientes se lanzan en paralelo con un
+límite de MAX_PARALLEL_SEARCHES.
+
+Desde un notebook:
+
+    import os, django
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    django.setup()
+
+    from market.management.commands.update_auctions import get_token
+    from market.services.item_resolver import resolve_item_ids
+    ids = resolve_item_ids(["Hochenblume", "Writhebark"], get_token("eu"), "eu", "en_GB")
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import requests
+from django.utils import timezone
+
+from market.models import ItemIdLookup
+from market.services.http import REQUEST_TIMEOUT, get_session
+
+NEGATIVE_TTL = timedelta(days=1)
+MAX_PARALLEL_SEARCHES = 4
+
+
+def search_item_id(token, item_name, region="us", locale="en_US"):
+    r = get_session().get(
+        f"https://{region}.api.blizzard.com/data/wow/search/item",
+        headers={"Authorization": f"Bearer {token}"},
+        params={
+            "namespace": f"static-{region}",
+            "locale": locale,
+            f"name.{locale}": item_name,
+            "_pageSize": 5,
+        },
+        timeout=REQUEST_TIMEOUT,
+    )
+    r.raise_for_status()
+
+    for res in r.json().get("results", []):
+        name = res["data"]["name"].get(locale)
+        if name and name.lower() == item_name.lower():
+            return res["data"]["id"]
+
+    return None
+
+
+def resolve_item_ids(names, token, region="us", locale="en_US", max_workers=MAX_PARALLEL_SEARCHES):
+    """
+    Devuelve {nombre: blizzard_id o None} con una sola consulta a la
+    tabla y, para lo que falte, búsquedas concurrentes en la API.
+    """
+    names = list(dict.fromkeys(names))
+    now = timezone.now()
+    resolved = {}
+    pending = []
+
+    known = {row.name: row for row in ItemIdLookup.objects.filter(region=region, name__in=names)}
+    for name in names:
+        row = known.get(name)
+        if row and (row.blizzard_id or row.checked_at > now - NEGATIVE_TTL):
+            resolved[name] = row.blizzard_id
+        else:
+            pending.append(name)
+
+    if not pending:
+        return resolved
+
+    def search(name):
+        try:
+            return search_item_id(token, name, region, locale)
+        except requests.RequestException as e:
+            print(f"⚠️ Error buscando '{name}': {e}")
+            return False  # error de red: no se guarda como "no encontrado"
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        found = dict(zip(pending, pool.map(search, pending)))
+
+    rows = [
+        ItemIdLookup(region=region, name=name, blizzard_id=blizzard_id, checked_at=now)
+        for name, blizzard_id in found.items()
+        if blizzard_id is not False
+    ]
+    ItemIdLookup.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=["region", "name"],
+        update_fields=["blizzard_id", "checked_at"],
+    )
+
+    for name, blizzard_id in found.items():
+        resolved[name] = blizzard_id or None
+    return resolved
+
+
+def resolve_item_id(name, token, region="us", locale="en_US"):
+    return resolve_item_ids([name], token, region, locale)[name]
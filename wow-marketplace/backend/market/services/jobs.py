@@ -0,0 +1,117 @@
+"""
+Cola de escaneos persistida en ScanJob.
+
+La vista solo encola (o se une al escaneo activo) y responde al
+instante; el trabajo lo hace el proceso `manage.py scan_worker`.
+"""
+import os
+import socket
+import traceback
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from market.models import ScanJob
+
+# Un job 'running' sin latido (updated_at) en este tiempo se da por muerto
+STALE_JOB_AFTER = timedelta(minutes=15)
+
+
+def job_owner():
+    """Identifica al proceso que ejecuta un job: "host:pid"."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue_scan(start_running=False):
+    """
+    Devuelve (job, created). Si ya hay un escaneo en cola o en curso se
+    devuelve ese mismo job: nunca corren dos escaneos a la vez.
+    """
+    existing = ScanJob.objects.filter(active=True).first()
+    if existing:
+        return existing, False
+
+    fields = {}
+    if start_running:
+        fields = {"status": ScanJob.RUNNING, "started_at": timezone.now(), "owner": job_owner()}
+
+    try:
+        with transaction.atomic():
+            return ScanJob.objects.create(**fields), True
+    except IntegrityError:
+        # Otra petición creó el job entre la consulta y el insert
+        return ScanJob.objects.get(active=True), False
+
+
+def start_scan():
+    """
+    Para los escaneos que corren en este proceso (consola y daemon):
+    devuelve (job, started). Crea el job ya 'running'. Si el activo sigue
+    en cola (pedido desde el dashboard sin un scan_worker que lo recoja)
+    lo toma este proceso, y si es un 'running' muerto se da por fallido
+    antes. started=False si otro proceso está escaneando.
+    """
+    fail_stale_jobs()
+    job, created = enqueue_scan(start_running=True)
+    if created:
+        return job, True
+    if job.status == ScanJob.QUEUED:
+        claimed = claim_next_job()
+        if claimed is not None:
+            return claimed, True
+    return job, False
+
+
+def claim_next_job():
+    """Pasa el job en cola más antiguo a 'running' y lo devuelve (o None)."""
+    job = ScanJob.objects.filter(status=ScanJob.QUEUED).order_by("created_at").first()
+    if not job:
+        return None
+
+    claimed = ScanJob.objects.filter(pk=job.pk, status=ScanJob.QUEUED).update(
+        status=ScanJob.RUNNING, started_at=timezone.now(), updated_at=timezone.now(), owner=job_owner()
+    )
+    if not claimed:
+        return None
+
+    job.refresh_from_db()
+    return job
+
+
+def fail_stale_jobs(stale_after=STALE_JOB_AFTER):
+    """
+    Marca como fallidos los jobs 'running' cuyo proceso murió: los que
+    llevan más de `stale_after` sin latido. Un escaneo vivo (el de otro
+    worker, `update_auctions` por consola o un ciclo del daemon) sigue
+    refrescando updated_at y conserva el turno.
+    """
+    now = timezone.now()
+    return ScanJob.objects.filter(status=ScanJob.RUNNING, updated_at__lt=now - stale_after).update(
+        status=ScanJob.FAILED,
+        active=False,
+        finished_at=now,
+        error="El proceso que ejecutaba el escaneo dejó de responder",
+    )
+
+
+def run_job(job, runner=None, **options):
+    """
+    Ejecuta `runner(status=job, **options)` (por defecto el escaneo
+    completo) y deja el job terminado o fallido.
+    """
+    if runner is None:
+        from market.management.commands.update_auctions import run_update_auctions as runner
+
+    try:
+        job.result = runner(status=job, **options)
+        job.status = ScanJob.DONE
+    except Exception:
+        job.status = ScanJob.FAILED
+        job.error = traceback.format_exc()
+    finally:
+        job.active = False
+        job.finished_at = timezone.now()
+        job.save()
+
+    return job
@@ -0,0 +1,57 @@
+"""
+Tabla de oportunidades actuales (LatestOpportunity).
+
+Al final de cada escaneo, dentro de la transacción que guarda los
+snapshots, cada item escaneado pasa a apuntar a su snapshot nuevo de
+cada región; los escaneados sin oportunidad en una región dejan de
+aparecer en ella. Los items y regiones que no se escanearon conservan
+la suya.
+"""
+from market.models import LatestOpportunity
+
+UPDATE_FIELDS = [
+    "snapshot",
+    "best_buy_realm",
+    "best_sell_realm",
+    "buy_price",
+    "estimated_sell_price",
+    "profit",
+    "created_at",
+]
+
+
+def refresh_latest_opportunities(snapshots, scanned_items, region, batch_size=500):
+    """
+    `snapshots` son los ItemPriceSnapshot ya guardados de este escaneo en
+    `region` y `scanned_items` todos los items analizados. Devuelve las
+    filas escritas.
+    """
+    with_opportunity = {s.item_id for s in snapshots}
+    deleted, _ = (
+        LatestOpportunity.objects
+        .filter(region=region, item__in=[item.id for item in scanned_items])
+        .exclude(item__in=with_opportunity)
+        .delete()
+    )
+
+    LatestOpportunity.objects.bulk_create(
+        [
+            LatestOpportunity(
+                item_id=s.item_id,
+                region=region,
+                snapshot=s,
+                best_buy_realm_id=s.best_buy_realm_id,
+                best_sell_realm_id=s.best_sell_realm_id,
+                buy_price=s.buy_price,
+                estimated_sell_price=s.estimated_sell_price,
+                profit=s.profit,
+                created_at=s.created_at,
+            )
+            for s in snapshots
+        ],
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=["item", "region"],
+        update_fields=UPDATE_FIELDS,
+    )
+    return deleted + len(snapshots)
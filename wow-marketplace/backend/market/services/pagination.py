@@ -0,0 +1,109 @@
+"""
+Paginación por cursor (keyset).
+
+En lugar de OFFSET, cada página se pide "a partir de" los valores de
+ordenación de la última fila devuelta, así que el coste no crece con
+la página y las filas nuevas o borradas no desplazan los resultados.
+El cursor son esos valores en JSON, codificados en base64 para la URL.
+"""
+import base64
+import binascii
+import json
+from collections import namedtuple
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+Page = namedtuple("Page", ["rows", "next_cursor"])
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, default=str, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError) as e:
+        raise InvalidCursor("Cursor no válido") from e
+    if not isinstance(values, list):
+        raise InvalidCursor("Cursor no válido")
+    return values
+
+
+def _model_field(model, path):
+    """Campo de `model` al final de `path` ("item__name" -> Item.name)."""
+    parts = path.split("__")
+    for part in parts[:-1]:
+        model = model._meta.get_field(part).related_model
+    return model._meta.get_field(parts[-1])
+
+
+def _clean_values(model, ordering, values):
+    """
+    Convierte los valores del cursor al tipo de cada campo de ordenación;
+    un cursor bien codificado pero con valores de otro tipo es inválido.
+    """
+    cleaned = []
+    for field, value in zip(ordering, values):
+        if value is None:
+            raise InvalidCursor("Cursor no válido")
+        try:
+            cleaned.append(_model_field(model, field.lstrip("-")).to_python(value))
+        except (ValidationError, TypeError, ValueError) as e:
+            raise InvalidCursor("Cursor no válido") from e
+    return cleaned
+
+
+def _field_value(obj, path):
+    for attr in path.split("__"):
+        obj = getattr(obj, attr)
+    return obj
+
+
+def _after(ordering, values):
+    """
+    Filas posteriores a `values` según `ordering`:
+    (a > va) OR (a = va AND b > vb) OR ... con < en los campos descendentes.
+    """
+    condition = Q()
+    for i, field in enumerate(ordering):
+        name = field.lstrip("-")
+        lookup = "lt" if field.startswith("-") else "gt"
+        q = Q(**{f"{name}__{lookup}": values[i]})
+        for previous, value in zip(ordering[:i], values[:i]):
+            q &= Q(**{previous.lstrip("-"): value})
+        condition |= q
+    return condition
+
+
+def keyset_page(queryset, ordering, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Una página de `queryset` ordenada por `ordering` (p. ej. ["-profit", "-id"]).
+    El último campo debe ser único y ninguno puede ser NULL.
+    Devuelve Page(rows, next_cursor); next_cursor es None en la última página.
+    """
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != len(ordering):
+            raise InvalidCursor("Cursor no válido")
+        values = _clean_values(queryset.model, ordering, values)
+        queryset = queryset.filter(_after(ordering, values))
+
+    rows = list(queryset[:limit + 1])
+    if len(rows) <= limit:
+        return Page(rows, None)
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return Page(rows, encode_cursor([_field_value(last, f.lstrip("-")) for f in ordering]))
@@ -0,0 +1,134 @@
+"""
+Escritura de resultados del escaneo.
+
+Todo lo que produce un escaneo se acumula en memoria y se escribe al
+final con inserciones/actualizaciones en bloque dentro de una única
+transacción. El progreso se guarda como mucho una vez por intervalo.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+from django.db import transaction
+
+PROGRESS_INTERVAL = 1.0  # segundos mínimos entre escrituras de progreso
+BATCH_SIZE = 500
+
+
+class ScanWriter:
+    def __init__(self, batch_size=BATCH_SIZE):
+        self.batch_size = batch_size
+        self.rows_written = 0
+        self.db_seconds = 0.0
+        self._creates = {}
+        self._updates = {}
+        self._on_flush = []
+        self._lock = threading.Lock()  # las regiones encolan desde sus hilos
+
+    @contextmanager
+    def timed(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:  # el progreso se guarda desde los hilos de descarga
+                self.db_seconds += elapsed
+
+    def add(self, obj):
+        """Encola un objeto nuevo para bulk_create."""
+        with self._lock:
+            self._creates.setdefault(type(obj), []).append(obj)
+
+    def extend(self, objs):
+        for obj in objs:
+            self.add(obj)
+
+    def update(self, obj, *fields):
+        """Encola campos modificados de un objeto existente para bulk_update."""
+        with self._lock:
+            objs, all_fields = self._updates.setdefault(type(obj), ({}, set()))
+            objs[obj.pk] = obj
+            all_fields.update(fields)
+
+    def on_flush(self, callback):
+        """
+        `callback()` se ejecuta dentro de la transacción de flush, después
+        de las inserciones (los objetos creados ya tienen pk). Puede
+        devolver el número de filas que escribe.
+        """
+        self._on_flush.append(callback)
+
+    def flush(self):
+        with self.timed(), transaction.atomic():
+            for model, (objs, fields) in self._updates.items():
+                if objs:
+                    model.objects.bulk_update(list(objs.values()), sorted(fields), batch_size=self.batch_size)
+                    self.rows_written += len(objs)
+            for model, objs in self._creates.items():
+                model.objects.bulk_create(objs, batch_size=self.batch_size)
+                self.rows_written += len(objs)
+            for callback in self._on_flush:
+                self.rows_written += callback() or 0
+
+        self._creates = {}
+        self._updates = {}
+        self._on_flush = []
+
+    def progress(self, status, interval=PROGRESS_INTERVAL):
+        return ProgressWriter(self, status, interval)
+
+    def report(self):
+        return {"rows_written": self.rows_written, "db_seconds": round(self.db_seconds, 3)}
+
+
+def reset_progress(status, realms):
+    """
+    Pone a cero el progreso de `status` para los ConnectedRealm `realms`
+    (sin guardar). Devuelve los campos que cambiaron.
+    """
+    status.total_realms = len(realms)
+    status.processed_realms = 0
+    status.current_realm = ""
+    fields = ["total_realms", "processed_realms", "current_realm", "updated_at"]
+    if hasattr(status, "pending_realms"):
+        status.pending_realms = [realm.pk for realm in realms]
+        fields.append("pending_realms")
+    return fields
+
+
+class ProgressWriter:
+    """Guarda el progreso de `status` como mucho una vez cada `interval` segundos."""
+
+    FIELDS = ["current_realm", "processed_realms", "updated_at"]
+
+    def __init__(self, writer, status, interval):
+        self.writer = writer
+        self.status = status
+        self.interval = interval
+        self.fields = self.FIELDS + (["pending_realms"] if hasattr(status, "pending_realms") else [])
+        self._last_save = 0.0
+        self._lock = threading.Lock()
+
+    def update(self, current_realm, processed, force=False):
+        self.status.current_realm = current_realm
+        self.status.processed_realms = processed
+
+        now = time.monotonic()
+        if not force and now - self._last_save < self.interval:
+            return
+
+        with self.writer.timed():
+            self.status.save(update_fields=self.fields)
+        self._last_save = now
+
+    def advance(self, current_realm, realm_pk=None):
+        """
+        Un reino más procesado. Se puede llamar desde varios hilos (una
+        región por hilo); el último reino del total siempre se guarda.
+        """
+        with self._lock:
+            if realm_pk is not None and realm_pk in getattr(self.status, "pending_realms", ()):
+                self.status.pending_realms.remove(realm_pk)
+            processed = self.status.processed_realms + 1
+            self.update(current_realm, processed, force=processed == self.status.total_realms)
@@ -0,0 +1,152 @@
+"""
+Índice de precios por reino.
+
+Cada volcado de subastas se recorre una sola vez y se reduce a
+item_id -> PriceEntry, de modo que consultar el precio de un item
+no vuelve a recorrer las subastas.
+"""
+from bisect import bisect_left
+from itertools import accumulate
+
+
+class PriceLadder:
+    """
+    Publicaciones de un item ordenadas por precio unitario, con sumas
+    acumuladas de cantidad y coste para responder "¿cuánto cuesta
+    comprar N unidades?" en O(log n).
+    """
+    __slots__ = ("prices", "cum_quantity", "cum_cost")
+
+    def __init__(self, levels):
+        levels = sorted(levels)
+        self.prices = [price for price, _ in levels]
+        self.cum_quantity = list(accumulate(quantity for _, quantity in levels))
+        self.cum_cost = list(accumulate(price * quantity for price, quantity in levels))
+
+    def __len__(self):
+        return len(self.prices)
+
+    @property
+    def total_quantity(self):
+        return self.cum_quantity[-1] if self.cum_quantity else 0
+
+    def levels(self):
+        previous = 0
+        for price, cum in zip(self.prices, self.cum_quantity):
+            yield price, cum - previous
+            previous = cum
+
+    def cost(self, quantity):
+        """Coste de comprar `quantity` unidades empezando por las más baratas (None si no hay tantas)."""
+        if quantity <= 0:
+            return 0
+        if quantity > self.total_quantity:
+            return None
+
+        i = bisect_left(self.cum_quantity, quantity)
+        bought = self.cum_quantity[i - 1] if i else 0
+        spent = self.cum_cost[i - 1] if i else 0
+        return spent + (quantity - bought) * self.prices[i]
+
+    def unit_cost(self, quantity):
+        cost = self.cost(quantity)
+        return None if cost is None else cost / quantity
+
+
+class PriceEntry:
+    __slots__ = ("min_price", "listings", "quantity", "ladder")
+
+    def __init__(self, min_price, listings=0, quantity=0, ladder=None):
+        self.min_price = min_price
+        self.listings = listings
+        self.quantity = quantity
+        self.ladder = ladder
+
+    def __repr__(self):
+        return (
+            f"PriceEntry(min_price={self.min_price}, "
+            f"listings={self.listings}, quantity={self.quantity})"
+        )
+
+    def unit_cost(self, quantity=1):
+        """
+        Precio unitario medio de comprar `quantity` unidades. Sin escalera
+        de precios se usa el mínimo; None si no hay suficiente oferta.
+        """
+        if quantity <= 1 or self.ladder is None:
+            return self.min_price
+        return self.ladder.unit_cost(quantity)
+
+
+def get_price_per_unit(a):
+    if a.get("unit_price"):
+        return a["unit_price"]
+    if a.get("buyout"):
+        return a["buyout"] / a.get("quantity", 1)
+    return None
+
+
+def build_price_index(auctions, item_ids=None, listings=None, ladders=False):
+    """
+    Una sola pasada sobre las subastas de un reino.
+    Devuelve {item_id: PriceEntry} con el precio unitario mínimo,
+    el número de publicaciones y la cantidad total con precio de compra.
+    Si se pasa `item_ids`, el resto de items se descarta durante la pasada.
+    Si se pasa `listings` (un ListingCollector), se le añaden todas las
+    publicaciones con precio, estén o no en `item_ids`.
+    Con `ladders=True` cada entrada guarda además su PriceLadder.
+    """
+    index = {}
+    levels = {}
+    for a in auctions:
+        item_id = a.get("item", {}).get("id")
+        wanted = item_ids is None or item_id in item_ids
+        if not wanted and listings is None:
+            continue
+        price = get_price_per_unit(a)
+        if not item_id or not price:
+            continue
+
+        quantity = a.get("quantity", 1)
+        if listings is not None:
+            listings.append(a.get("id"), item_id, price, quantity)
+            if not wanted:
+                continue
+
+        if ladders:
+            levels.setdefault(item_id, []).append((price, quantity))
+
+        entry = index.get(item_id)
+        if entry is None:
+            index[item_id] = PriceEntry(price, 1, quantity)
+            continue
+
+        if price < entry.min_price:
+            entry.min_price = price
+        entry.listings += 1
+        entry.quantity += quantity
+
+    for item_id, item_levels in levels.items():
+        index[item_id].ladder = PriceLadder(item_levels)
+
+    return index
+
+
+def index_to_json(index):
+    data = {}
+    for item_id, e in index.items():
+        values = [e.min_price, e.listings, e.quantity]
+        if e.ladder is not None:
+            values.append([list(level) for level in e.ladder.levels()])
+        data[str(item_id)] = values
+    return data
+
+
+def index_from_json(data):
+    index = {}
+    for item_id, values in data.items():
+        entry = PriceEntry(*values[:3])
+        if len(values) > 3:
+            entry.ladder = PriceLadder(tuple(level) for level in values[3])
+        index[int(item_id)] = entry
+    return index
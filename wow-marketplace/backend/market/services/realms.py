@@ -0,0 +1,193 @@
+"""
+Lista de reinos de cada región y su reino conectado.
+
+Los JSON de reinos (wow_realms_connected*.json, del notebook
+ListRealms.ipynb) tienen IDs de reino, pero las subastas son por reino
+conectado y muchos reinos comparten uno. `manage.py sync_realms`
+pregunta a la API a qué reino conectado pertenece cada reino (en
+paralelo) y guarda la relación en la tabla Realm. Los escaneos leen los
+reinos conectados de la región con una sola consulta, así que cada
+volcado se descarga una vez aunque lo compartan varios reinos.
+
+La sincronización compara con lo guardado y solo escribe lo que cambió:
+si nada cambió, cuesta la consulta de lectura.
+"""
+import json
+import re
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.db.models import Min
+
+from market.models import DEFAULT_REGION, ConnectedRealm, Realm
+from market.services.http import get_session
+
+MAX_PARALLEL_LOOKUPS = 8
+LOOKUP_TIMEOUT = (5, 15)  # (conexión, lectura) en segundos por reino
+
+CONNECTED_REALM_HREF = re.compile(r"/connected-realm/(\d+)")
+
+RealmSync = namedtuple("RealmSync", ["realms", "connected", "created", "updated", "deleted"])
+
+
+def read_realm_list(path):
+    """Entradas {"id", "name", "slug"} del JSON de reinos de una región."""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# ======================
+# API
+# ======================
+def fetch_connected_realm_id(token, slug, region=DEFAULT_REGION, locale="en_US"):
+    r = get_session().get(
+        f"https://{region}.api.blizzard.com/data/wow/realm/{slug}",
+        headers={"Authorization": f"Bearer {token}"},
+        params={"namespace": f"dynamic-{region}", "locale": locale},
+        timeout=LOOKUP_TIMEOUT,
+    )
+    r.raise_for_status()
+    match = CONNECTED_REALM_HREF.search(r.json()["connected_realm"]["href"])
+    return int(match.group(1)) if match else None
+
+
+def resolve_connected_realms(
+    entries, token, region=DEFAULT_REGION, locale="en_US", max_workers=MAX_PARALLEL_LOOKUPS
+):
+    """
+    {ID de reino: ID de su reino conectado} con las consultas en
+    paralelo. Los reinos que fallan quedan con None.
+    """
+    get_session(max_workers)  # una conexión keep-alive por hilo
+
+    def lookup(entry):
+        try:
+            return fetch_connected_realm_id(token, entry["slug"], region, locale)
+        except (requests.RequestException, KeyError, ValueError) as e:
+            print(f"⚠️ Error resolviendo el reino '{entry['name']}': {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return dict(zip((entry["id"] for entry in entries), pool.map(lookup, entries)))
+
+
+# ======================
+# BASE DE DATOS
+# ======================
+def sync_realm_mapping(region, entries, connected_ids):
+    """
+    Guarda la relación reino -> reino conectado de `region`.
+    `connected_ids` es la salida de resolve_connected_realms; los reinos
+    sin resolver conservan lo que ya hubiera guardado. Los reinos que ya
+    no están en `entries` se borran. El reino conectado toma el nombre
+    del reino con su mismo ID (o el de ID más bajo del grupo).
+    """
+    existing = {
+        row.blizzard_id: row
+        for row in Realm.objects.filter(region=region).select_related("connected_realm")
+    }
+
+    groups = {}
+    for entry in entries:
+        connected_id = connected_ids.get(entry["id"])
+        if connected_id is None:
+            row = existing.get(entry["id"])
+            if row is None:
+                continue
+            connected_id = row.connected_realm.blizzard_id
+        groups.setdefault(connected_id, []).append(entry)
+
+    wanted = {}
+    for connected_id, group in groups.items():
+        primary = next((e for e in group if e["id"] == connected_id), None)
+        primary = primary or min(group, key=lambda e: e["id"])
+        wanted[connected_id] = (primary["name"], primary["slug"])
+
+    current = {
+        row.connected_realm.blizzard_id: (row.connected_realm.name, row.connected_realm.slug)
+        for row in existing.values()
+    }
+    pks = {row.connected_realm.blizzard_id: row.connected_realm_id for row in existing.values()}
+
+    stale_connected = {
+        connected_id: names for connected_id, names in wanted.items() if current.get(connected_id) != names
+    }
+    if stale_connected:
+        ConnectedRealm.objects.bulk_create(
+            [
+                ConnectedRealm(region=region, blizzard_id=connected_id, name=name, slug=slug)
+                for connected_id, (name, slug) in stale_connected.items()
+            ],
+            update_conflicts=True,
+            unique_fields=["region", "blizzard_id"],
+            update_fields=["name", "slug"],
+        )
+        pks.update(
+            ConnectedRealm.objects.filter(region=region, blizzard_id__in=list(stale_connected))
+            .values_list("blizzard_id", "pk")
+        )
+
+    stale_realms = []
+    for connected_id, group in groups.items():
+        for entry in group:
+            row = existing.get(entry["id"])
+            values = (entry["name"], entry["slug"], pks[connected_id])
+            if row is None or (row.name, row.slug, row.connected_realm_id) != values:
+                stale_realms.append(Realm(
+                    region=region,
+                    blizzard_id=entry["id"],
+                    name=entry["name"],
+                    slug=entry["slug"],
+                    connected_realm_id=pks[connected_id],
+                ))
+    if stale_realms:
+        Realm.objects.bulk_create(
+            stale_realms,
+            update_conflicts=True,
+            unique_fields=["region", "blizzard_id"],
+            update_fields=["name", "slug", "connected_realm"],
+        )
+
+    listed = {entry["id"] for entry in entries}
+    removed = [row.pk for blizzard_id, row in existing.items() if blizzard_id not in listed]
+    if removed:
+        Realm.objects.filter(pk__in=removed).delete()
+
+    created = sum(realm.blizzard_id not in existing for realm in stale_realms)
+    return RealmSync(
+        realms=sum(len(group) for group in groups.values()),
+        connected=len(groups),
+        created=created,
+        updated=len(stale_realms) - created,
+        deleted=len(removed),
+    )
+
+
+def load_connected_realms(region=DEFAULT_REGION):
+    """
+    {nombre: ConnectedRealm} de los reinos conectados con algún reino de
+    la lista, en una consulta. Van en el orden del JSON de reinos (el de
+    su primer reino guardado), que es el que recorta DEV_MODE.
+    """
+    realms = (
+        ConnectedRealm.objects.filter(region=region)
+        .annotate(first_realm=Min("realms__pk"))
+        .filter(first_realm__isnull=False)
+        .order_by("first_realm")
+    )
+    return {realm.name: realm for realm in realms}
+
+
+def connected_realm_names(region, names):
+    """
+    Nombres de reino conectado de `names`, que pueden ser de cualquier
+    reino del grupo y no solo del que le da nombre. Los desconocidos se
+    devuelven tal cual; None (todos los reinos) sigue siendo None.
+    """
+    if names is None:
+        return None
+    aliases = dict(
+        Realm.objects.filter(region=region, name__in=names).values_list("name", "connected_realm__name")
+    )
+    return list(dict.fromkeys(aliases.get(name, name) for name in names))
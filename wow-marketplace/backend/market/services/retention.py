@@ -0,0 +1,223 @@
+"""
+Retención del histórico.
+
+Las filas crudas antiguas (PriceSnapshot e ItemPriceSnapshot) se agregan
+en PriceRollup por hora, y las horas antiguas por día. Se trabaja en
+lotes acotados: cada lote agrega sus filas, las suma a los agregados
+existentes y borra las originales en una transacción corta, así que el
+dashboard nunca espera a un bloqueo largo y un corte a medias no cuenta
+nada dos veces.
+"""
+import time
+from datetime import timedelta, timezone as dt_timezone
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from market.models import ItemPriceSnapshot, LatestOpportunity, PriceRollup, PriceSnapshot
+
+RAW_RETENTION_DAYS = 7  # filas crudas que se conservan
+HOURLY_RETENTION_DAYS = 90  # agregados por hora que se conservan
+DAILY_RETENTION_DAYS = None  # None = los agregados diarios no se borran
+BATCH_SIZE = 2000  # filas por transacción
+BATCH_PAUSE = 0.05  # segundos entre lotes para dejar pasar otras escrituras
+VACUUM_MIN_DELETED = 50_000  # filas borradas a partir de las que compensa un VACUUM
+
+# Métricas de ItemPriceSnapshot: nombre -> campo
+OPPORTUNITY_METRICS = {
+    "profit": "profit",
+    "buy_price": "buy_price",
+    "sell_price": "estimated_sell_price",
+}
+
+
+def truncate(dt, resolution):
+    dt = dt.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+    if resolution == PriceRollup.DAY:
+        dt = dt.replace(hour=0)
+    return dt
+
+
+class Aggregate:
+    __slots__ = ("minimum", "maximum", "total", "samples")
+
+    def __init__(self):
+        self.minimum = float("inf")
+        self.maximum = float("-inf")
+        self.total = 0.0
+        self.samples = 0
+
+    def add(self, minimum, maximum, mean, samples):
+        self.minimum = min(self.minimum, minimum)
+        self.maximum = max(self.maximum, maximum)
+        self.total += mean * samples
+        self.samples += samples
+
+    @property
+    def mean(self):
+        return self.total / self.samples
+
+
+def _merge_into_rollups(aggregates, resolution):
+    """
+    `aggregates` es {(item_id, region, realm_id, metric, bucket): Aggregate}.
+    Suma cada agregado al PriceRollup existente o crea uno nuevo.
+    """
+    if not aggregates:
+        return 0
+
+    existing = PriceRollup.objects.filter(
+        resolution=resolution,
+        item_id__in={key[0] for key in aggregates},
+        metric__in={key[3] for key in aggregates},
+        bucket__in={key[4] for key in aggregates},
+    )
+    by_key = {(r.item_id, r.region, r.realm_id, r.metric, r.bucket): r for r in existing}
+
+    to_create, to_update = [], []
+    for key, agg in aggregates.items():
+        rollup = by_key.get(key)
+        if rollup is not None:
+            agg.add(rollup.minimum, rollup.maximum, rollup.mean, rollup.samples)
+            to_update.append(rollup)
+        else:
+            item_id, region, realm_id, metric, bucket = key
+            rollup = PriceRollup(
+                item_id=item_id, region=region, realm_id=realm_id, metric=metric,
+                resolution=resolution, bucket=bucket,
+            )
+            to_create.append(rollup)
+        rollup.minimum = agg.minimum
+        rollup.maximum = agg.maximum
+        rollup.mean = agg.mean
+        rollup.samples = agg.samples
+
+    PriceRollup.objects.bulk_update(to_update, ["minimum", "maximum", "mean", "samples"])
+    PriceRollup.objects.bulk_create(to_create)
+    return len(to_update) + len(to_create)
+
+
+def _in_batches(queryset, fields, fold, resolution, batch_size, pause):
+    """
+    Vacía `queryset` lote a lote: cada lote se agrega con
+    `fold(rows, aggregates)`, se suma a los PriceRollup y se borra, así
+    que siempre se toma el primer lote que quede.
+    Devuelve (filas borradas, agregados escritos).
+    """
+    deleted = written = 0
+    while True:
+        with transaction.atomic():
+            rows = list(queryset.order_by("pk").values_list("pk", *fields)[:batch_size])
+            if not rows:
+                break
+            aggregates = {}
+            fold(rows, aggregates)
+            written += _merge_into_rollups(aggregates, resolution)
+            queryset.model.objects.filter(pk__in=[row[0] for row in rows]).delete()
+        deleted += len(rows)
+        if pause:
+            time.sleep(pause)
+    return deleted, written
+
+
+def _fold_prices(rows, aggregates):
+    for _, item_id, region, realm_id, created_at, min_price in rows:
+        key = (item_id, region, realm_id, "min_price", truncate(created_at, PriceRollup.HOUR))
+        aggregates.setdefault(key, Aggregate()).add(min_price, min_price, min_price, 1)
+
+
+def _fold_opportunities(rows, aggregates):
+    # Sin reino, pero nunca se mezclan regiones: cada una tiene sus precios
+    for _, item_id, region, created_at, *values in rows:
+        bucket = truncate(created_at, PriceRollup.HOUR)
+        for metric, value in zip(OPPORTUNITY_METRICS, values):
+            value = float(value)
+            aggregates.setdefault((item_id, region, None, metric, bucket), Aggregate()).add(value, value, value, 1)
+
+
+def _fold_hours(rows, aggregates):
+    for _, item_id, region, realm_id, metric, bucket, minimum, maximum, mean, samples in rows:
+        key = (item_id, region, realm_id, metric, truncate(bucket, PriceRollup.DAY))
+        aggregates.setdefault(key, Aggregate()).add(minimum, maximum, mean, samples)
+
+
+def compact_history(
+    raw_days=RAW_RETENTION_DAYS,
+    hourly_days=HOURLY_RETENTION_DAYS,
+    daily_days=DAILY_RETENTION_DAYS,
+    batch_size=BATCH_SIZE,
+    pause=BATCH_PAUSE,
+    now=None,
+):
+    """
+    Agrega y borra el histórico más antiguo que las ventanas de retención.
+    Los cortes se redondean a la hora/día para no partir un bucket.
+    Devuelve un informe con las filas borradas y los agregados escritos.
+    """
+    now = now or timezone.now()
+    raw_cutoff = truncate(now - timedelta(days=raw_days), PriceRollup.HOUR)
+    hourly_cutoff = truncate(now - timedelta(days=hourly_days), PriceRollup.DAY)
+    report = {}
+
+    report["prices_deleted"], report["price_rollups"] = _in_batches(
+        PriceSnapshot.objects.filter(created_at__lt=raw_cutoff),
+        ["item_id", "realm__region", "realm_id", "created_at", "min_price"],
+        _fold_prices, PriceRollup.HOUR, batch_size, pause,
+    )
+
+    # Los snapshots a los que apunta LatestOpportunity se conservan: son
+    # la oportunidad actual de su item.
+    report["snapshots_deleted"], report["snapshot_rollups"] = _in_batches(
+        ItemPriceSnapshot.objects
+        .filter(created_at__lt=raw_cutoff)
+        .exclude(id__in=LatestOpportunity.objects.values("snapshot_id")),
+        ["item_id", "region", "created_at", *OPPORTUNITY_METRICS.values()],
+        _fold_opportunities, PriceRollup.HOUR, batch_size, pause,
+    )
+
+    report["hourly_deleted"], report["daily_rollups"] = _in_batches(
+        PriceRollup.objects.filter(resolution=PriceRollup.HOUR, bucket__lt=hourly_cutoff),
+        ["item_id", "region", "realm_id", "metric", "bucket", "minimum", "maximum", "mean", "samples"],
+        _fold_hours, PriceRollup.DAY, batch_size, pause,
+    )
+
+    report["daily_deleted"] = 0
+    if daily_days is not None:
+        daily = PriceRollup.objects.filter(
+            resolution=PriceRollup.DAY,
+            bucket__lt=truncate(now - timedelta(days=daily_days), PriceRollup.DAY),
+        )
+        while True:
+            ids = list(daily.values_list("pk", flat=True)[:batch_size])
+            if not ids:
+                break
+            PriceRollup.objects.filter(pk__in=ids).delete()
+            report["daily_deleted"] += len(ids)
+
+    return report
+
+
+def optimize_database(deleted=0, vacuum=False):
+    """
+    Actualiza las estadísticas del planificador y, si la compactación
+    borró al menos VACUUM_MIN_DELETED filas (o con `vacuum`), devuelve
+    al sistema el espacio liberado. En SQLite el VACUUM reescribe el
+    fichero entero con un bloqueo exclusivo que para la web y los
+    escaneos, así que no se hace en cada pasada.
+    Debe llamarse fuera de cualquier transacción.
+    """
+    vacuum = vacuum or deleted >= VACUUM_MIN_DELETED
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            if not vacuum:
+                cursor.execute("PRAGMA optimize")
+                return "PRAGMA optimize"
+            cursor.execute("VACUUM")
+            cursor.execute("ANALYZE")
+            return "VACUUM + ANALYZE"
+        if connection.vendor == "postgresql":
+            tables = ", ".join(m._meta.db_table for m in (PriceSnapshot, ItemPriceSnapshot, PriceRollup))
+            command = "VACUUM ANALYZE" if vacuum else "ANALYZE"
+            cursor.execute(f"{command} {tables}")
+            return command
+    return None
@@ -0,0 +1,101 @@
+"""
+Calendario de sondeo por reino para `update_auctions --daemon`.
+
+Blizzard regenera el volcado de subastas de cada reino conectado más o
+menos una vez por hora, cada uno a su minuto. La cabecera Last-Modified
+dice cuándo se publicó el último, así que el siguiente se espera una
+hora después: el reino se vuelve a pedir entonces (más un margen y algo
+de jitter para no lanzar todas las peticiones a la vez). Si al pedirlo
+todavía no ha cambiado (304), se reintenta con espera creciente.
+"""
+import random
+from datetime import timedelta
+from email.utils import parsedate_to_datetime
+
+PUBLISH_INTERVAL = timedelta(hours=1)  # cada cuánto se regenera un volcado
+PUBLISH_GRACE = timedelta(minutes=2)  # margen tras la hora prevista
+RETRY_INTERVAL = timedelta(minutes=3)  # primer reintento si aún no cambió
+MAX_RETRY_INTERVAL = timedelta(minutes=20)
+JITTER = timedelta(seconds=60)  # retraso aleatorio máximo de cada sondeo
+
+
+def parse_last_modified(value):
+    """Fecha de una cabecera Last-Modified (None si falta o no es válida)."""
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class RealmScheduler:
+    """
+    Próximo sondeo de cada reino, por pk de ConnectedRealm. Los reinos
+    nuevos se piden en seguida; después cada uno sigue su propio ritmo.
+    """
+
+    def __init__(
+        self,
+        publish_interval=PUBLISH_INTERVAL,
+        grace=PUBLISH_GRACE,
+        retry=RETRY_INTERVAL,
+        max_retry=MAX_RETRY_INTERVAL,
+        jitter=JITTER,
+        rng=None,
+    ):
+        self.publish_interval = publish_interval
+        self.grace = grace
+        self.retry = retry
+        self.max_retry = max_retry
+        self.jitter = jitter
+        self.rng = rng or random.Random()
+        self._due = {}
+        self._misses = {}
+
+    def __len__(self):
+        return len(self._due)
+
+    def sync(self, realms, now):
+        """Añade los reinos nuevos (pendientes ya) y olvida los que no estén en `realms`."""
+        pks = {realm.pk for realm in realms}
+        for pk in set(self._due) - pks:
+            del self._due[pk]
+            self._misses.pop(pk, None)
+        for pk in pks - set(self._due):
+            self._due[pk] = now
+
+    def due(self, now):
+        """pks de los reinos que toca pedir."""
+        return [pk for pk, when in self._due.items() if when <= now]
+
+    def next_due(self):
+        return min(self._due.values()) if self._due else None
+
+    def expected_publish(self, realm):
+        published = parse_last_modified(realm.auctions_last_modified)
+        if published is None:
+            return None
+        return published + self.publish_interval + self.grace
+
+    def record(self, realm, changed, now):
+        """
+        Programa el siguiente sondeo de `realm` tras pedirlo. Si se sabe
+        cuándo se publicará el próximo volcado se espera a esa hora; si
+        ya debería haber salido y no cambió, se reintenta cada vez más
+        espaciado. Devuelve la hora programada.
+        """
+        if changed:
+            self._misses[realm.pk] = 0
+
+        expected = self.expected_publish(realm)
+        if expected is not None and expected > now:
+            when = expected
+        else:
+            misses = self._misses.get(realm.pk, 0)
+            self._misses[realm.pk] = misses + 1
+            when = now + min(self.retry * 2 ** misses, self.max_retry)
+
+        when += timedelta(seconds=self.rng.uniform(0, self.jitter.total_seconds()))
+        self._due[realm.pk] = when
+        return when
@@ -0,0 +1,89 @@
+"""
+Generador reproducible de volcados de subastas sintéticos para benchmarks.
+
+Imita el formato de /connected-realm/{id}/auctions: commodities con
+unit_price y quantity, y equipo/objetos únicos con buyout (algunos solo
+con puja). La popularidad de los items sigue una distribución Zipf.
+"""
+import numpy as np
+
+MAX_ITEM_ID = 250_000
+
+
+class SyntheticMarket:
+    def __init__(
+        self,
+        seed=0,
+        realms=30,
+        auctions_per_realm=20_000,
+        items=5_000,
+        zipf_a=1.3,
+        commodity_ratio=0.6,
+        bid_only_ratio=0.05,
+    ):
+        self.seed = seed
+        self.realms = realms
+        self.auctions_per_realm = auctions_per_realm
+        self.zipf_a = zipf_a
+        self.commodity_ratio = commodity_ratio
+        self.bid_only_ratio = bid_only_ratio
+
+        rng = np.random.default_rng(seed)
+        self.item_ids = rng.choice(np.arange(1, MAX_ITEM_ID), size=items, replace=False)
+        # Precio base por item (cobre), log-normal: muchos baratos y pocos caros
+        self.base_prices = np.exp(rng.normal(9.5, 1.6, size=items))
+        self.realm_ids = list(range(1, realms + 1))
+
+    def params(self):
+        return {
+            "seed": self.seed,
+            "realms": self.realms,
+            "auctions_per_realm": self.auctions_per_realm,
+            "items": len(self.item_ids),
+            "zipf_a": self.zipf_a,
+            "commodity_ratio": self.commodity_ratio,
+            "bid_only_ratio": self.bid_only_ratio,
+        }
+
+    def popular_item_ids(self, n):
+        """Los `n` items con más publicaciones (los de menor rango Zipf)."""
+        return [int(i) for i in self.item_ids[:n]]
+
+    def realm_auctions(self, realm_id):
+        """Lista de subastas de un reino; el mismo reino da siempre lo mismo."""
+        rng = np.random.default_rng([self.seed, realm_id])
+        n = self.auctions_per_realm
+
+        ranks = np.minimum(rng.zipf(self.zipf_a, size=n), len(self.item_ids)) - 1
+        items = self.item_ids[ranks]
+        # Cada reino tiene su propio nivel de precios y ruido por publicación
+        prices = self.base_prices[ranks] * rng.lognormal(0, 0.08) * rng.lognormal(0, 0.25, size=n)
+        commodity = rng.random(n) < self.commodity_ratio
+        bid_only = rng.random(n) < self.bid_only_ratio
+        quantities = np.where(commodity, rng.integers(1, 200, size=n), 1)
+        auction_ids = realm_id * 10_000_000 + np.arange(n)
+
+        auctions = []
+        for i in range(n):
+            a = {
+                "id": int(auction_ids[i]),
+                "item": {"id": int(items[i])},
+                "quantity": int(quantities[i]),
+                "time_left": "LONG",
+            }
+            price = max(int(prices[i]), 1)
+            if commodity[i]:
+                a["unit_price"] = price
+            elif bid_only[i]:
+                a["bid"] = price
+            else:
+                a["buyout"] = price * a["quantity"]
+            auctions.append(a)
+        return auctions
+
+    def realm_payload(self, realm_id):
+        return {
+            "_links": {"self": {"href": f"https://us.api.blizzard.com/data/wow/connected-realm/{realm_id}/auctions"}},
+            "connected_realm": {"href": f"https://us.api.blizzard.com/data/wow/connected-realm/{realm_id}"},
+            "auctions": self.realm_auctions(realm_id),
+        }
@@ -0,0 +1,98 @@
+"""
+Token OAuth de Blizzard compartido.
+
+El token se guarda en memoria y en la tabla ApiToken hasta poco antes
+de que caduque, de modo que las vistas, el escaneo y los workers de
+otros procesos reutilizan el mismo en vez de pedir uno por llamada.
+"""
+import threading
+from datetime import timedelta
+
+from django.utils import timezone
+
+from market.models import ApiToken
+from market.services.http import get_session
+
+EXPIRY_MARGIN = timedelta(minutes=5)  # renovar antes de que caduque
+TOKEN_TIMEOUT = (5, 30)  # (conexión, lectura) en segundos
+DEFAULT_EXPIRES_IN = 3600  # segundos, si la respuesta no trae expires_in
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+class TokenProvider:
+    def __init__(self, region, load_credentials):
+        self.region = region
+        self._load_credentials = load_credentials
+        self._credentials = None
+        self._token = None
+        self._expires_at = None
+        self._lock = threading.Lock()
+
+    def _is_fresh(self, expires_at):
+        return expires_at is not None and expires_at - EXPIRY_MARGIN > timezone.now()
+
+    def credentials(self):
+        if self._credentials is None:
+            self._credentials = self._load_credentials()
+        return self._credentials
+
+    def get(self):
+        token, expires_at = self._token, self._expires_at
+        if self._is_fresh(expires_at):
+            return token
+
+        # Solo un hilo renueva; el resto espera y reutiliza el resultado
+        with self._lock:
+            if self._is_fresh(self._expires_at):
+                return self._token
+
+            stored = ApiToken.objects.filter(region=self.region).first()
+            if stored and self._is_fresh(stored.expires_at):
+                self._token, self._expires_at = stored.access_token, stored.expires_at
+                return self._token
+
+            self._refresh()
+            return self._token
+
+    def invalidate(self, token=None):
+        """
+        Descarta el token (p. ej. revocado: la API respondió 401). Con
+        `token`, solo si sigue siendo el actual: cuando varios hilos
+        reciben el 401 a la vez, el primero lo renueva y el resto
+        reutiliza el nuevo.
+        """
+        with self._lock:
+            if token is not None and self._token is not None and self._token != token:
+                return
+            self._token = self._expires_at = None
+            stored = ApiToken.objects.filter(region=self.region)
+            if token is not None:
+                stored = stored.filter(access_token=token)
+            stored.delete()
+
+    def _refresh(self):
+        client_id, client_secret = self.credentials()
+        r = get_session().post(
+            f"https://{self.region}.battle.net/oauth/token",
+            auth=(client_id, client_secret),
+            data={"grant_type": "client_credentials"},
+            timeout=TOKEN_TIMEOUT,
+        )
+        r.raise_for_status()
+        data = r.json()
+
+        self._token = data["access_token"]
+        self._expires_at = timezone.now() + timedelta(seconds=data.get("expires_in") or DEFAULT_EXPIRES_IN)
+        ApiToken.objects.update_or_create(
+            region=self.region,
+            defaults={"access_token": self._token, "expires_at": self._expires_at},
+        )
+
+
+def get_token_provider(region, load_credentials):
+    with _providers_lock:
+        if region not in _providers:
+            _providers[region] = TokenProvider(region, load_credentials)
+        return _providers[region]
@@ -29,7 +29,7 @@ document.addEventListener("DOMContentLoaded", () => {
             
             if (data.running) {
                 wasRunning = true;
-                stateEl.innerText = "Running";
+                stateEl.innerText = data.state === "queued" ? "Queued" : "Running";
                 currentEl.innerText = data.current || "-";
                 doneEl.innerText = data.done || 0;
                 totalEl.innerText = data.total || 0;
@@ -52,6 +52,9 @@ document.addEventListener("DOMContentLoaded", () => {
         });
         startPolling();
     });
+
+    // Si ya hay un escaneo en cola o en curso, mostrar su progreso
+    startPolling();
     
     // ===================== Collapsable Tables =====================
     const collapsibleTitles = document.querySelectorAll('.collapsible');
@@ -84,25 +87,99 @@ document.addEventListener("DOMContentLoaded", () => {
         });
     });
     
-    // ===================== Delete Items =====================
-    document.querySelectorAll(".delete-item-btn").forEach(btn => {
+    // ===================== Load More (API por cursor) =====================
+    const DEFAULT_ICON = "https://wow.zamimg.com/images/wow/icons/large/inv_misc_rune_01.jpg";
+    
+    function escapeHtml(value) {
+        const div = document.createElement("div");
+        div.innerText = value ?? "";
+        return div.innerHTML;
+    }
+    
+    function formatDate(iso) {
+        if (!iso) return "";
+        const d = new Date(iso), pad = n => String(n).padStart(2, "0");
+        return `${pad(d.getDate())}/${pad(d.getMonth() + 1)} ${pad(d.getHours())}:${pad(d.getMinutes())}`;
+    }
+    
+    function iconCell(icon, name) {
+        return `<td><img src="${escapeHtml(icon || DEFAULT_ICON)}" alt="${escapeHtml(name)} icon" style="width: 50px; height: 50px;"></td>`;
+    }
+    
+    const rowBuilders = {
+        "items-body": item => {
+            const row = document.createElement("tr");
+            row.id = `item-row-${item.id}`;
+            row.innerHTML = `
+                <td><input type="checkbox" class="item-check" value="${item.id}" ${item.tracked ? "checked" : ""}></td>
+                <td>${item.blizzard_id ?? "-"}</td>
+                <td>${escapeHtml(item.name)}</td>
+                ${iconCell(item.icon, item.name)}
+                <td>${formatDate(item.added_at)}</td>
+                <td>${item.tracked ? "✅" : "❌"}</td>
+                <td><button class="delete-item-btn" data-id="${item.id}">🗑️</button></td>
+            `;
+            return row;
+        },
+        "snapshots-body": s => {
+            const row = document.createElement("tr");
+            row.id = `snapshot-row-${s.id}`;
+            row.innerHTML = `
+                <td><input type="checkbox" class="snapshot-check" value="${s.id}"></td>
+                <td>${s.blizzard_id ?? ""}</td>
+                <td>${formatDate(s.created_at)}</td>
+                <td>${escapeHtml(s.item_name)}</td>
+                ${iconCell(s.icon, s.item_name)}
+                <td>${escapeHtml(s.region.toUpperCase())}</td>
+                <td>${escapeHtml(s.best_buy_realm)}</td>
+                <td>${s.buy_price} g</td>
+                <td>${escapeHtml(s.best_sell_realm)}</td>
+                <td>${s.estimated_sell_price} g</td>
+                <td class="profit">${s.profit} g</td>
+            `;
+            return row;
+        },
+    };
+    
+    document.querySelectorAll(".load-more").forEach(btn => {
         btn.addEventListener("click", () => {
-            const itemId = btn.dataset.id;
-            if (!confirm("Eliminar completamente este item?")) return;
+            const params = new URLSearchParams({ cursor: btn.dataset.cursor });
+            const tbody = document.getElementById(btn.dataset.target);
+            btn.disabled = true;
             
-            fetch("/api/delete-item/", {
-                method: "POST",
-                headers: {
-                    "Content-Type": "application/json",
-                    "X-CSRFToken": csrf
-                },
-                body: JSON.stringify({ item_id: itemId })
-            })
+            fetch(`${btn.dataset.url}?${params}`)
             .then(r => r.json())
             .then(data => {
-                if (data.ok) document.getElementById(`item-row-${itemId}`).remove();
-                else alert("Error: " + (data.error || "No se pudo eliminar"));
-            });
+                if (!data.ok) return alert("Error: " + (data.error || "No se pudo cargar"));
+                data.results.forEach(row => tbody.appendChild(rowBuilders[btn.dataset.target](row)));
+                btn.dataset.cursor = data.next_cursor || "";
+                btn.hidden = !data.next_cursor;
+            })
+            .finally(() => btn.disabled = false);
+        });
+    });
+    
+    // ===================== Delete Items =====================
+    // Delegado en el documento para que funcione también con las filas cargadas después
+    document.addEventListener("click", e => {
+        const btn = e.target.closest(".delete-item-btn");
+        if (!btn) return;
+        
+        const itemId = btn.dataset.id;
+        if (!confirm("Eliminar completamente este item?")) return;
+        
+        fetch("/api/delete-item/", {
+            method: "POST",
+            headers: {
+                "Content-Type": "application/json",
+                "X-CSRFToken": csrf
+            },
+            body: JSON.stringify({ item_id: itemId })
+        })
+        .then(r => r.json())
+        .then(data => {
+            if (data.ok) document.getElementById(`item-row-${itemId}`).remove();
+            else alert("Error: " + (data.error || "No se pudo eliminar"));
         });
     });
     
@@ -125,10 +202,8 @@ document.getElementById("delete-selected")?.addEventListener("click", () => {
         .then(response => response.json())
         .then(data => {
             if (data.deleted > 0) {
-                
-
-                // Actualizar la tabla con los resultados más recientes
-                updateArbitrageResults(data.snapshots);
+                // Quitar de la tabla las filas eliminadas
+                removeSnapshotRows(data.ids);
             } else {
                 alert("No se eliminaron snapshots");
             }
@@ -142,27 +217,9 @@ document.getElementById("delete-selected")?.addEventListener("click", () => {
     }
 });
 
-// Función para actualizar la tabla de arbitraje con los nuevos resultados
-function updateArbitrageResults(snapshots) {
-    const tableBody = document.querySelector("#arbitrage-results-container tbody");
-    tableBody.innerHTML = ''; // Limpiar la tabla existente
-
-    snapshots.forEach(s => {
-        const row = document.createElement("tr");
-
-        row.innerHTML = `
-            <td><input type="checkbox" class="snapshot-check" value="${s.id}"></td>
-            <td>${s.blizzard_id || "-"}</td>
-            <td>${s.item_name}</td>
-            <td>${s.best_buy_realm}</td>
-            <td>${s.buy_price} g</td>
-            <td>${s.best_sell_realm}</td>
-            <td>${s.estimated_sell_price} g</td>
-            <td class="profit">${s.profit} g</td>
-        `;
-
-        tableBody.appendChild(row);
-    });
+// Función para quitar de la tabla de arbitraje los snapshots eliminados
+function removeSnapshotRows(ids) {
+    ids.forEach(id => document.getElementById(`snapshot-row-${id}`)?.remove());
 }
 
     
@@ -1,3 +1,927 @@
-from django.test import TestCase
+import contextlib
+import io
+import json
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from email.utils import format_datetime
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections
+from django.test import Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from market.management.commands import update_auctions as scan
+from market.models import (
+    ApiToken,
+    ConnectedRealm,
+    Item,
+    ItemPriceSnapshot,
+    LatestOpportunity,
+    PriceRollup,
+    PriceSnapshot,
+    Realm,
+    ScanJob,
+    ScanRealmTiming,
+    ScanRun,
+    TrackedItem,
+)
+from market.services import dashboard, item_resolver
+from market.services import token as token_service
+from market.services.arbitrage import build_price_matrix, find_opportunities
+from market.services.archive import (
+    ArchivedScan,
+    ListingCollector,
+    list_scans,
+    realm_path,
+    reuse_realm,
+    scan_dir_for,
+    write_manifest,
+    write_realm,
+)
+from market.services.auction_stream import iter_auctions
+from market.services.backtest import parse_strategies
+from market.services.crafting import CraftingEngine, find_cyclic_items
+from market.services.instrumentation import estimate_remaining
+from market.services.jobs import (
+    STALE_JOB_AFTER,
+    claim_next_job,
+    enqueue_scan,
+    fail_stale_jobs,
+    job_owner,
+    start_scan,
+)
+from market.services.pagination import encode_cursor
+from market.services.persistence import ScanWriter, reset_progress
+from market.services.price_index import PriceEntry, PriceLadder, build_price_index, index_from_json, index_to_json
+from market.services.realms import load_connected_realms, sync_realm_mapping
+from market.services.retention import compact_history, optimize_database
+from market.services.scheduler import JITTER, PUBLISH_GRACE, RETRY_INTERVAL, RealmScheduler, parse_last_modified
+
+LOCMEM_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ConcurrentScanTests(TransactionTestCase):
+    """
+    Un escaneo escribiendo en bloque mientras varios lectores consultan
+    el estado y el dashboard, como pasa con el polling de la home. Corre
+    con el backend configurado (DJANGO_DB_ENGINE=sqlite | postgresql).
+    """
+
+    READERS = 4
+    FLUSHES = 10
+    ROWS_PER_FLUSH = 1000
+    MAX_READ_P95 = 0.5  # segundos; sin WAL una lectura espera a cada flush
+
+    def setUp(self):
+        self.realms = [
+            ConnectedRealm.objects.create(blizzard_id=i, name=f"Realm {i}", slug=f"realm-{i}")
+            for i in range(10)
+        ]
+        self.items = [Item.objects.create(name=f"Item {i}", blizzard_id=i) for i in range(200)]
+        self.job = ScanJob.objects.create(status=ScanJob.RUNNING, total_realms=self.FLUSHES)
+
+    def _write_scan(self, errors):
+        try:
+            job = ScanJob.objects.get(pk=self.job.pk)
+            writer = ScanWriter()
+            progress = writer.progress(job, interval=0)
+            for n in range(self.FLUSHES):
+                for i in range(self.ROWS_PER_FLUSH):
+                    writer.add(PriceSnapshot(
+                        item=self.items[i % len(self.items)],
+                        realm=self.realms[i % len(self.realms)],
+                        min_price=1000 + i,
+                        quantity=1,
+                        listings=1,
+                    ))
+                writer.flush()
+                progress.update(f"Realm {n}", n + 1, force=True)
+        except OperationalError as e:
+            errors.append(f"writer: {e}")
+        finally:
+            connections.close_all()
+
+    def _read_until(self, done, latencies, errors):
+        client = Client()
+        try:
+            while not done.is_set():
+                for url in ("/api/auction-status/", "/"):
+                    start = time.perf_counter()
+                    response = client.get(url)
+                    latencies.append(time.perf_counter() - start)
+                    if response.status_code != 200:
+                        errors.append(f"{url}: HTTP {response.status_code}")
+                start = time.perf_counter()
+                PriceSnapshot.objects.filter(item=self.items[0]).count()
+                latencies.append(time.perf_counter() - start)
+        except OperationalError as e:
+            errors.append(f"reader: {e}")
+        finally:
+            connections.close_all()
+
+    def test_sqlite_runs_in_wal_mode(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("solo SQLite")
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            self.assertEqual(cursor.fetchone()[0], "wal")
+
+    def test_readers_are_not_blocked_by_scan_writes(self):
+        done = threading.Event()
+        errors, latencies = [], []
+
+        readers = [
+            threading.Thread(target=self._read_until, args=(done, latencies, errors))
+            for _ in range(self.READERS)
+        ]
+        for reader in readers:
+            reader.start()
+
+        writer = threading.Thread(target=self._write_scan, args=(errors,))
+        writer.start()
+        writer.join()
+
+        done.set()
+        for reader in readers:
+            reader.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(PriceSnapshot.objects.count(), self.FLUSHES * self.ROWS_PER_FLUSH)
+        self.assertGreater(len(latencies), self.READERS)
+
+        latencies.sort()
+        self.assertLess(latencies[int(len(latencies) * 0.95)], self.MAX_READ_P95)
+
+
+class ScanQueueTests(TransactionTestCase):
+    # TransactionTestCase: el bucle del daemon llama a close_old_connections()
+    def test_enqueue_joins_the_active_job(self):
+        job, created = enqueue_scan()
+        again, created_again = enqueue_scan(start_running=True)
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(again.pk, job.pk)
+        self.assertEqual(again.status, ScanJob.QUEUED)
+
+    def test_claim_records_owner(self):
+        enqueue_scan()
+        job = claim_next_job()
+        self.assertEqual(job.status, ScanJob.RUNNING)
+        self.assertEqual(job.owner, job_owner())
+        self.assertIsNone(claim_next_job())
+
+    def test_only_jobs_without_heartbeat_are_failed(self):
+        live, _ = enqueue_scan(start_running=True)
+        self.assertEqual(fail_stale_jobs(), 0)
+        live.refresh_from_db()
+        self.assertTrue(live.active)
+
+        ScanJob.objects.filter(pk=live.pk).update(updated_at=timezone.now() - STALE_JOB_AFTER - timedelta(seconds=1))
+        self.assertEqual(fail_stale_jobs(), 1)
+        live.refresh_from_db()
+        self.assertEqual(live.status, ScanJob.FAILED)
+        self.assertFalse(live.active)
+        self.assertTrue(enqueue_scan()[1])
+
+    def run_command(self, *args):
+        report = {
+            "regions": {}, "region_errors": {}, "rows_written": 0, "db_seconds": 0, "created": 0,
+        }
+        out, err = io.StringIO(), io.StringIO()
+        # El daemon sale en su primera espera
+        with mock.patch.object(scan, "run_update_auctions", return_value=report), \
+                mock.patch.object(scan.ScanDaemon, "pending", return_value=[]), \
+                mock.patch.object(scan.time, "sleep", side_effect=KeyboardInterrupt):
+            call_command("update_auctions", *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_console_scan_takes_over_a_queued_job(self):
+        queued, _ = enqueue_scan()  # pedido desde el dashboard, sin scan_worker
+        self.run_command()
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, ScanJob.DONE)
+        self.assertEqual(queued.owner, job_owner())
+
+    def test_daemon_runs_a_queued_job(self):
+        queued, _ = enqueue_scan()
+        out, err = self.run_command("--daemon")
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, ScanJob.DONE)
+        self.assertIn("en cola", out)
+        self.assertTrue(enqueue_scan(start_running=True)[1])
+
+    def test_start_scan_leaves_a_live_scan_alone(self):
+        running, _ = enqueue_scan(start_running=True)
+        job, started = start_scan()
+        self.assertFalse(started)
+        self.assertEqual(job.pk, running.pk)
+
+
+AUCTIONS = [
+    {"id": 1, "item": {"id": 10}, "quantity": 5, "unit_price": 300},
+    {"id": 2, "item": {"id": 10}, "quantity": 2, "unit_price": 100},
+    {"id": 3, "item": {"id": 20}, "quantity": 4, "buyout": 800},  # 200 la unidad
+    {"id": 4, "item": {"id": 20}, "quantity": 1},  # solo puja: sin precio de compra
+    {"id": 5, "item": {"id": 30}, "quantity": 1, "buyout": 50},
+]
+
+
+class PriceIndexTests(SimpleTestCase):
+    def test_one_pass_reduces_each_item(self):
+        index = build_price_index(AUCTIONS)
+        self.assertEqual(
+            {item_id: (e.min_price, e.listings, e.quantity) for item_id, e in index.items()},
+            {10: (100, 2, 7), 20: (200, 1, 4), 30: (50, 1, 1)},
+        )
+
+    def test_filters_items_during_the_pass(self):
+        self.assertEqual(set(build_price_index(AUCTIONS, item_ids={10, 99})), {10})
+
+    def test_json_round_trip_keeps_ladders(self):
+        index = index_from_json(index_to_json(build_price_index(AUCTIONS, ladders=True)))
+        self.assertEqual(index[10].min_price, 100)
+        self.assertEqual(list(index[10].ladder.levels()), [(100, 2), (300, 5)])
+
+
+class PriceLadderTests(SimpleTestCase):
+    def setUp(self):
+        self.ladder = PriceLadder([(300, 5), (100, 2), (200, 1)])
+
+    def test_buys_the_cheapest_units_first(self):
+        self.assertEqual(self.ladder.total_quantity, 8)
+        self.assertEqual(self.ladder.cost(0), 0)
+        self.assertEqual(self.ladder.cost(2), 200)
+        self.assertEqual(self.ladder.cost(3), 400)
+        self.assertEqual(self.ladder.cost(5), 1000)
+        self.assertEqual(self.ladder.unit_cost(4), 175)
+
+    def test_not_enough_supply(self):
+        self.assertIsNone(self.ladder.cost(9))
+        self.assertIsNone(self.ladder.unit_cost(9))
+
+    def test_entry_without_ladder_uses_the_minimum(self):
+        self.assertEqual(PriceEntry(150).unit_cost(10), 150)
+        self.assertEqual(PriceEntry(100, ladder=self.ladder).unit_cost(3), 400 / 3)
+
+
+class AuctionStreamTests(SimpleTestCase):
+    BODIES = [
+        ('{"auctions":[1.5e3, 2]}', [1500.0, 2]),
+        ('{"auctions":[12.5, 3]}', [12.5, 3]),
+        ('{"id": -1.25E-2, "auctions": [{"id": 1, "buyout": 10}, -7, 0.001], "n": "añadido"}',
+         [{"id": 1, "buyout": 10}, -7, 0.001]),
+        ('{"auctions": []}', []),
+        ('{}', []),
+    ]
+
+    def test_every_chunk_size(self):
+        for body, expected in self.BODIES:
+            data = body.encode()
+            for size in range(1, len(data) + 1):
+                with self.subTest(body=body, size=size):
+                    chunks = (data[i:i + size] for i in range(0, len(data), size))
+                    self.assertEqual(list(iter_auctions(chunks)), expected)
+
+    def test_truncated_body_fails(self):
+        with self.assertRaises(ValueError):
+            list(iter_auctions([b'{"auctions": [1, 2']))
+
+
+class StubResponse:
+    def __init__(self, status_code, body=None, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self._body = json.dumps(body or {}).encode()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self._body), chunk_size):
+            yield self._body[i:i + chunk_size]
+
+    def json(self):
+        return json.loads(self._body)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"HTTP {self.status_code}")
+
+
+class StubAuctionSession:
+    """Responde el volcado `auctions` con Last-Modified y 304 si no cambió."""
+
+    def __init__(self, auctions, last_modified="Mon, 01 Jan 2024 00:00:00 GMT"):
+        self.auctions = auctions
+        self.last_modified = last_modified
+        self.requests = []
+
+    def get(self, url, headers=None, **kwargs):
+        self.requests.append(dict(headers or {}))
+        if (headers or {}).get("If-Modified-Since") == self.last_modified:
+            return StubResponse(304)
+        return StubResponse(200, {"auctions": self.auctions}, {"Last-Modified": self.last_modified})
+
+
+class RealmCacheTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = mock.patch.object(scan, "REALM_CACHE_DIR", Path(tmp.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.realm = ConnectedRealm(region="us", blizzard_id=1, name="Realm", slug="realm")
+        self.session = StubAuctionSession(AUCTIONS)
+
+    def fetch(self, item_ids):
+        fetched = scan.fetch_realm_auctions(self.session, "token", self.realm, item_ids)
+        self.realm.auctions_last_modified = fetched.last_modified
+        return fetched
+
+    def test_unchanged_realm_is_served_from_the_cache(self):
+        first = self.fetch([10, 20])
+        second = self.fetch([10, 20])
+
+        self.assertFalse(first.not_modified)
+        self.assertTrue(second.not_modified)
+        self.assertEqual(self.session.requests[1]["If-Modified-Since"], self.session.last_modified)
+        self.assertEqual(second.index[10].min_price, 100)
+        self.assertEqual(second.index[10].ladder.cost(3), 500)
+
+    def test_cache_without_the_items_is_not_reused(self):
+        self.fetch([10])
+        fetched = self.fetch([10, 20])
+        self.assertFalse(fetched.not_modified)
+        self.assertNotIn("If-Modified-Since", self.session.requests[1])
+        self.assertEqual(fetched.index[20].min_price, 200)
+
+
+class RevokedTokenSession(StubAuctionSession):
+    """La API rechaza el token "revocado"; OAuth entrega "nuevo"."""
+
+    def get(self, url, headers=None, **kwargs):
+        if headers["Authorization"] == "Bearer revocado":
+            self.requests.append(dict(headers))
+            return StubResponse(401)
+        return super().get(url, headers, **kwargs)
+
+    def __init__(self, auctions, expires_in=86400):
+        super().__init__(auctions)
+        self.logins = 0
+        self.expires_in = expires_in
+
+    def post(self, url, **kwargs):
+        self.logins += 1
+        self.timeout = kwargs.get("timeout")
+        data = {"access_token": "nuevo"}
+        if self.expires_in is not None:
+            data["expires_in"] = self.expires_in
+        return StubResponse(200, data)
+
+
+class TokenRenewalTests(TestCase):
+    def setUp(self):
+        self.session = RevokedTokenSession(AUCTIONS)
+        patches = [
+            mock.patch.dict(token_service._providers, clear=True),
+            mock.patch.object(token_service, "get_session", lambda *a, **k: self.session),
+            mock.patch.object(scan, "load_credentials", lambda: ("id", "secret")),
+            mock.patch.object(scan, "save_realm_cache", lambda *a: None),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        ApiToken.objects.create(
+            region="us", access_token="revocado", expires_at=timezone.now() + timedelta(hours=12)
+        )
+
+    def test_revoked_token_is_renewed_and_the_realm_retried(self):
+        realm = ConnectedRealm(region="us", blizzard_id=1, name="Realm", slug="realm")
+        fetched = scan.fetch_realm_auctions(self.session, scan.get_token("us"), realm, [10])
+
+        self.assertIsNotNone(fetched)
+        self.assertEqual(fetched.index[10].min_price, 100)
+        self.assertEqual(self.session.logins, 1)
+        self.assertIsNotNone(self.session.timeout)
+        self.assertEqual(ApiToken.objects.get(region="us").access_token, "nuevo")
+
+    def test_late_invalidation_keeps_the_renewed_token(self):
+        provider = token_service.get_token_provider("us", scan.load_credentials)
+        provider.invalidate("revocado")
+        self.assertEqual(provider.get(), "nuevo")
+        provider.invalidate("revocado")  # otro hilo con el 401 del token viejo
+        self.assertEqual(provider.get(), "nuevo")
+        self.assertEqual(self.session.logins, 1)
+
+    def test_token_without_expiry_is_still_reused(self):
+        self.session.expires_in = None
+        provider = token_service.get_token_provider("us", scan.load_credentials)
+        provider.invalidate()
+        self.assertEqual(provider.get(), "nuevo")
+        self.assertEqual(provider.get(), "nuevo")
+        self.assertEqual(self.session.logins, 1)
+
+
+class ArbitrageMatrixTests(SimpleTestCase):
+    def setUp(self):
+        def realm(*auctions):
+            return build_price_index(
+                [{"item": {"id": i}, "quantity": q, "unit_price": p} for i, q, p in auctions], ladders=True
+            )
+
+        self.indexes = {
+            "Barato": realm((10, 1, 100), (10, 5, 3000), (20, 1, 200)),
+            "Caro": realm((10, 1, 5000), (20, 1, 210)),
+            "Medio": realm((10, 10, 2000)),
+        }
+
+    def test_best_pair_per_item_above_min_profit(self):
+        matrix = build_price_matrix(self.indexes, [10, 20, 30])
+        opportunities = find_opportunities(matrix, sell_realms=["Caro", "Medio"], cut=0.05, min_profit=1000)
+
+        self.assertEqual(set(opportunities), {10})  # 20 apenas gana y 30 no tiene oferta
+        opp = opportunities[10]
+        self.assertEqual((opp.buy_realm, opp.sell_realm), ("Barato", "Caro"))
+        self.assertAlmostEqual(opp.profit, (5000 - 100) * 0.95)
+
+    def test_depth_moves_the_buy_realm(self):
+        matrix = build_price_matrix(self.indexes, [10], quantity=3)
+        opp = find_opportunities(matrix, sell_realms=["Caro"], cut=0, min_profit=0)[10]
+
+        # 3 unidades en Barato: 100 + 2 * 3000; en Medio: 3 * 2000
+        self.assertEqual(opp.buy_realm, "Medio")
+        self.assertEqual(opp.buy_price, 2000)
+        self.assertEqual(opp.profit, (5000 - 2000) * 3)
+
+    def test_no_sell_realm_in_the_matrix(self):
+        matrix = build_price_matrix(self.indexes, [10])
+        self.assertEqual(find_opportunities(matrix, sell_realms=["Otro"]), {})
+
+
+class StubBlizzardSession(StubAuctionSession):
+    """OAuth, búsqueda de items ("Item <id>") y volcados de subastas."""
+
+    def get(self, url, headers=None, params=None, **kwargs):
+        if "search/item" in url:
+            locale = params["locale"]
+            name = params[f"name.{locale}"]
+            return StubResponse(200, {"results": [{"data": {"id": int(name.split()[-1]), "name": {locale: name}}}]})
+        return super().get(url, headers, **kwargs)
+
+    def post(self, url, **kwargs):
+        return StubResponse(200, {"access_token": "token", "expires_in": 86400})
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class FullScanTests(TransactionTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        root = Path(tmp.name)
+        realms_json = root / "realms.json"
+        realms_json.write_text(json.dumps([
+            {"id": i, "name": f"Realm {i}", "slug": f"realm-{i}"} for i in (1, 2)
+        ]))
+
+        self.session = StubBlizzardSession(AUCTIONS)
+        stub = lambda *a, **k: self.session  # noqa: E731
+        patches = [
+            mock.patch.dict(token_service._providers, clear=True),
+            mock.patch.object(token_service, "get_session", stub),
+            mock.patch.object(item_resolver, "get_session", stub),
+            mock.patch.object(scan, "get_session", stub),
+            mock.patch.object(scan, "load_credentials", lambda: ("id", "secret")),
+            mock.patch.object(scan, "REALM_CACHE_DIR", root / "realm_cache"),
+            mock.patch.object(scan, "ARCHIVE_AUCTIONS", False),
+            mock.patch.dict(scan.REGIONS, {"us": {**scan.REGIONS["us"], "realms_json": realms_json}}),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        for item_id in (10, 20):
+            TrackedItem.objects.create(item=Item.objects.create(name=f"Item {item_id}"))
+
+    def run_scan(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return scan.run_update_auctions(sell_realms=None, any_sell_realm=True)
+
+    def test_unchanged_realms_add_no_history(self):
+        first = self.run_scan()
+        rows = PriceSnapshot.objects.count()
+        second = self.run_scan()
+
+        self.assertEqual(first["realms_downloaded"], 2)
+        self.assertEqual(second["realms_not_modified"], 2)
+        self.assertEqual(rows, 4)  # 2 items x 2 reinos
+        self.assertEqual(PriceSnapshot.objects.count(), rows)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class PaginationTests(TestCase):
+    def setUp(self):
+        for name in ["Delta", "Alpha", "Charlie", "Bravo", "Echo"]:
+            Item.objects.create(name=name)
+        self.client = Client()
+
+    def test_cursor_walks_every_row_once(self):
+        names, cursor = [], ""
+        while True:
+            data = self.client.get("/api/items/", {"limit": 2, "fields": "name", "cursor": cursor}).json()
+            names += [row["name"] for row in data["results"]]
+            cursor = data["next_cursor"]
+            if cursor is None:
+                break
+        self.assertEqual(names, ["Alpha", "Bravo", "Charlie", "Delta", "Echo"])
+
+    def test_bad_cursors_are_rejected(self):
+        cases = [
+            ("/api/items/", "no-es-base64!"),
+            ("/api/items/", encode_cursor({"name": "Alpha"})),
+            ("/api/items/", encode_cursor(["Alpha"])),
+            ("/api/items/", encode_cursor(["Alpha", None])),
+            ("/api/snapshots/", encode_cursor(["abc", 1])),
+            ("/api/scan-runs/", encode_cursor(["notadate", 1])),
+        ]
+        for url, cursor in cases:
+            with self.subTest(url=url, cursor=cursor):
+                response = self.client.get(url, {"cursor": cursor})
+                self.assertEqual(response.status_code, 400)
+                self.assertFalse(response.json()["ok"])
+
+
+class RetentionTests(TestCase):
+    NOW = datetime(2026, 6, 1, 12, 30, tzinfo=dt_timezone.utc)
+
+    def setUp(self):
+        self.item = Item.objects.create(name="Item", blizzard_id=10)
+        self.realm = ConnectedRealm.objects.create(blizzard_id=1, name="Realm", slug="realm")
+
+    def price(self, min_price, created_at):
+        return PriceSnapshot.objects.create(
+            item=self.item, realm=self.realm, min_price=min_price, quantity=1, listings=1, created_at=created_at
+        )
+
+    def opportunity(self, profit, created_at, realm=None):
+        realm = realm or self.realm
+        snapshot = ItemPriceSnapshot.objects.create(
+            item=self.item, region=realm.region, best_buy_realm=realm, best_sell_realm=realm,
+            buy_price=10, estimated_sell_price=10 + profit, profit=profit,
+        )
+        ItemPriceSnapshot.objects.filter(pk=snapshot.pk).update(created_at=created_at)
+        return snapshot
+
+    def compact(self, **kwargs):
+        return compact_history(pause=0, now=self.NOW, **kwargs)
+
+    def test_old_rows_become_hourly_rollups(self):
+        old = self.NOW - timedelta(days=10)
+        self.price(100, old.replace(minute=5))
+        self.price(300, old.replace(minute=50))
+        recent = self.price(200, self.NOW - timedelta(days=1))
+
+        report = self.compact()
+
+        self.assertEqual(report["prices_deleted"], 2)
+        self.assertEqual(list(PriceSnapshot.objects.values_list("pk", flat=True)), [recent.pk])
+        rollup = PriceRollup.objects.get(metric="min_price")
+        self.assertEqual(rollup.resolution, PriceRollup.HOUR)
+        self.assertEqual(rollup.bucket, old.replace(minute=0))
+        self.assertEqual((rollup.minimum, rollup.maximum, rollup.mean, rollup.samples), (100, 300, 200, 2))
+
+    def test_later_batches_merge_into_the_same_bucket(self):
+        old = self.NOW - timedelta(days=10)
+        self.price(100, old)
+        self.compact()
+        self.price(400, old.replace(minute=59))
+        self.compact()
+
+        rollup = PriceRollup.objects.get(metric="min_price")
+        self.assertEqual((rollup.minimum, rollup.maximum, rollup.mean, rollup.samples), (100, 400, 250, 2))
+
+    def test_old_hours_fold_into_days(self):
+        day = (self.NOW - timedelta(days=100)).replace(hour=0, minute=0)
+        self.price(100, day.replace(hour=3))
+        self.price(200, day.replace(hour=3, minute=10))
+        self.price(600, day.replace(hour=20))
+
+        report = self.compact()
+
+        self.assertEqual(report["hourly_deleted"], 2)
+        rollup = PriceRollup.objects.get()
+        self.assertEqual((rollup.resolution, rollup.bucket), (PriceRollup.DAY, day))
+        self.assertEqual((rollup.minimum, rollup.maximum, rollup.mean, rollup.samples), (100, 600, 300, 3))
+
+    def test_current_opportunity_is_kept(self):
+        old = self.NOW - timedelta(days=10)
+        self.opportunity(50, old)
+        latest = self.opportunity(70, old)
+        LatestOpportunity.objects.create(
+            item=self.item, snapshot=latest, best_buy_realm=self.realm, best_sell_realm=self.realm,
+            buy_price=10, estimated_sell_price=80, profit=70, created_at=old,
+        )
+
+        report = self.compact()
+
+        self.assertEqual(report["snapshots_deleted"], 1)
+        self.assertTrue(ItemPriceSnapshot.objects.filter(pk=latest.pk).exists())
+        self.assertEqual(PriceRollup.objects.get(metric="profit").mean, 50)
+
+    def test_small_compactions_do_not_vacuum(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertIn(optimize_database(deleted=10), ("PRAGMA optimize", "ANALYZE"))
+        self.assertFalse(any("VACUUM" in query["sql"] for query in queries))
+
+    def test_daily_retention_cannot_be_shorter_than_hourly(self):
+        stderr = io.StringIO()
+        call_command("compact_history", "--hourly-days=90", "--daily-days=30", stdout=io.StringIO(), stderr=stderr)
+        self.assertIn("--daily-days", stderr.getvalue())
+
+    def test_opportunity_rollups_are_kept_per_region(self):
+        eu_realm = ConnectedRealm.objects.create(region="eu", blizzard_id=1, name="Realm", slug="realm")
+        old = self.NOW - timedelta(days=100)
+        self.opportunity(50, old)
+        self.opportunity(70, old)
+        self.opportunity(500, old, realm=eu_realm)
+
+        self.compact()
+
+        rollups = PriceRollup.objects.filter(metric="profit", realm=None)
+        self.assertEqual(
+            sorted(rollups.values_list("region", "resolution", "mean", "samples")),
+            [("eu", PriceRollup.DAY, 500, 1), ("us", PriceRollup.DAY, 60, 2)],
+        )
+
+
+class CraftingCycleTests(SimpleTestCase):
+    def test_only_cycle_members_are_reported(self):
+        graph = {
+            "a": ["b"], "b": ["c"], "c": ["a"],
+            "d": ["b"], "a2": ["d"],  # a -> ... -> d -> b -> c -> a: d también está en un ciclo
+            "x": ["a"],  # depende de un ciclo sin formar parte de él
+            "s": ["s"],
+            "y": ["z"], "z": [],
+        }
+        graph["a"].append("a2")
+        self.assertEqual(find_cyclic_items(graph), {"a", "b", "c", "d", "a2", "s"})
+
+    def test_engine_skips_cyclic_recipes(self):
+        # 1 necesita 2 y 2 necesita 1; 3 usa el material 12 (fabricable como 1)
+        engine = CraftingEngine(
+            {1: [(11, 1)], 2: [(12, 1)], 3: [(12, 2), (13, 1)], 4: [(13, 1), (14, 3)]},
+            {11: 2, 12: 1},
+            {12: 50, 13: 10},
+        )
+        self.assertEqual(engine.cyclic, {1, 2})
+        self.assertIsNone(engine.craft_cost(1))
+        self.assertEqual(engine.craft_cost(3), 2 * 50 + 10)
+        self.assertIsNone(engine.craft_cost(4))
+        self.assertEqual(engine.missing(4), [14])
+
+
+class RealmSyncTests(TestCase):
+    # Orden del JSON de reinos; Gamma y Alpha comparten el reino conectado 1
+    ENTRIES = [
+        {"id": 7, "name": "Zeta", "slug": "zeta"},
+        {"id": 3, "name": "Gamma", "slug": "gamma"},
+        {"id": 1, "name": "Alpha", "slug": "alpha"},
+        {"id": 2, "name": "Beta", "slug": "beta"},
+    ]
+    CONNECTED = {7: 7, 3: 1, 1: 1, 2: 2}
+
+    def sync(self, entries=None, connected_ids=None):
+        return sync_realm_mapping("us", entries or self.ENTRIES, connected_ids or self.CONNECTED)
+
+    def test_realms_are_grouped_under_their_primary(self):
+        result = self.sync()
+
+        self.assertEqual(result, (4, 3, 4, 0, 0))
+        realms = load_connected_realms("us")
+        # En el orden del JSON, no en el de los IDs
+        self.assertEqual(list(realms), ["Zeta", "Alpha", "Beta"])
+        self.assertEqual(realms["Alpha"].blizzard_id, 1)
+        self.assertEqual(
+            set(Realm.objects.filter(connected_realm=realms["Alpha"]).values_list("name", flat=True)),
+            {"Alpha", "Gamma"},
+        )
+
+    def test_unchanged_resync_only_reads(self):
+        self.sync()
+        with self.assertNumQueries(1):
+            result = self.sync()
+        self.assertEqual(result, (4, 3, 0, 0, 0))
+
+    def test_unresolved_realms_keep_their_mapping(self):
+        self.sync()
+        result = self.sync(connected_ids={**self.CONNECTED, 3: None, 2: None})
+
+        self.assertEqual((result.created, result.updated, result.deleted), (0, 0, 0))
+        self.assertEqual(Realm.objects.get(blizzard_id=3).connected_realm.name, "Alpha")
+
+    def test_unlisted_realms_are_deleted(self):
+        self.sync()
+        result = self.sync(entries=self.ENTRIES[:3])
+
+        self.assertEqual(result.deleted, 1)
+        self.assertEqual(list(load_connected_realms("us")), ["Zeta", "Alpha"])
+
+    def test_sell_realms_accept_any_member_name(self):
+        self.sync()
+        self.assertEqual(
+            scan.region_sell_realms("us", ["Gamma", "Alpha", "Beta", "Unknown"]),
+            ["Alpha", "Beta", "Unknown"],
+        )
+        self.assertIsNone(scan.region_sell_realms("us", ["Gamma"], any_sell_realm=True))
+
+    def test_region_without_realm_list_fails_clearly(self):
+        with mock.patch.dict(scan.REGIONS["eu"], realms_json=Path("/nonexistent/wow_realms_connected_eu.json")):
+            with self.assertRaisesMessage(FileNotFoundError, "wow_realms_connected_eu.json"):
+                scan.load_realms("eu")
+
+
+class RealmSchedulerTests(SimpleTestCase):
+    NOW = datetime(2026, 6, 1, 12, 0, tzinfo=dt_timezone.utc)
+
+    def setUp(self):
+        self.scheduler = RealmScheduler(jitter=timedelta(0))
+        self.realm = ConnectedRealm(pk=1, blizzard_id=1, name="Realm", slug="realm")
+
+    def published(self, when):
+        self.realm.auctions_last_modified = format_datetime(when, usegmt=True)
+
+    def test_new_realms_are_due_at_once(self):
+        self.scheduler.sync([self.realm], self.NOW)
+        self.assertEqual(self.scheduler.due(self.NOW), [1])
+        self.assertEqual(self.scheduler.next_due(), self.NOW)
+
+    def test_changed_realm_waits_for_the_next_publication(self):
+        self.scheduler.sync([self.realm], self.NOW)
+        self.published(self.NOW - timedelta(minutes=10))
+
+        when = self.scheduler.record(self.realm, changed=True, now=self.NOW)
+
+        self.assertEqual(when, self.NOW + timedelta(minutes=50) + PUBLISH_GRACE)
+        self.assertEqual(self.scheduler.due(self.NOW), [])
+        self.assertEqual(self.scheduler.due(when), [1])
+
+    def test_late_realm_backs_off_up_to_the_cap(self):
+        self.scheduler.sync([self.realm], self.NOW)
+        self.published(self.NOW - timedelta(hours=2))
+
+        delays = [self.scheduler.record(self.realm, changed=False, now=self.NOW) - self.NOW for _ in range(5)]
+
+        self.assertEqual(delays, [timedelta(minutes=m) for m in (3, 6, 12, 20, 20)])
+        self.published(self.NOW - timedelta(minutes=1))
+        self.scheduler.record(self.realm, changed=True, now=self.NOW)
+        self.published(self.NOW - timedelta(hours=2))
+        self.assertEqual(self.scheduler.record(self.realm, changed=False, now=self.NOW), self.NOW + RETRY_INTERVAL)
+
+    def test_jitter_stays_within_bounds(self):
+        scheduler = RealmScheduler(rng=random.Random(7))
+        self.published(self.NOW - timedelta(minutes=10))
+        expected = self.NOW + timedelta(minutes=50) + PUBLISH_GRACE
+        for _ in range(20):
+            when = scheduler.record(self.realm, changed=True, now=self.NOW)
+            self.assertTrue(expected <= when <= expected + JITTER)
+
+    def test_sync_forgets_removed_realms(self):
+        other = ConnectedRealm(pk=2, blizzard_id=2, name="Other", slug="other")
+        self.scheduler.sync([self.realm, other], self.NOW)
+        self.scheduler.sync([other], self.NOW)
+        self.assertEqual(len(self.scheduler), 1)
+        self.assertEqual(self.scheduler.due(self.NOW), [2])
+
+    def test_invalid_last_modified_is_ignored(self):
+        self.assertIsNone(parse_last_modified("not a date"))
+        self.assertIsNone(parse_last_modified(None))
+        self.realm.auctions_last_modified = "not a date"
+        self.assertIsNone(self.scheduler.expected_publish(self.realm))
+
+
+class ArchiveTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+        self.first = scan_dir_for(datetime(2026, 6, 1, 10, tzinfo=dt_timezone.utc), self.root)
+        self.second = scan_dir_for(datetime(2026, 6, 1, 11, tzinfo=dt_timezone.utc), self.root)
+        listings = ListingCollector()
+        listings.append(1, 10, 100, 2)
+        write_realm(self.first, 1, listings)
+        write_manifest(self.first, {1: "Realm"}, {1: "Mon, 01 Jun 2026 09:55:00 GMT"})
+
+    def test_unchanged_realm_links_the_same_dump(self):
+        path = reuse_realm(self.second, 1, "Mon, 01 Jun 2026 09:55:00 GMT")
+        self.assertEqual(path, realm_path(self.second, 1))
+        self.assertEqual(list(ArchivedScan(self.first).load_realm(1)["unit_price"]), [100])
+
+    def test_older_dump_is_not_reused(self):
+        # El daemon descargó un volcado más nuevo sin archivarlo
+        self.assertIsNone(reuse_realm(self.second, 1, "Mon, 01 Jun 2026 10:55:00 GMT"))
+        self.assertFalse(realm_path(self.second, 1).exists())
+
+    def test_scans_without_manifest_are_skipped(self):
+        self.second.mkdir(parents=True)
+        self.assertEqual([scan.path for scan in list_scans(root=self.root)], [self.first, self.second])
+        self.assertEqual([scan.path for scan in list_scans(root=self.root, complete=True)], [self.first])
+
+
+class BacktestTests(SimpleTestCase):
+    def test_duplicate_strategy_names_are_rejected(self):
+        self.assertEqual(
+            [s["name"] for s in parse_strategies(["a:cut=0.05", "b:sell=Stormrage|Area 52"])], ["a", "b"]
+        )
+        with self.assertRaisesMessage(ValueError, "Estrategia repetida: a"):
+            parse_strategies(["a:cut=0.05", "a:cut=0.1"])
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class DashboardGenerationTests(TestCase):
+    def test_generation_changes_once_the_transaction_commits(self):
+        before = dashboard.data_generation()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            dashboard.bump_generation()
+            self.assertEqual(dashboard.data_generation(), before)
+        self.assertEqual(len(callbacks), 1)
+        self.assertNotEqual(dashboard.data_generation(), before)
+
+    def test_bump_does_not_read_the_previous_value(self):
+        # incr() lee y reescribe: en FileBasedCache eso pierde incrementos concurrentes
+        with mock.patch.object(dashboard.cache, "incr", side_effect=AssertionError("incr")):
+            dashboard._bump()
+        self.assertIsNotNone(dashboard.cache.get(dashboard.GENERATION_KEY))
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class TrackedItemViewTests(TestCase):
+    def post(self, name, data):
+        return Client().post(reverse(name), json.dumps(data), content_type="application/json")
+
+    def test_add_tracked_item(self):
+        response = self.post("add_tracked_item", {"item_name": "Linen Cloth"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["ok"])
+        tracked = TrackedItem.objects.get(item__name="Linen Cloth")
+        self.assertTrue(tracked.active)
+        self.assertIsNotNone(tracked.added_at)
+
+    def test_update_tracked_items(self):
+        kept = Item.objects.create(name="Kept")
+        dropped = TrackedItem.objects.create(item=Item.objects.create(name="Dropped"), active=True)
+
+        response = self.post("update_tracked_items", {"item_ids": [kept.id]})
+
+        self.assertEqual(response.json(), {"ok": True, "count": 1})
+        self.assertIsNotNone(TrackedItem.objects.get(item=kept, active=True).scanned_at)
+        dropped.refresh_from_db()
+        self.assertFalse(dropped.active)
+
+
+class ScanEtaTests(TestCase):
+    def setUp(self):
+        self.fast, self.slow, self.new = (
+            ConnectedRealm.objects.create(blizzard_id=i, name=f"Realm {i}", slug=f"realm-{i}") for i in range(3)
+        )
+        now = timezone.now()
+        run = ScanRun.objects.create(
+            started_at=now, finished_at=now, seconds=110, stages={"fetch": 110}, realms_total=2
+        )
+        for realm, seconds in ((self.fast, 10), (self.slow, 100)):
+            ScanRealmTiming.objects.create(
+                run=run, realm=realm, outcome=ScanRealmTiming.DOWNLOADED, seconds=seconds
+            )
+        self.job = ScanJob.objects.create(status=ScanJob.RUNNING, total_realms=3)
+
+    def eta(self, *pending):
+        self.job.pending_realms = [realm.pk for realm in pending]
+        self.job.processed_realms = self.job.total_realms - len(pending)
+        return estimate_remaining(self.job)
+
+    def test_pending_realms_use_their_own_history(self):
+        self.assertAlmostEqual(self.eta(self.slow), 100)
+        self.assertAlmostEqual(self.eta(self.fast), 10)
+        # Sin histórico: la media de todos los reinos
+        self.assertAlmostEqual(self.eta(self.new, self.fast), 55 + 10)
+
+    def test_progress_tracks_the_pending_realms(self):
+        realms = [self.fast, self.slow, self.new]
+        self.job.save(update_fields=reset_progress(self.job, realms))
+        progress = ScanWriter().progress(self.job, interval=0)
+        progress.advance("Realm 1", self.slow.pk)
+
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.pending_realms, [self.fast.pk, self.new.pk])
+        self.assertEqual(self.job.processed_realms, 1)
@@ -19,6 +19,16 @@ urlpatterns = [
     path("api/update-auctions/", views.update_auctions, name="update_auctions"),
     path("api/auction-status/", views.auction_status, name="auction_status"),
 
+    # Listados JSON paginados por cursor
+    path("api/items/", views.items_api, name="items_api"),
+    path("api/tracked-items/", views.tracked_items_api, name="tracked_items_api"),
+    path("api/snapshots/", views.snapshots_api, name="snapshots_api"),
+    path("api/opportunities/", views.opportunities_api, name="opportunities_api"),
+    path("api/scan-runs/", views.scan_runs_api, name="scan_runs_api"),
+
+    # Histórico de precios por reino
+    path("api/items/<int:item_id>/history/", views.item_price_history, name="item_price_history"),
+
     # Snapshots
     path("api/delete-snapshots/", views.delete_snapshots, name="delete_snapshots"),
     path("api/delete-all-snapshots/", views.delete_all_snapshots, name="delete_all_snapshots"),
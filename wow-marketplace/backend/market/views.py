@@ -1,19 +1,34 @@
 from django.shortcuts import render
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from decimal import Decimal, InvalidOperation
 import json
 
-from market.management.commands.update_auctions import get_token, get_item_id, load_cache, save_cache
+from market.management.commands.update_auctions import get_token, get_item_id
 
 
 from .models import (
     Item,
     TrackedItem,
     ItemPriceSnapshot,
-    AuctionUpdateStatus,
-    Profession
+    ScanJob,
+    Profession,
+    ConnectedRealm,
+)
+from market.services import catalog
+from market.services.dashboard import bump_generation, dashboard_context
+from market.services.history import price_history
+from market.services.icons import assign_icons
+from market.services.instrumentation import estimate_remaining
+from market.services.jobs import enqueue_scan
+from market.services.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    InvalidCursor,
+    keyset_page,
 )
-from market.management.commands.update_auctions import run_update_auctions
 
 
 def console_log(*messages):
@@ -25,21 +40,9 @@ def console_log(*messages):
 # HOME
 # =====================================================
 def home(request):
-    items = Item.objects.select_related("tracking", "profession").order_by("name")
-    snapshots = ItemPriceSnapshot.objects.select_related(
-        "item", "best_buy_realm", "best_sell_realm"
-    ).order_by("-profit")[:50]
-    professions = Profession.objects.order_by("name")
-
-    return render(
-        request,
-        "market/home.html",
-        {
-            "items": items,
-            "snapshots": snapshots,
-            "professions": professions,
-        },
-    )
+    # Consultas y fragmentos salen de la caché mientras no cambie la
+    # generación de datos (escaneos y cambios de items la incrementan).
+    return render(request, "market/home.html", dashboard_context())
 
 
 # =====================================================
@@ -61,6 +64,7 @@ def update_tracked_items(request):
         tracked_item.scanned_at = timezone.now()
         tracked_item.save(update_fields=["scanned_at"])
 
+    bump_generation()
     return JsonResponse({"ok": True, "count": len(item_ids)})
 
 
@@ -84,6 +88,7 @@ def add_tracked_item(request):
         tracked.added_at = timezone.now()
         tracked.save(update_fields=["added_at"])
 
+    bump_generation()
     return JsonResponse({
         "ok": True,
         "item_id": item.id,
@@ -99,31 +104,205 @@ def add_tracked_item(request):
 # =====================================================
 @require_POST
 def update_auctions(request):
-    created = run_update_auctions()
-    return JsonResponse({"status": "ok", "created": created})
+    """
+    Encola un escaneo (o se une al que ya está activo) y responde
+    enseguida; lo ejecuta el worker (`manage.py scan_worker`).
+    """
+    job, created = enqueue_scan()
+    return JsonResponse({"status": "ok", "job_id": job.id, "job_status": job.status, "joined": not created})
 
 
 def auction_status(request):
-    status = AuctionUpdateStatus.objects.first()
-    if not status:
+    job = ScanJob.objects.first()
+    if not job:
         return JsonResponse({"running": False})
 
-    elapsed = status.elapsed_seconds()
-    eta = 0
-    if status.processed_realms:
-        avg = elapsed / status.processed_realms
-        eta = avg * (status.total_realms - status.processed_realms)
+    elapsed = job.elapsed_seconds()
+    # Primero con los tiempos de escaneos anteriores; sin histórico, con
+    # la media de los reinos que lleva este
+    eta = estimate_remaining(job) if job.active else 0
+    if eta is None:
+        eta = 0
+        if job.processed_realms:
+            avg = elapsed / job.processed_realms
+            eta = avg * (job.total_realms - job.processed_realms)
 
     return JsonResponse({
-        "running": status.is_running,
-        "total": status.total_realms,
-        "current": status.current_realm,
-        "done": status.processed_realms,
+        "job_id": job.id,
+        "state": job.status,
+        "running": job.active,
+        "total": job.total_realms,
+        "current": job.current_realm,
+        "done": job.processed_realms,
         "elapsed": int(elapsed),
         "eta": int(eta),
+        "result": job.result,
+        "error": job.error,
     })
 
 
+# =====================================================
+# PRICE HISTORY
+# =====================================================
+def item_price_history(request, item_id):
+    """
+    Histórico de precios por reino de un item.
+    Filtros opcionales: ?since=ISO&until=ISO&realm=<id>&realm=<id>
+    """
+    try:
+        item = Item.objects.get(id=item_id)
+    except Item.DoesNotExist:
+        return JsonResponse({"ok": False, "error": "Item no encontrado"}, status=404)
+
+    since = parse_datetime(request.GET.get("since", "") or "")
+    until = parse_datetime(request.GET.get("until", "") or "")
+    realm_ids = [int(r) for r in request.GET.getlist("realm") if r.isdigit()]
+
+    points = list(price_history(item, since, until, realm_ids))
+    realms = dict(
+        ConnectedRealm.objects.filter(id__in={p[1] for p in points}).values_list("id", "name")
+    )
+
+    return JsonResponse({
+        "ok": True,
+        "item_id": item.id,
+        "blizzard_id": item.blizzard_id,
+        "realms": realms,
+        "columns": ["created_at", "realm_id", "min_price", "quantity", "listings"],
+        "points": [[p[0].isoformat(), *p[1:]] for p in points],
+    })
+
+
+# =====================================================
+# API JSON PAGINADA
+# =====================================================
+def _int_param(request, name):
+    value = request.GET.get(name, "").strip()
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"'{name}' debe ser un entero")
+
+
+def _bool_param(request, name):
+    value = request.GET.get(name, "").strip().lower()
+    if not value:
+        return None
+    return value in ("1", "true", "yes")
+
+
+def _decimal_param(request, name):
+    value = request.GET.get(name, "").strip()
+    if not value:
+        return None
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        raise ValueError(f"'{name}' debe ser un número")
+
+
+def _paginated(request, queryset, ordering, available_fields):
+    """
+    Respuesta común de los listados:
+    ?cursor=<next_cursor>&limit=N&fields=a,b
+    """
+    requested = [f for f in request.GET.get("fields", "").split(",") if f]
+    fields = catalog.select_fields(available_fields, requested)
+
+    limit = _int_param(request, "limit") or DEFAULT_PAGE_SIZE
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    page = keyset_page(queryset, ordering, request.GET.get("cursor"), limit)
+    return JsonResponse({
+        "ok": True,
+        "results": catalog.serialize(page.rows, available_fields, fields),
+        "next_cursor": page.next_cursor,
+    })
+
+
+def _bad_request(error):
+    return JsonResponse({"ok": False, "error": str(error)}, status=400)
+
+
+def items_api(request):
+    """Items por nombre. Filtros: ?profession=<id>&tracked=1|0"""
+    try:
+        queryset = catalog.items_queryset(
+            profession=_int_param(request, "profession"),
+            tracked=_bool_param(request, "tracked"),
+        )
+        return _paginated(request, queryset, catalog.ITEM_ORDERING, catalog.ITEM_FIELDS)
+    except (ValueError, InvalidCursor) as e:
+        return _bad_request(e)
+
+
+def tracked_items_api(request):
+    """Items seguidos por nombre. Filtros: ?profession=<id>&active=1|0"""
+    try:
+        queryset = catalog.tracked_queryset(
+            profession=_int_param(request, "profession"),
+            active=_bool_param(request, "active"),
+        )
+        return _paginated(request, queryset, catalog.TRACKED_ORDERING, catalog.TRACKED_FIELDS)
+    except (ValueError, InvalidCursor) as e:
+        return _bad_request(e)
+
+
+def snapshots_api(request):
+    """
+    Histórico de oportunidades de mayor a menor beneficio.
+    Filtros: ?profession=<id>&realm=<id de reino de compra o venta>&min_profit=<oro>&region=<us|eu|...>
+    """
+    try:
+        queryset = catalog.snapshots_queryset(
+            profession=_int_param(request, "profession"),
+            realm=_int_param(request, "realm"),
+            min_profit=_decimal_param(request, "min_profit"),
+            region=request.GET.get("region") or None,
+        )
+        return _paginated(request, queryset, catalog.SNAPSHOT_ORDERING, catalog.SNAPSHOT_FIELDS)
+    except (ValueError, InvalidCursor) as e:
+        return _bad_request(e)
+
+
+def opportunities_api(request):
+    """
+    Oportunidad actual de cada item en cada región, de mayor a menor beneficio.
+    Mismos filtros y campos que /api/snapshots/.
+    """
+    try:
+        queryset = catalog.opportunities_queryset(
+            profession=_int_param(request, "profession"),
+            realm=_int_param(request, "realm"),
+            min_profit=_decimal_param(request, "min_profit"),
+            region=request.GET.get("region") or None,
+        )
+        return _paginated(request, queryset, catalog.OPPORTUNITY_ORDERING, catalog.OPPORTUNITY_FIELDS)
+    except (ValueError, InvalidCursor) as e:
+        return _bad_request(e)
+
+
+def scan_runs_api(request):
+    """
+    Métricas de los escaneos, de más reciente a más antiguo.
+    Filtros: ?kind=full|daemon&status=ok|failed
+    Con ?realms=1 incluye los tiempos de cada reino.
+    """
+    try:
+        with_realms = bool(_bool_param(request, "realms"))
+        queryset = catalog.scan_runs_queryset(
+            kind=request.GET.get("kind") or None,
+            status=request.GET.get("status") or None,
+            with_realms=with_realms,
+        )
+        fields = catalog.SCAN_RUN_DETAIL_FIELDS if with_realms else catalog.SCAN_RUN_FIELDS
+        return _paginated(request, queryset, catalog.SCAN_RUN_ORDERING, fields)
+    except (ValueError, InvalidCursor) as e:
+        return _bad_request(e)
+
+
 # =====================================================
 # SNAPSHOTS
 # =====================================================
@@ -132,30 +311,12 @@ def delete_snapshots(request):
     data = json.loads(request.body)
     ids = data.get("ids", [])
     
-    # Eliminar los snapshots seleccionados
+    # Eliminar los snapshots seleccionados; el navegador quita sus filas
+    # en lugar de recibir de nuevo el top entero.
     deleted_count, _ = ItemPriceSnapshot.objects.filter(id__in=ids).delete()
-    
-    # Recuperar los snapshots restantes
-    snapshots = ItemPriceSnapshot.objects.select_related(
-        "item", "best_buy_realm", "best_sell_realm"
-    ).order_by("-profit")[:50]
-
-    # Crear respuesta con los snapshots restantes
-    snapshots_data = [
-        {
-            "id": s.id,
-            "item_name": s.item.name,
-            "blizzard_id": s.item.blizzard_id,
-            "best_buy_realm": s.best_buy_realm.name,
-            "best_sell_realm": s.best_sell_realm.name,
-            "buy_price": str(s.buy_price),
-            "estimated_sell_price": str(s.estimated_sell_price),
-            "profit": str(s.profit),
-        }
-        for s in snapshots
-    ]
+    bump_generation()
 
-    return JsonResponse({"deleted": deleted_count, "snapshots": snapshots_data})
+    return JsonResponse({"deleted": deleted_count, "ids": ids})
 
 
 
@@ -163,6 +324,7 @@ def delete_snapshots(request):
 def delete_all_snapshots(request):
     count = ItemPriceSnapshot.objects.count()
     ItemPriceSnapshot.objects.all().delete()
+    bump_generation()
     return JsonResponse({"deleted": count})
 
 
@@ -193,8 +355,7 @@ def add_item(request):
     # OBTENER BLIZZARD ITEM ID
     # =======================
     token = get_token()          # obtener token Blizzard
-    cache = load_cache()         # cargar cache local
-    blizzard_id = get_item_id(token, item_name, cache)
+    blizzard_id = get_item_id(token, item_name)
 
     if not blizzard_id:
         return JsonResponse({"ok": False, "error": "No se encontró el item en Blizzard"}, status=404)
@@ -225,8 +386,7 @@ def add_item(request):
         tracked.active = True
         tracked.save(update_fields=["active"])
 
-    save_cache(cache)
-
+    bump_generation()
     return JsonResponse({
         "ok": True,
         "item_id": item.id,
@@ -246,6 +406,7 @@ def delete_item(request):
     try:
         item = Item.objects.get(id=item_id)
         item.delete()
+        bump_generation()
         return JsonResponse({"ok": True})
     except Item.DoesNotExist:
         return JsonResponse({"ok": False, "error": "Item no encontrado"})
@@ -259,6 +420,7 @@ def delete_multiple_items(request):
         return JsonResponse({"ok": False, "error": "No se proporcionaron item_ids"})
 
     Item.objects.filter(id__in=ids).delete()
+    bump_generation()
     return JsonResponse({"ok": True, "deleted_count": len(ids)})
 
 
@@ -266,37 +428,16 @@ def delete_multiple_items(request):
 def delete_all_items(request):
     count = Item.objects.count()
     Item.objects.all().delete()
+    bump_generation()
     return JsonResponse({"ok": True, "deleted_count": count})
 
 
 
-import os
-import csv
-from django.core.files import File
-from django.conf import settings
-from .models import Item
-
-# Ruta al CSV y la carpeta de iconos
-CSV_PATH = r'C:\Users\diego\OneDrive\Desktop\Auction house api\Auction-house\Auction-house-Profit\wow-marketplace\backend\market\static\items_with_icons.csv'
-ICONS_PATH = r'C:\Users\diego\OneDrive\Desktop\Auction house api\Auction-house\Auction-house-Profit\wow-marketplace\backend\market\static\icons'
-
-# Leer CSV y mapear los iconos
-def load_icons_from_csv():
-    icon_mapping = {}
-    with open(CSV_PATH, mode='r', encoding='utf-8') as file:
-        # Asegurarse de usar el delimitador correcto (coma en este caso)
-        reader = csv.DictReader(file, delimiter=',')  # Si el archivo usa comas
-        for row in reader:
-            # Asegurarse de que las claves coincidan con los nombres de las columnas en el CSV
-            icon_mapping[int(row['ID'])] = row['IconName'].strip().lower()  # Asegurarse de convertir a minúsculas
-    return icon_mapping
-
-
 # Función para asociar el icono al ítem
 def assign_icon_to_item(item, is_decor=False):
     """
     Asigna un icono al ítem. Si es decor item, usa la URL específica.
-    Si no, intenta encontrar el icono en el CSV.
+    Si no, busca el icono en el índice del CSV.
     """
     console_log("🎨 Asignando icono para item:", item.name, "(Decor:", is_decor, ")")
     
@@ -305,28 +446,10 @@ def assign_icon_to_item(item, is_decor=False):
         # Para decor items, no subimos archivo, solo marcamos que usarán la URL externa
         return
     
-    console_log("🔍 Buscando icono en CSV para Blizzard ID:", item.blizzard_id)
-    
-    icon_mapping = load_icons_from_csv()
-    icon_name = icon_mapping.get(item.blizzard_id)
-    
-    if icon_name:
-        console_log("✅ Icono encontrado en CSV:", icon_name)
-        icon_filename = f"{icon_name}.png"
-        icon_path = os.path.join(ICONS_PATH, icon_filename)
-        
-        if os.path.exists(icon_path):
-            console_log("📁 Archivo encontrado en:", icon_path)
-            try:
-                with open(icon_path, 'rb') as icon_file:
-                    item.icon.save(icon_filename, File(icon_file), save=True)
-                    console_log("✅ Icono asignado exitosamente")
-            except Exception as e:
-                console_log("❌ Error al asignar icono:", str(e))
-        else:
-            console_log("⚠️ Archivo no encontrado:", icon_path)
+    if assign_icons([item]):
+        console_log("✅ Icono asignado:", item.icon.name)
     else:
-        console_log("⚠️ No se encontró icono en CSV para Blizzard ID:", item.blizzard_id)
+        console_log("⚠️ No se encontró icono para Blizzard ID:", item.blizzard_id)
 
 @require_POST
 def add_item(request):
@@ -361,11 +484,8 @@ def add_item(request):
     print("🔑 Obteniendo token de Blizzard...")
     token = get_token()  # obtener token Blizzard
     
-    print("📂 Cargando cache local...")
-    cache = load_cache()  # cargar cache local
-    
     print(f"🔍 Buscando Blizzard ID para: '{item_name}'...")
-    blizzard_id = get_item_id(token, item_name, cache)
+    blizzard_id = get_item_id(token, item_name)
     
     if not blizzard_id:
         print(f"❌ No se encontró el item en Blizzard: '{item_name}'")
@@ -430,9 +550,7 @@ def add_item(request):
     # o manejarlo en el template. Por ahora, si es decor y no tiene icono,
     # no hacemos nada - el template usará la URL por defecto
     
-    save_cache(cache)
-    
-    print(f"💾 Cache guardada")
+    bump_generation()
     print("🟢 ========== FIN add_item ==========")
     
     return JsonResponse({